@@ -0,0 +1,21 @@
+from django.utils.functional import SimpleLazyObject
+
+from store.cart import get_active_order
+
+
+def request_customer(request):
+    """The logged in user's Customer, joined from the user tables once per request and kept on it."""
+    if not hasattr(request, 'customer'):
+        request.customer = request.user.customer
+    return request.customer
+
+
+def cart(request):
+    """
+    Adds the customer's open cart as `order` so every page can draw the header cart badge, and the
+    customer the views resolved as `customer`, loaded only if a template uses it.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated or not user.is_customer:
+        return {}
+    return {'order': get_active_order(user), 'customer': SimpleLazyObject(lambda: request_customer(request))}
@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from store.models import OrderPayment
+from utils.printing import BASE_URL, document, static_path
+
+TEMPLATE_NAME = 'customer/receipts/invoice-view.html'
+# what OrderPaymentPrintView used to hand WeasyPrint on every render
+SITE_STYLESHEETS = [
+    'customer/assets/css/bootstrap.min.css',
+    'customer/assets/plugins/fontawesome/css/fontawesome.min.css',
+    'customer/assets/plugins/fontawesome/css/all.min.css',
+    'customer/assets/css/style.css',
+]
+
+
+class Command(BaseCommand):
+    help = "Renders the invoice receipt repeatedly, the way it used to be rendered and with the shared print " \
+           "module, and compares the time per receipt. Set --site-layout to keep the page's own stylesheet " \
+           "links in the cached run too."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receipts', type=int, default=20)
+        parser.add_argument('--site-layout', action='store_true',
+                            help="Render the cached run from the site layout instead of the print layout.")
+
+    def handle(self, *args, **options):
+        if options['receipts'] < 1:
+            raise CommandError("--receipts must be positive.")
+        context = {'object': OrderPayment.objects.order_by('-pk').first()}
+        site_html = render_to_string(TEMPLATE_NAME, context)
+        print_html = site_html if options['site_layout'] else \
+            render_to_string(TEMPLATE_NAME, {**context, 'base_template': 'customer/layouts/base_print.html'})
+
+        before = self.run("uncached", lambda: self.uncached(site_html), options['receipts'])
+        after = self.run("cached", lambda: document(print_html, base_url=BASE_URL).write_pdf(),
+                         options['receipts'])
+        self.stdout.write(f"{statistics.median(before) / statistics.median(after):.1f}x faster per receipt "
+                          f"once warm\n")
+
+    def uncached(self, html_string):
+        """Every stylesheet parsed again, a new font configuration and the page's links fetched by url."""
+        from django_weasyprint.utils import django_url_fetcher
+        from weasyprint import CSS, HTML
+        from weasyprint.fonts import FontConfiguration
+
+        fonts = FontConfiguration()
+        stylesheets = [CSS(filename=str(static_path(name)), url_fetcher=django_url_fetcher, font_config=fonts)
+                       for name in SITE_STYLESHEETS]
+        html = HTML(string=html_string, base_url=BASE_URL, url_fetcher=django_url_fetcher)
+        return html.render(stylesheets=stylesheets, font_config=fonts).write_pdf()
+
+    def run(self, label, render, receipts):
+        timings = []
+        for _ in range(receipts):
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1000)
+        warm = timings[1:] or timings
+        self.stdout.write(self.style.SUCCESS(label))
+        self.stdout.write(f"  first receipt {timings[0]:.0f}ms, then median {statistics.median(warm):.0f}ms, "
+                          f"mean {statistics.mean(warm):.0f}ms over {len(warm)}\n")
+        return warm
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.12 on 2026-10-18 01:40
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+import django.db.models.deletion
+
+
+def backfill_customer_activity(apps, schema_editor):
+    Customer = apps.get_model('customer', 'Customer')
+    CustomerActivity = apps.get_model('customer', 'CustomerActivity')
+    activity = {pk: CustomerActivity(customer_id=pk) for pk in Customer.objects.values_list('pk', flat=True)}
+    tables = (
+        ('store', 'Order', 'orders'),
+        ('service', 'Booking', 'bookings'),
+        ('service', 'Appointment', 'appointments'),
+        ('store', 'OrderPayment', 'payments'),
+        ('service', 'BookingPayment', 'payments'),
+    )
+    for app, model, field in tables:
+        aggregates = {'count': Count('pk'), 'last': Max('created')}
+        if field == 'payments':
+            aggregates['spend'] = Sum('amount')
+        rows = apps.get_model(app, model).objects.filter(customer__isnull=False).order_by().values('customer') \
+            .annotate(**aggregates)
+        for row in rows:
+            summary = activity[row['customer']]
+            setattr(summary, field, getattr(summary, field) + row['count'])
+            if field == 'payments':
+                summary.lifetime_spend += row['spend'] or 0.0
+            if row['last'] and (summary.last_activity is None or row['last'] > summary.last_activity):
+                summary.last_activity = row['last']
+    CustomerActivity.objects.bulk_create(activity.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0001_initial'),
+        ('service', '0005_bookingpayment_completed'),
+        ('store', '0003_order_cart_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerActivity',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity', serialize=False, to='customer.customer')),
+                ('orders', models.IntegerField(default=0)),
+                ('bookings', models.IntegerField(default=0)),
+                ('appointments', models.IntegerField(default=0)),
+                ('payments', models.IntegerField(default=0, help_text='Order and booking payments made')),
+                ('lifetime_spend', models.FloatField(default=0.0, help_text='Sum of all order and booking payments')),
+                ('last_activity', models.DateTimeField(blank=True, null=True, verbose_name='Last activity')),
+            ],
+            options={
+                'verbose_name': 'Customer Activity',
+                'verbose_name_plural': 'Customers Activity',
+            },
+        ),
+        migrations.RunPython(backfill_customer_activity, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,11 @@
+from django.apps import apps
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
 from shipment.models import ShipmentLocations
 from user.models import CustomUser, Profile, Feedback
@@ -31,9 +36,88 @@ class CustomerFeedback(Feedback):
         verbose_name_plural = 'Customers Feedback'
 
 
+class CustomerActivity(models.Model):
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='activity')
+    orders = models.IntegerField(default=0)
+    bookings = models.IntegerField(default=0)
+    appointments = models.IntegerField(default=0)
+    payments = models.IntegerField(default=0, help_text="Order and booking payments made")
+    lifetime_spend = models.FloatField(default=0.0, help_text="Sum of all order and booking payments")
+    last_activity = models.DateTimeField(_('Last activity'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Customer Activity'
+        verbose_name_plural = 'Customers Activity'
+
+    # (app label, model, summary field) for every table the summary counts
+    COUNTED = (
+        ('store', 'Order', 'orders'),
+        ('service', 'Booking', 'bookings'),
+        ('service', 'Appointment', 'appointments'),
+    )
+    PAYMENTS = (('store', 'OrderPayment'), ('service', 'BookingPayment'))
+
+    @classmethod
+    def summary_expressions(cls):
+        """Correlated subqueries computing every summary column of the current row."""
+        def per_customer(model, aggregate, output_field):
+            rows = apps.get_model(*model).objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+            return Coalesce(Subquery(rows.annotate(value=aggregate).values('value'), output_field=output_field), 0)
+
+        expressions = {field: per_customer((app, model), Count('pk'), IntegerField())
+                       for app, model, field in cls.COUNTED}
+        (order_payment, booking_payment) = cls.PAYMENTS
+        expressions['payments'] = per_customer(order_payment, Count('pk'), IntegerField()) + \
+            per_customer(booking_payment, Count('pk'), IntegerField())
+        expressions['lifetime_spend'] = per_customer(order_payment, Sum('amount'), FloatField()) + \
+            per_customer(booking_payment, Sum('amount'), FloatField())
+        return expressions
+
+    @classmethod
+    def refresh(cls, customer_id, touch=True):
+        """Recompute the customer's summary in one UPDATE, touch marks it as their latest activity."""
+        values = cls.summary_expressions()
+        if touch:
+            values['last_activity'] = timezone.now()
+        cls.objects.filter(pk=customer_id).update(**values)
+
+
 @receiver(post_save, sender=Customer)
 def customer_profile(sender, instance, created, **kwargs):
     if created:
         CustomerProfile.objects.create(user=instance)
         instance.customerprofile.save()
+        CustomerActivity.objects.create(customer=instance)
+
+
+# keep the dashboard summary in step with the customer's orders, bookings, appointments and payments
+@receiver(post_save, sender='store.Order')
+@receiver(post_save, sender='store.OrderPayment')
+@receiver(post_save, sender='service.Booking')
+@receiver(post_save, sender='service.BookingPayment')
+@receiver(post_save, sender='service.Appointment')
+def customer_activity(sender, instance, **kwargs):
+    if instance.customer_id:
+        CustomerActivity.refresh(instance.customer_id)
+
+
+@receiver(post_delete, sender='store.Order')
+@receiver(post_delete, sender='store.OrderPayment')
+@receiver(post_delete, sender='service.Booking')
+@receiver(post_delete, sender='service.BookingPayment')
+@receiver(post_delete, sender='service.Appointment')
+def customer_activity_removed(sender, instance, **kwargs):
+    if instance.customer_id:
+        CustomerActivity.refresh(instance.customer_id, touch=False)
+
 
+# render the receipts in the background as soon as there is something to download
+@receiver(post_save, sender='store.Order')
+@receiver(post_save, sender='store.OrderPayment')
+@receiver(post_save, sender='service.Booking')
+@receiver(post_save, sender='service.BookingPayment')
+def customer_receipts(sender, instance, **kwargs):
+    from customer.receipts import PRERENDERED
+    flag, receipt = PRERENDERED[sender.__name__]
+    if getattr(instance, flag) and instance.customer_id:
+        receipt.prerender(instance)
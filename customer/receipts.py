@@ -1,15 +1,31 @@
-import functools
-import ssl
-
 from django.conf import settings
 from django.utils import timezone
 from django.views.generic import DetailView
 
 from django_weasyprint import WeasyTemplateResponseMixin
-from django_weasyprint.utils import django_url_fetcher
 from django_weasyprint.views import CONTENT_TYPE_PNG, WeasyTemplateResponse, CONTENT_TYPE_PDF
 
 from store.models import OrderPayment
+from utils.printing import PRINT_STYLESHEET, font_config, local_url_fetcher, stylesheet
+from utils.receipts import Receipt
+
+BOOKING_RECEIPT = Receipt('customer/receipts/booking-receipt.html',
+                          "{object.customer.first_name}-{object.transaction_id}.pdf")
+APPOINTMENT_RECEIPT = Receipt('customer/receipts/appointment-receipt.html',
+                              "appointment-{object.customer.first_name}-{object.booking.transaction_id}.pdf")
+ORDER_RECEIPT = Receipt('customer/receipts/order-receipt.html',
+                        "order-{object.customer.first_name}-{object.transaction_id}.pdf")
+ORDER_PAYMENT_RECEIPT = Receipt('customer/receipts/order-payment-receipt.html',
+                                "{object.customer.first_name}-{object.transaction_id}.pdf")
+BOOKING_PAYMENT_RECEIPT = Receipt('customer/receipts/booking-payment-receipt.html',
+                                  "{object.customer.first_name}-{object.booking.transaction_id}.pdf")
+# model: (flag, receipt) rendered ahead of time once the flag is set, see customer.models.customer_receipts
+PRERENDERED = {
+    'Order': ('completed', ORDER_RECEIPT),
+    'OrderPayment': ('confirmed', ORDER_PAYMENT_RECEIPT),
+    'Booking': ('is_paid', BOOKING_RECEIPT),
+    'BookingPayment': ('confirmed', BOOKING_PAYMENT_RECEIPT),
+}
 
 
 class OrderPaymentReceiptView(DetailView):
@@ -19,23 +35,20 @@ class OrderPaymentReceiptView(DetailView):
 
 
 class CustomWeasyTemplateResponse(WeasyTemplateResponse):
-    # customized response class to change the default URL fetcher
+    # customized response class reading assets from disk and reusing the parsed stylesheets and fonts
     def get_url_fetcher(self):
-        # disable host and certificate check
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        return functools.partial(django_url_fetcher, ssl_context=context)
+        return local_url_fetcher
+
+    def get_font_config(self):
+        return font_config()
+
+    def get_css(self, base_url, url_fetcher):
+        return [stylesheet(str(name)) for name in self._stylesheets]
 
 
 class OrderPaymentPrintView(WeasyTemplateResponseMixin, OrderPaymentReceiptView):
-    # output of MyModelView rendered as PDF with hardcoded CSS
-    pdf_stylesheets = [
-        settings.STATIC_ROOT + 'customer/assets/css/bootstrap.min.css',
-        settings.STATIC_ROOT + 'customer/assets/plugins/fontawesome/css/fontawesome.min.css',
-        settings.STATIC_ROOT + 'customer/assets/plugins/fontawesome/css/all.min.css',
-        settings.STATIC_ROOT + 'customer/assets/css/style.css',
-    ]
+    # output of MyModelView rendered as PDF with the print stylesheet instead of the site's css
+    pdf_stylesheets = [PRINT_STYLESHEET]
     pdf_scripts = [
         settings.STATIC_ROOT + 'customer/assets/js/jquery.min.js',
         settings.STATIC_ROOT + 'customer/assets/js/popper.min.js',
@@ -47,6 +60,12 @@ class OrderPaymentPrintView(WeasyTemplateResponseMixin, OrderPaymentReceiptView)
     # custom response class to configure url-fetcher
     response_class = CustomWeasyTemplateResponse
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # the print layout links no stylesheets, they come parsed from pdf_stylesheets
+        context['base_template'] = 'customer/layouts/base_print.html'
+        return context
+
 
 class OrderPaymentReceiptViewDownloadView(WeasyTemplateResponseMixin, OrderPaymentReceiptView):
     # suggested filename (is required for attachment/download!)
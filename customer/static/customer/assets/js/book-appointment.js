@@ -1,5 +1,40 @@
 console.log("Book Payment")
 $(document).ready(function() {
+        function showSlots(slots) {
+            var list = $("#appointment-slots").html('');
+            $.each(slots, function(index, slot) {
+                $(`<button type="button" class="btn btn-sm bg-info-light mr-2 mb-2 slot"></button>`)
+                    .text(`${slot['date'].replace('T', ' ')} with ${slot['salonist_name']}`)
+                    .data('slot', slot)
+                    .appendTo(list);
+            });
+        }
+        function loadSlots() {
+            $("#id_salonist").val('');
+            if(!$("#id_booking").val()) {
+                return;
+            }
+            $.get($("#appointment-slots").data('url'), {booking: $("#id_booking").val(), minutes: $("#slot-minutes").val()},
+                function(response) {
+                    showSlots(response['slots'] || []);
+                    if(response['info']) {
+                        $("#appointment-slots").html(`<span class="text-muted">${response['info']}</span>`);
+                    }
+                });
+        }
+        $("#id_booking, #slot-minutes").change(loadSlots);
+        $("#id_date, #id_stop_date").change(function() {
+            $("#id_salonist").val('');
+        });
+        $("#appointment-slots").on('click', '.slot', function() {
+            var slot = $(this).data('slot');
+            $("#id_date").val(slot['date']);
+            $("#id_stop_date").val(slot['stop_date']);
+            $("#id_salonist").val(slot['salonist']);
+            $("#appointment-slots .slot").removeClass('bg-success-light').addClass('bg-info-light');
+            $(this).removeClass('bg-info-light').addClass('bg-success-light');
+        });
+        loadSlots();
         $("#book_appointment").submit(function(event) {
            event.preventDefault();
            $("#id-book-appointment-btn").html(`<i class="fas fa-redo-alt fa-pulse"></i>`);
@@ -21,6 +56,9 @@ $(document).ready(function() {
                             position: 'topRight'
                           });
                         }
+                        if(response['slots']) {
+                           showSlots(response['slots']);
+                        }
                         if(response['message']) {
                          iziToast.success({
                             title: 'Appointment:',
@@ -1,3 +1,117 @@
-from django.test import TestCase
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase
+
+from customer.context_processors import cart, request_customer
+from customer.models import Customer, CustomerActivity
+from customer.receipts import ORDER_PAYMENT_RECEIPT, ORDER_RECEIPT
+from store.models import Order, OrderItem, OrderPayment, Product
+from user.models import CustomUser
+from utils import printing, receipts
+
+
+class CustomerActivityTest(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(email="loyal@example.com", username="loyal")
+
+    def test_summary_follows_orders_and_payments(self):
+        order = Order.objects.create(customer=self.customer, transaction_id="T1")
+        OrderPayment.objects.create(order=order, customer=self.customer, mpesa="MXFTR432R5", amount=1500)
+        OrderPayment.objects.create(order=order, customer=self.customer, mpesa="MXFTR432R6", amount=500)
+        activity = CustomerActivity.objects.get(customer=self.customer)
+        self.assertEqual((activity.orders, activity.payments, activity.lifetime_spend), (1, 2, 2000))
+        self.assertIsNotNone(activity.last_activity)
+
+        order.delete()
+        activity.refresh_from_db()
+        self.assertEqual((activity.orders, activity.payments, activity.lifetime_spend), (0, 0, 0))
+
+
+class ReceiptCacheTest(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.customer = Customer.objects.create(email="receipt@example.com", username="receipt")
+        order = Order.objects.create(customer=self.customer, transaction_id="T1")
+        self.payment = OrderPayment.objects.create(order=order, customer=self.customer, mpesa="MXFTR432R5", amount=100)
+
+    def test_confirmed_payment_receipt_is_prerendered_and_reused(self):
+        with self.settings(RECEIPT_WORKERS=0, RECEIPTS_ROOT=self.root.name), \
+                mock.patch('utils.receipts.write_pdf', wraps=receipts.write_pdf) as write_pdf:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.payment.confirmed = True
+                self.payment.save()
+            self.assertEqual(write_pdf.call_count, 1)
+            self.assertTrue(ORDER_PAYMENT_RECEIPT.path(self.payment).exists())
+            response = ORDER_PAYMENT_RECEIPT.response(self.payment)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertEqual(write_pdf.call_count, 1)
+
+            self.payment.save()
+            ORDER_PAYMENT_RECEIPT.response(self.payment)
+            self.assertEqual(write_pdf.call_count, 2)
+            self.assertEqual(len(list(ORDER_PAYMENT_RECEIPT.path(self.payment).parent.iterdir())), 1)
+
+    def test_order_receipt_is_rendered_again_after_a_cart_change(self):
+        order = self.payment.order
+        item = OrderItem.objects.create(order=order, product=Product.objects.create(name="Comb", price=10), quantity=1)
+        with self.settings(RECEIPT_WORKERS=0, RECEIPTS_ROOT=self.root.name), \
+                mock.patch('utils.receipts.write_pdf', wraps=receipts.write_pdf) as write_pdf:
+            order.refresh_from_db()
+            ORDER_RECEIPT.response(order).close()
+            before = ORDER_RECEIPT.path(order)
+
+            item.quantity = 4
+            item.save()
+            order.refresh_from_db()
+            self.assertEqual(order.cart_total, 40)
+            self.assertNotEqual(ORDER_RECEIPT.path(order), before)
+            ORDER_RECEIPT.response(order).close()
+            self.assertEqual(write_pdf.call_count, 2)
+
+
+class LocalUrlFetcherTest(TestCase):
+
+    def test_static_urls_are_read_from_disk_on_any_host(self):
+        for url in ('file:///static/customer/assets/img/logo.png',
+                    'http://example.com/static/customer/assets/img/logo.png'):
+            fetched = printing.local_url_fetcher(url)
+            self.assertEqual(fetched['mime_type'], 'image/png')
+            self.assertEqual(fetched['string'][:4], b'\x89PNG')
+
+    def test_remote_and_outside_files_are_refused(self):
+        for url in ('https://cdnjs.cloudflare.com/ajax/libs/izitoast/1.4.0/css/iziToast.css', 'file:///etc/passwd',
+                    'file:///static/../../../etc/passwd', settings.STATIC_URL + 'missing/../../../../etc/passwd'):
+            with self.assertRaises(ValueError):
+                printing.local_url_fetcher(url)
+
+
+class KeysetPagerTest(TestCase):
+
+    def test_links_keep_the_other_tables_cursors(self):
+        request = RequestFactory().get('/customer/', {'orders': 40, 'bookings': 9})
+        html = render_to_string('customer/includes/keyset-pager.html', {
+            'page': SimpleNamespace(has_next=True, is_first=False, next_cursor=21), 'name': 'orders',
+            'anchor': 'pat_order'}, request=request)
+        self.assertIn('href="?bookings=9#pat_order"', html)
+        self.assertIn('href="?bookings=9&amp;orders=21#pat_order"', html)
+
+
+class RequestCustomerTest(TestCase):
+
+    def test_customer_and_cart_are_resolved_once_per_request(self):
+        customer = Customer.objects.create(email="once@example.com", username="once", is_customer=True)
+        request = RequestFactory().get('/customer/')
+        request.user = CustomUser.objects.get(pk=customer.pk)
+        with self.assertNumQueries(2):
+            context = cart(request)
+            self.assertEqual(context['customer'].pk, customer.pk)
+            self.assertIs(request_customer(request), request_customer(request))
+        with self.assertNumQueries(0):
+            self.assertIsNone(cart(request)['order'])
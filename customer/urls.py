@@ -11,6 +11,7 @@ urlpatterns = [
     path('service/<int:pk>/', customer_required(views.ServiceDetailView.as_view()), name="service-detail"),
     path('product/<slug>/', customer_required(views.ProductDetailView.as_view()), name="product-detail"),
     path('book_appointment/', customer_required(views.book_appointment), name="book_appointment"),
+    path('appointment_slots/', customer_required(views.appointment_slots), name="appointment_slots"),
     path('generate_booking_receipt_pdf/<int:slug>/', customer_required(views.generate_booking_receipt_pdf),
          name="generate_booking_receipt_pdf"),
     path('generate_appointment_receipt_pdf/<int:slug>/', customer_required(views.generate_appointment_receipt_pdf),
@@ -28,6 +29,7 @@ urlpatterns = [
     path('order_list/', customer_required(views.order_list), name="order_list"),
     path('checkout_pay/', customer_required(views.checkout_pay), name="checkout_pay"),
     path('checkout/', customer_required(views.checkout), name="checkout"),
+    path('update_cart/', customer_required(views.update_cart), name="update_cart"),
     path('clear_cart/', customer_required(views.clear_cart), name="clear_cart"),
     path('increase_quantity/<slug>/', customer_required(views.increase_quantity), name="increase_quantity"),
     path('decrease_quantity/<slug>/', customer_required(views.decrease_quantity), name="decrease_quantity"),
@@ -1,3 +1,6 @@
+import datetime
+import json
+
 from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login, logout, update_session_auth_hash
@@ -5,25 +8,32 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import ImproperlyConfigured
 from django.core.mail import send_mail
-from django.http import JsonResponse, HttpResponse
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
-from django.template.loader import render_to_string
 from django.urls import NoReverseMatch, reverse
 from django.utils.encoding import force_text, force_bytes
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.views import View
 from django.views.generic import ListView, CreateView, DetailView
-from weasyprint import HTML
+from customer.context_processors import request_customer
 from customer.forms import CustomerSignUpForm, CustomerFeedbackForm, CustomerProfileForm, CustomerForm
-from customer.models import Customer, CustomerFeedback
-from salonist.models import Salonist, SalonistProfile
+from customer.models import Customer, CustomerActivity, CustomerFeedback
+from customer.receipts import APPOINTMENT_RECEIPT, BOOKING_PAYMENT_RECEIPT, BOOKING_RECEIPT, ORDER_PAYMENT_RECEIPT, \
+    ORDER_RECEIPT
+from salonist.models import Salonist
 from salonist.tokens import account_activation_token
 from service.forms import BookingPaymentForm, AppointmentForm
 from service.models import Service, Booking, Apprenticeship, BookingPayment, Appointment
+from service.assignment import schedule_appointment
+from service.scheduling import SEARCH_DAYS, free_slots, qualified_salonists
 from store.forms import OrderPaymentForm
 from store.models import Order, Product, OrderItem, OrderPayment, Wishlist
+from store.cart import CartError, apply_cart_operations, get_active_order
+from store.stock import StockShortage, reconcile_order, reserve_order
 from user.decorators import customer_required
 from user.models import CustomUser
+from utils.pagination import KeysetListMixin, KeysetPage, cursor_from
 from utils.utils import generate_key
 
 
@@ -33,18 +43,25 @@ from utils.utils import generate_key
 class Home(ListView):
     model = Service
     template_name = "customer/dashboard.html"
+    per_page = 20
+
+    def page(self, name, queryset):
+        return KeysetPage(queryset, cursor_from(self.request, name), self.per_page)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        customer = self.request.user.customer
-        context['booking_transactions'] = BookingPayment.objects.filter(customer=customer)
-        context['order_transactions'] = OrderPayment.objects.filter(customer=customer)
-        print(f"These are payment orders {context['order_transactions']}")
-        context['appointments'] = Appointment.objects.filter(customer=customer)
-        context['bookings'] = Booking.objects.filter(customer=customer)
-        order = Order.objects.filter(customer=customer)
-        context['orders'] = order
-        context['order'] = Order.objects.filter(customer=customer, completed=False).first()
+        customer_id = self.request.user.pk
+        context['activity'] = CustomerActivity.objects.get_or_create(customer_id=customer_id)[0]
+        context['booking_transactions'] = self.page('booking_transactions', BookingPayment.objects.filter(
+            customer_id=customer_id).select_related('booking'))
+        context['order_transactions'] = self.page('order_transactions', OrderPayment.objects.filter(
+            customer_id=customer_id).select_related('order'))
+        context['appointments'] = self.page('appointments', Appointment.objects.filter(
+            customer_id=customer_id).select_related('booking__service', 'salonist__salonistprofile'))
+        context['bookings'] = self.page('bookings', Booking.objects.filter(
+            customer_id=customer_id).select_related('service'))
+        # cart_total and cart_items are stored on the order, so order rows cost no extra queries
+        context['orders'] = self.page('orders', Order.objects.filter(customer_id=customer_id))
         return context
 
 
@@ -64,21 +81,17 @@ class BookingListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        customer = self.request.user.customer
+        customer = request_customer(self.request)
         context['object'] = self.object_list.filter(customer=customer, is_active=False).first()
-        context['order'] = Order.objects.filter(customer=customer, completed=False).first()
         return context
 
 
-class OrderListView(ListView):
+class OrderListView(KeysetListMixin, ListView):
     model = Order
     template_name = "customer/forms/order.html"
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        customer = self.request.user.customer
-        context['object_list'] = self.object_list.filter(customer=customer, is_active=True)
-        return context
+    def get_queryset(self):
+        return super().get_queryset().filter(customer=request_customer(self.request), is_active=True)
 
 
 def login(request):
@@ -226,8 +239,8 @@ def log_out(request):
 def profile(request):
     data = {}
     if request.method == "POST":
-        p_form = CustomerProfileForm(request.POST, request.FILES, instance=request.user.customer.customerprofile)
-        form = CustomerForm(request.POST, instance=request.user.customer)
+        p_form = CustomerProfileForm(request.POST, request.FILES, instance=request_customer(request).customerprofile)
+        form = CustomerForm(request.POST, instance=request_customer(request))
         if form.is_valid() and p_form.is_valid():
             form.save()
             p_form.save()
@@ -241,8 +254,8 @@ def profile(request):
             print(form)
             return JsonResponse(data)
     else:
-        p_form = CustomerProfileForm(instance=request.user.customer.customerprofile)
-        form = CustomerForm(request.POST, instance=request.user.customer)
+        p_form = CustomerProfileForm(instance=request_customer(request).customerprofile)
+        form = CustomerForm(request.POST, instance=request_customer(request))
 
     data['form'] = form.errors
     data['p_form'] = p_form.errors
@@ -251,25 +264,20 @@ def profile(request):
 
 def profile_main(request):
     if request.method == "POST":
-        p_form = CustomerProfileForm(request.POST, request.FILES, instance=request.user.customer.customerprofile)
-        form = CustomerForm(request.POST, instance=request.user.customer)
+        p_form = CustomerProfileForm(request.POST, request.FILES, instance=request_customer(request).customerprofile)
+        form = CustomerForm(request.POST, instance=request_customer(request))
     else:
-        p_form = CustomerProfileForm(instance=request.user.customer.customerprofile)
-        form = CustomerForm(instance=request.user.customer)
-    customer = request.user.customer
-    order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
+        p_form = CustomerProfileForm(instance=request_customer(request).customerprofile)
+        form = CustomerForm(instance=request_customer(request))
     context = {
         'p_form': p_form,
         'form': form,
-        'order': order
     }
     return render(request, 'customer/accounts/profile.html', context)
 
 
 def faq(request):  # Not Done
-    customer = request.user.customer
-    order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-    context = {'order': order}
+    context = {}
     return render(request, 'customer/faq.html', context)
 
 
@@ -293,20 +301,16 @@ def change_password(request):
 
 def password_change(request):
     form = PasswordChangeForm(request.user)
-    customer = request.user.customer
-    order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-    return render(request, 'customer/accounts/change-password.html', {'form': form, 'order': order})
+    return render(request, 'customer/accounts/change-password.html', {'form': form})
 
 
 def feedback(request):
-    customer = request.user.customer
-    order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
     form = CustomerFeedbackForm
     # if request.method == "POST":
     #     form = CustomerFeedbackForm(request.POST)
     #     if form.is_valid():
     #         instance = form.save(commit=False)
-    #         instance.customer = request.user.customer
+    #         instance.customer = request_customer(request)
     #         admin = CustomUser.objects.filter(is_staff=True, is_superuser=True, is_active=True).first()
     #         instance.admin = admin
     #         if CustomerFeedback.objects.filter(subject=instance.subject, message=instance.message,
@@ -321,7 +325,7 @@ def feedback(request):
     #         else:
     #             instance.save()
     #             messages.success(request, "Feedback has been sent. Thank you")
-    return render(request, 'customer/accounts/feedback.html', {'order': order, 'form': form})
+    return render(request, 'customer/accounts/feedback.html', {'form': form})
 
 
 def feedback_api(request):
@@ -330,7 +334,7 @@ def feedback_api(request):
         form = CustomerFeedbackForm(request.POST)
         if form.is_valid():
             instance = form.save(commit=False)
-            instance.user = request.user.customer
+            instance.user = request_customer(request)
             admin = CustomUser.objects.filter(is_staff=True, is_superuser=True, is_active=True).first()
             instance.admin = admin
             if CustomerFeedback.objects.filter(subject=instance.subject, message=instance.message,
@@ -357,7 +361,7 @@ def feedback_api(request):
 
 def add_to_cart(request, slug):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     product = Product.objects.filter(slug=slug).first()
     if Wishlist.objects.filter(customer=customer, product=product).exists():
         instance = Wishlist.objects.get(customer=customer, product=product)
@@ -393,9 +397,9 @@ def add_to_cart(request, slug):
 
 def cart_list(request):
     data = {}
-    order = Order.objects.filter(customer=request.user.customer, is_active=True, completed=False).first()
+    order = get_active_order(request.user)
     try:
-        data['object_list'] = order.orderitem_set.all()
+        data['object_list'] = order.orderitem_set.select_related('product')
     except AttributeError:
         pass
     data['order'] = order
@@ -404,17 +408,14 @@ def cart_list(request):
 
 def wishlist_list(request):
     data = {}
-    wishlist = Wishlist.objects.filter(customer=request.user.customer)
+    wishlist = Wishlist.objects.filter(customer=request_customer(request)).select_related('product')
     data['object_list'] = wishlist
-    customer = request.user.customer
-    order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-    data['order'] = order
     return render(request, 'customer/accounts/wishlist.html', data)
 
 
 def remove_from_cart(request, slug):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     product = Product.objects.filter(slug=slug).first()
     order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
     item = OrderItem.objects.filter(order=order, product=product).first()
@@ -425,7 +426,7 @@ def remove_from_cart(request, slug):
 
 def decrease_quantity(request, slug):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     product = Product.objects.filter(slug=slug).first()
     order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
     item = OrderItem.objects.filter(order=order, product=product).first()
@@ -442,7 +443,7 @@ def decrease_quantity(request, slug):
 
 def increase_quantity(request, slug):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     product = Product.objects.filter(slug=slug).first()
     order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
     item = OrderItem.objects.filter(order=order, product=product).first()
@@ -456,9 +457,22 @@ def increase_quantity(request, slug):
     return JsonResponse(data)
 
 
+def update_cart(request):
+    """Apply a batch of cart operations posted as {"operations": [{"action", "slug", "quantity"}, ...]}."""
+    data = {}
+    if request.method == "POST":
+        try:
+            operations = json.loads(request.body or b'{}').get('operations')
+            data = apply_cart_operations(request.user.pk, operations)
+        except (ValueError, AttributeError, CartError) as e:
+            data['info'] = f"Sorry, these cart changes are invalid: {e}"
+            return JsonResponse(data, status=400)
+    return JsonResponse(data)
+
+
 def clear_cart(request):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
     order.is_active = False
     order.save()
@@ -469,32 +483,12 @@ def clear_cart(request):
 def checkout(request):
     data = {}
     try:
-        customer = request.user.customer
+        customer = request_customer(request)
         order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
         data['order'] = order
         data['form'] = OrderPaymentForm
-        data['object_list'] = order.orderitem_set.all()
-        products = []
-        for item in order.orderitem_set.all():
-            product = {
-                'quantity': item.quantity,
-                'name': item.product.name,
-                'slug': item.product.slug,
-            }
-            products.append(product)
-        print(products)
-        for item in products:
-            product = Product.objects.filter(slug=item['slug']).first()
-            if product.quantity >= item['quantity']:
-                print(f"{product.quantity} >= {item['quantity']}")
-                print("Everything is fine products exists")
-            else:
-                instance = OrderItem.objects.get(order=order, product=product)
-                if product.quantity > 0:
-                    instance.quantity = product.quantity
-                    instance.save()
-                else:
-                    instance.delete()
+        data['shortfalls'] = reconcile_order(order)
+        data['object_list'] = order.orderitem_set.select_related('product')
     except AttributeError:
         pass
     return render(request, 'customer/forms/checkout.html', data)
@@ -502,7 +496,7 @@ def checkout(request):
 
 def checkout_pay(request):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
     if request.method == "POST":
         form = OrderPaymentForm(request.POST)
@@ -511,18 +505,17 @@ def checkout_pay(request):
             mpesa = instance.mpesa
             if len(mpesa) == 10:
                 if instance.amount == order.get_cart_total:
-                    instance.order = order
-                    instance.transaction_id = generate_key(8, 8)
-                    instance.save()
-                    data['message'] = "Payment has been done successfully"
-                    order.completed = True
-                    order.save()
-                    items = order.orderitem_set.all()
-                    for item in items:
-                        product = Product.objects.filter(id=item.product.id).first()
-                        quantity = product.quantity - item.quantity
-                        product.quantity = quantity
-                        product.save()
+                    try:
+                        with transaction.atomic():
+                            reserve_order(order)
+                            instance.order = order
+                            instance.transaction_id = generate_key(8, 8)
+                            instance.save()
+                            order.completed = True
+                            order.save()
+                        data['message'] = "Payment has been done successfully"
+                    except StockShortage as e:
+                        data['info'] = f"Sorry, {e}. Please update your cart."
                 else:
                     data['info'] = f"amount sent is {instance.amount} but amount required is {order.get_cart_total}"
             else:
@@ -535,7 +528,7 @@ def checkout_pay(request):
 
 def order_list(request):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
     data['order'] = order
     return render(request, 'customer/forms/checkout.html', data)
@@ -543,7 +536,7 @@ def order_list(request):
 
 def book_hairstyle(request, service_id):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     service = Service.objects.filter(id=service_id).first()
     if Booking.objects.filter(customer=customer, is_active=False).exists():
         data['info'] = f"Hi {customer.get_full_name}, you've an ongoing booking"
@@ -556,7 +549,7 @@ def book_hairstyle(request, service_id):
 def booking_payment(request, service_id):
     data = {}
     try:
-        customer = request.user.customer
+        customer = request_customer(request)
         if request.method == "POST":
             form = BookingPaymentForm(request.POST)
             if form.is_valid():
@@ -592,7 +585,7 @@ def booking_payment(request, service_id):
 def complete_booking_payment(request, payment_id):
     data = {}
     try:
-        customer = request.user.customer
+        customer = request_customer(request)
         if request.method == "POST":
             payment = BookingPayment.objects.get(id=payment_id)
             form = BookingPaymentForm(request.POST, instance=payment)
@@ -621,22 +614,18 @@ def complete_booking_payment(request, payment_id):
 
 def booking_checkout(request):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     data['object'] = Booking.objects.filter(customer=customer, is_active=False).first()
     data['form'] = BookingPaymentForm
-    order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-    data['order'] = order
     return render(request, 'customer/forms/booking-checkout.html', data)
 
 
 def complete_booking_checkout(request, payment_id):
     data = {}
-    customer = request.user.customer
+    customer = request_customer(request)
     payment = BookingPayment.objects.get(id=payment_id)
     data['object'] = Booking.objects.filter(customer=customer, is_active=False).first()
     data['form'] = BookingPaymentForm(instance=payment)
-    order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-    data['order'] = order
     return render(request, 'customer/forms/booking-checkout.html', data)
 
 
@@ -647,7 +636,7 @@ def customer_logout(request):
 
 
 def add_to_wishlist(request, slug):
-    customer = request.user.customer
+    customer = request_customer(request)
     product = Product.objects.filter(slug=slug).first()
     order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
     if OrderItem.objects.filter(order=order, product=product).exists():
@@ -663,7 +652,7 @@ def add_to_wishlist(request, slug):
 
 
 def remove_from_wishlist(request, slug):
-    customer = request.user.customer
+    customer = request_customer(request)
     product = Product.objects.filter(slug=slug).first()
     if Wishlist.objects.filter(customer=customer, product=product).exists():
         item = Wishlist.objects.filter(customer=customer, product=product).first()
@@ -685,7 +674,7 @@ def add_billing(request):
 
 
 def add_booking(request, slug):
-    customer = request.user.customer
+    customer = request_customer(request)
     service = Service.objects.filter(id=slug).first()
     if Booking.objects.filter(customer=customer, is_active=False).exists():
         booking = Booking.objects.filter(customer=customer, is_active=False).first()
@@ -699,148 +688,92 @@ def add_booking(request, slug):
 
 def appointment(request):
     context = {'form': AppointmentForm}
-    customer = request.user.customer
-    order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-    context['order'] = order
     return render(request, 'customer/forms/book-appointment.html', context)
 
 
+def slot_data(slots):
+    return [{
+        'salonist': slot.salonist.pk,
+        'salonist_name': slot.salonist.get_full_name,
+        'date': timezone.localtime(slot.start).strftime('%Y-%m-%dT%H:%M'),
+        'stop_date': timezone.localtime(slot.stop).strftime('%Y-%m-%dT%H:%M'),
+    } for slot in slots]
+
+
+def appointment_slots(request):
+    """The next free slots for one of the customer's bookings, so the form can offer them before posting."""
+    data = {}
+    booking, minutes = request.GET.get('booking', ''), request.GET.get('minutes', '')
+    booking = Booking.objects.select_related('service') \
+        .filter(id=booking, customer=request_customer(request)).first() if booking.isdigit() else None
+    minutes = min(max(int(minutes), 15), 8 * 60) if minutes.isdigit() else 60
+    if booking is None:
+        data['info'] = "Select one of your bookings to see the free slots."
+    else:
+        data['slots'] = slot_data(free_slots(booking.service, datetime.timedelta(minutes=minutes)))
+        if not data['slots']:
+            data['info'] = f"Sorry no salonist is free for {booking.service.name} in the next {SEARCH_DAYS} days."
+    return JsonResponse(data)
+
+
 def book_appointment(request):
     context = {}
     if request.method == "POST":
         form = AppointmentForm(request.POST)
+        context['form'] = form.errors
         if form.is_valid():
             instance = form.save(commit=False)
-            instance.customer = request.user.customer
-            booking = instance.booking
-            service = booking.service
-            try:
-                salonist_profile = SalonistProfile.objects.filter(service=service).first()
-                salonist = salonist_profile.user
-                instance.salonist = salonist
-                case_1 = Appointment.objects.filter(salonist=salonist, date__lte=instance.date,
-                                                    stop_date__gte=instance.date).exists()
-                print(f"this is case 1 :: {case_1}")
-                case_2 = Appointment.objects.filter(salonist=salonist, date__lte=instance.stop_date,
-                                                    stop_date__gte=instance.stop_date).exists()
-                print(f"this is case 2 :: {case_2}")
-                case_3 = Appointment.objects.filter(salonist=salonist, date__gte=instance.date,
-                                                    stop_date__lte=instance.stop_date).exists()
-                print(f"this is case 3 :: {case_3}")
-                if instance.stop_date > timezone.now() and instance.date > timezone.now():
-                    if instance.stop_date > instance.date:
-                        # if either of these is true, abort and render the error
-                        if case_1 or case_2 or case_3:
-                            context['info'] = f"Sorry, An appointment exists in selected dates"
-                        else:
-                            instance.save()
-                            context['message'] = f"Appointment has been set successfully."
-                    else:
-                        context['info'] = "Sorry Stop time has to be future of Start time not past"
+            instance.customer = request_customer(request)
+            service = instance.booking.service
+            if instance.stop_date <= timezone.now() or instance.date <= timezone.now():
+                context['info'] = "selected date has to be in the future not past"
+            elif instance.stop_date <= instance.date:
+                context['info'] = "Sorry Stop time has to be future of Start time not past"
+            else:
+                chosen = request.POST.get('salonist', '')
+                if schedule_appointment(instance, salonist=chosen if chosen.isdigit() else None) is not None:
+                    context['message'] = f"Appointment has been set successfully with " \
+                                         f"{instance.salonist.get_full_name}."
+                elif not qualified_salonists(service).exists():
+                    context['info'] = "Sorry No salonist Available for the booked service"
                 else:
-                    context['info'] = "selected date has to be in the future not past"
-            except AttributeError:
-                context['info'] = "Sorry No salonist Available for the booked service"
+                    context['info'] = f"Sorry, An appointment exists in selected dates"
+                    context['slots'] = slot_data(free_slots(service, instance.stop_date - instance.date,
+                                                            after=instance.date))
     return JsonResponse(context)
 
 
 def generate_booking_receipt_pdf(request, slug):
     """Generate pdf."""
-    # Model data
-    data = {'object': Booking.objects.get(id=slug)}
-    # Rendered
-    html_string = render_to_string('customer/receipts/booking-receipt.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename={data['object'].customer.first_name}-" \
-                                      f"{data['object'].transaction_id}.pdf "
-    return response
+    return BOOKING_RECEIPT.response(Booking.objects.select_related('customer', 'service').get(id=slug))
 
 
 def generate_appointment_receipt_pdf(request, slug):
     """Generate pdf."""
-    # Model data
-    data = {'object': Appointment.objects.get(id=slug)}
-    # Rendered
-    html_string = render_to_string('customer/receipts/appointment-receipt.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename=appointment-{data['object'].customer.first_name}-" \
-                                      f"{data['object'].booking.transaction_id}.pdf "
-    return response
+    return APPOINTMENT_RECEIPT.response(Appointment.objects.select_related('customer', 'booking').get(id=slug))
 
 
 def generate_order_receipt_pdf(request, slug):
     """Generate pdf."""
-    # Model data
-    data = {'object': Order.objects.get(id=slug)}
-    # Rendered
-    html_string = render_to_string('customer/receipts/order-receipt.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename=order-{data['object'].customer.first_name}-" \
-                                      f"{data['object'].transaction_id}.pdf "
-    return response
+    return ORDER_RECEIPT.response(Order.objects.select_related('customer').get(id=slug))
 
 
 def generate_order_payment_receipt_pdf(request, slug):
     """Generate pdf."""
-    # Model data
-    data = {'object': OrderPayment.objects.get(id=slug)}
-    # Rendered
-    html_string = render_to_string('customer/receipts/order-payment-receipt.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename={data['object'].customer.first_name}-" \
-                                      f"{data['object'].transaction_id}.pdf "
-    return response
+    return ORDER_PAYMENT_RECEIPT.response(OrderPayment.objects.select_related('customer', 'order').get(id=slug))
 
 
 def booking_payment_receipt_pdf(request, slug):
     """Generate pdf."""
-    # Model data
-    data = {'object': BookingPayment.objects.get(id=slug)}
-    # Rendered
-    html_string = render_to_string('customer/receipts/booking-payment-receipt.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename={data['object'].customer.first_name}-" \
-                                      f"{data['object'].booking.transaction_id}.pdf "
-    return response
+    return BOOKING_PAYMENT_RECEIPT.response(
+        BookingPayment.objects.select_related('customer', 'booking').get(id=slug))
 
 
 class ServiceDetailView(DetailView):
     model = Service
     template_name = "customer/forms/service-detail.html"
 
-    def get_context_data(self, **kwargs):
-        context = super(ServiceDetailView, self).get_context_data(**kwargs)
-        customer = self.request.user.customer
-        context['order'] = Order.objects.filter(customer=customer, completed=False).first()
-        return context
-
 
 class ProductDetailView(DetailView):
     model = Product
     template_name = "customer/forms/product-detail.html"
-
-    def get_context_data(self, **kwargs):
-        context = super(ProductDetailView, self).get_context_data(**kwargs)
-        customer = self.request.user.customer
-        context['order'] = Order.objects.filter(customer=customer, completed=False).first()
-        return context
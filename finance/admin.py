@@ -1,7 +1,7 @@
 from django.contrib import admin, messages
 from django.utils.translation import ngettext
 
-from .models import Finance, FinanceProfile, FinanceFeedback
+from .models import DailyRevenue, Finance, FinanceProfile, FinanceFeedback
 
 
 class FinanceAdmin(admin.ModelAdmin):
@@ -92,6 +92,21 @@ class FinanceFeedbackAdmin(admin.ModelAdmin):
         return True
 
 
+class DailyRevenueAdmin(admin.ModelAdmin):
+    list_display = ('date', 'stream', 'confirmed', 'payments', 'amount', 'updated')
+    list_filter = ('stream', 'confirmed', 'date')
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(Finance, FinanceAdmin)
 admin.site.register(FinanceProfile, FinanceProfileAdmin)
 admin.site.register(FinanceFeedback, FinanceFeedbackAdmin)
+admin.site.register(DailyRevenue, DailyRevenueAdmin)
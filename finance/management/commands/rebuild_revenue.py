@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from finance.models import DailyRevenue
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the DailyRevenue rollups from the order, booking and training payment history."
+
+    def handle(self, *args, **options):
+        created = DailyRevenue.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily revenue row(s)."))
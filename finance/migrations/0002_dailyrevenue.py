@@ -0,0 +1,53 @@
+# Generated by Django 3.2.12 on 2026-10-18 01:44
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_revenue(apps, schema_editor):
+    DailyRevenue = apps.get_model('finance', 'DailyRevenue')
+    streams = (
+        ('order', 'store', 'OrderPayment', 'confirmed'),
+        ('booking', 'service', 'BookingPayment', 'confirmed'),
+        ('training', 'trainee', 'TrainingPayment', 'is_confirmed'),
+    )
+    rollups = []
+    for stream, app, model, field in streams:
+        rows = apps.get_model(app, model).objects.filter(created__isnull=False).order_by() \
+            .values(field, day=TruncDate('created')).annotate(count=Count('pk'), total=Sum('amount'))
+        rollups += [DailyRevenue(date=row['day'], stream=stream, confirmed=row[field], payments=row['count'],
+                                 amount=row['total'] or 0.0) for row in rows]
+    DailyRevenue.objects.bulk_create(rollups, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+        ('service', '0005_bookingpayment_completed'),
+        ('store', '0003_order_cart_totals'),
+        ('trainee', '0005_training_ended'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('stream', models.CharField(choices=[('order', 'Order'), ('booking', 'Booking'), ('training', 'Training')], max_length=10)),
+                ('confirmed', models.BooleanField(default=False)),
+                ('payments', models.IntegerField(default=0)),
+                ('amount', models.FloatField(default=0.0)),
+                ('updated', models.DateTimeField(auto_now=True, null=True, verbose_name='Updated')),
+            ],
+            options={
+                'verbose_name': 'Daily Revenue',
+                'verbose_name_plural': 'Daily Revenue',
+                'ordering': ('-date', 'stream'),
+                'unique_together': {('date', 'stream', 'confirmed')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_revenue, migrations.RunPython.noop),
+    ]
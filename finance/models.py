@@ -1,6 +1,12 @@
-from django.db import models
-from django.db.models.signals import post_save
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
 from user.models import CustomUser, Profile, Feedback
 
 
@@ -28,8 +34,104 @@ class FinanceFeedback(Feedback):
         verbose_name_plural = 'Finance Feedback'
 
 
+class DailyRevenue(models.Model):
+    ORDER = 'order'
+    BOOKING = 'booking'
+    TRAINING = 'training'
+    STREAM_CHOICES = (
+        (ORDER, 'Order'),
+        (BOOKING, 'Booking'),
+        (TRAINING, 'Training'),
+    )
+    # (app label, model, confirmation field) of the payments rolled up into every stream
+    STREAMS = {
+        ORDER: ('store', 'OrderPayment', 'confirmed'),
+        BOOKING: ('service', 'BookingPayment', 'confirmed'),
+        TRAINING: ('trainee', 'TrainingPayment', 'is_confirmed'),
+    }
+
+    date = models.DateField()
+    stream = models.CharField(max_length=10, choices=STREAM_CHOICES)
+    confirmed = models.BooleanField(default=False)
+    payments = models.IntegerField(default=0)
+    amount = models.FloatField(default=0.0)
+    updated = models.DateTimeField(_('Updated'), auto_now=True, null=True)
+
+    class Meta:
+        verbose_name = 'Daily Revenue'
+        verbose_name_plural = 'Daily Revenue'
+        unique_together = ('date', 'stream', 'confirmed')
+        ordering = ('-date', 'stream')
+
+    def __str__(self):
+        return f"{self.date} {self.stream} :: amount {str(self.amount)}"
+
+    @classmethod
+    def stream_for(cls, model):
+        for stream, (app, name, _field) in cls.STREAMS.items():
+            if model._meta.app_label == app and model.__name__ == name:
+                return stream
+
+    @classmethod
+    def refresh(cls, stream, day):
+        """Rebuild the rollup rows of one stream for one day from that day's payments."""
+        app, model, field = cls.STREAMS[stream]
+        rows = apps.get_model(app, model).objects.filter(created__date=day).order_by().values(field) \
+            .annotate(count=Count('pk'), total=Sum('amount'))
+        with transaction.atomic():
+            cls.objects.filter(stream=stream, date=day).delete()
+            cls.objects.bulk_create([cls(date=day, stream=stream, confirmed=row[field], payments=row['count'],
+                                         amount=row['total'] or 0.0) for row in rows])
+
+    @classmethod
+    def rebuild(cls):
+        """Rebuild every rollup row from the payment history, one grouped query per stream."""
+        rollups = []
+        for stream, (app, model, field) in cls.STREAMS.items():
+            rows = apps.get_model(app, model).objects.filter(created__isnull=False).order_by() \
+                .values(field, day=TruncDate('created')).annotate(count=Count('pk'), total=Sum('amount'))
+            rollups += [cls(date=row['day'], stream=stream, confirmed=row[field], payments=row['count'],
+                            amount=row['total'] or 0.0) for row in rows]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rollups, batch_size=500)
+        return len(rollups)
+
+    @classmethod
+    def totals(cls, start=None, end=None):
+        """
+        Payment count, pending count and amount of every stream between two dates, in one query
+        over the rollups.
+        """
+        rows = cls.objects.all()
+        if start:
+            rows = rows.filter(date__gte=start)
+        if end:
+            rows = rows.filter(date__lte=end)
+        aggregates = {}
+        for stream in cls.STREAMS:
+            aggregates[f'{stream}_payments'] = Coalesce(Sum('payments', filter=Q(stream=stream)), 0)
+            aggregates[f'{stream}_pending'] = Coalesce(Sum('payments', filter=Q(stream=stream, confirmed=False)), 0)
+            aggregates[f'{stream}_amount'] = Coalesce(Sum('amount', filter=Q(stream=stream)), 0.0)
+            aggregates[f'{stream}_confirmed_amount'] = \
+                Coalesce(Sum('amount', filter=Q(stream=stream, confirmed=True)), 0.0)
+        return rows.aggregate(**aggregates)
+
+
 @receiver(post_save, sender=Finance)
 def finance_profile(sender, instance, created, **kwargs):
     if created:
         FinanceProfile.objects.create(user=instance)
         instance.financeprofile.save()
+
+
+# keep the daily revenue rollups in step with every payment stream
+@receiver(post_save, sender='store.OrderPayment')
+@receiver(post_save, sender='service.BookingPayment')
+@receiver(post_save, sender='trainee.TrainingPayment')
+@receiver(post_delete, sender='store.OrderPayment')
+@receiver(post_delete, sender='service.BookingPayment')
+@receiver(post_delete, sender='trainee.TrainingPayment')
+def daily_revenue(sender, instance, **kwargs):
+    if instance.created:
+        DailyRevenue.refresh(DailyRevenue.stream_for(sender), timezone.localdate(instance.created))
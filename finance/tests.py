@@ -1,3 +1,46 @@
-from django.test import TestCase
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from customer.models import Customer
+from finance.models import DailyRevenue
+from store.admin import OrderPaymentAdmin
+from store.models import Order, OrderPayment
+
+
+class DailyRevenueTest(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(email="payer@example.com", username="payer")
+        self.order = Order.objects.create(customer=self.customer, transaction_id="T1")
+
+    def test_rollups_follow_payments(self):
+        first = OrderPayment.objects.create(order=self.order, customer=self.customer, mpesa="MXFTR432R5", amount=1500)
+        OrderPayment.objects.create(order=self.order, customer=self.customer, mpesa="MXFTR432R6", amount=500)
+        totals = DailyRevenue.totals()
+        self.assertEqual((totals['order_payments'], totals['order_pending'], totals['order_amount']), (2, 2, 2000))
+
+        first.confirmed = True
+        first.save()
+        totals = DailyRevenue.totals()
+        self.assertEqual((totals['order_pending'], totals['order_confirmed_amount']), (1, 1500))
+
+        first.delete()
+        totals = DailyRevenue.totals()
+        self.assertEqual((totals['order_payments'], totals['order_amount'], totals['booking_amount']), (1, 500, 0))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        OrderPayment.objects.create(order=self.order, customer=self.customer, mpesa="MXFTR432R5", amount=1500,
+                                    confirmed=True)
+        incremental = list(DailyRevenue.objects.values_list('date', 'stream', 'confirmed', 'payments', 'amount'))
+        self.assertEqual(DailyRevenue.rebuild(), 1)
+        self.assertEqual(list(DailyRevenue.objects.values_list('date', 'stream', 'confirmed', 'payments', 'amount')),
+                         incremental)
+
+    def test_admin_confirm_action_updates_rollups(self):
+        for mpesa in ("MXFTR432R5", "MXFTR432R6"):
+            OrderPayment.objects.create(order=self.order, customer=self.customer, mpesa=mpesa, amount=500)
+        admin = OrderPaymentAdmin(OrderPayment, site)
+        admin.message_user = lambda *args, **kwargs: None
+        admin.confirmed(RequestFactory().post('/'), OrderPayment.objects.all())
+        totals = DailyRevenue.totals()
+        self.assertEqual((totals['order_pending'], totals['order_confirmed_amount']), (0, 1000))
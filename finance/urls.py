@@ -10,6 +10,7 @@ urlpatterns = [
          name="confirm_booking_payment"),
     path('confirm_training_payment/<int:slug>/', finance_required(views.confirm_training_payment),
          name="confirm_training_payment"),
+    path('revenue/', finance_required(views.revenue_report), name="revenue_report"),
     path('search/', finance_required(views.search), name="search"),
     path('feedback/', finance_required(views.feedback), name="feedback"),
     path('password/', finance_required(views.password_change), name="password_change"),
@@ -1,14 +1,18 @@
+import datetime
+
 from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login, logout, update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import ImproperlyConfigured
 from django.core.mail import send_mail
-from django.db.models import Sum, Q
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.template.loader import render_to_string
 from django.urls import NoReverseMatch
+from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.views import View
@@ -16,7 +20,8 @@ from django.views.generic import ListView, CreateView
 
 from customer.models import Customer
 from finance.forms import FinanceProfileForm, FinanceForm, FinanceSignUpForm, FinanceFeedbackForm
-from finance.models import Finance, FinanceFeedback
+from finance.models import DailyRevenue, Finance, FinanceFeedback
+from home.search import search as search_index
 from manager.tokens import account_activation_token
 from salonist.forms import SalonistForm
 from salonist.models import Salonist
@@ -27,6 +32,7 @@ from store.models import Product, OrderPayment
 from trainee.models import TrainingPayment
 from user.decorators import finance_required
 from user.models import CustomUser
+from utils.pagination import KeysetListMixin
 
 
 def error_404(request, exception):
@@ -181,51 +187,82 @@ class Home(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['order_payment_count'] = OrderPayment.objects.filter(confirmed=False).count()
-        context['order_total'] = OrderPayment.objects.all().aggregate(Sum('amount')).get('amount__sum', 0.00)
-        context['booking_count'] = BookingPayment.objects.filter(confirmed=False).count()
-        context['total_amount'] = BookingPayment.objects.all().aggregate(Sum('amount')).get('amount__sum', 0.00)
+        revenue = DailyRevenue.totals()
+        context['order_payment_count'] = revenue['order_pending']
+        context['order_total'] = revenue['order_amount']
+        context['booking_count'] = revenue['booking_pending']
+        context['total_amount'] = revenue['booking_amount']
         return context
 
 
-class BookingPaymentListView(ListView):
+def report_date(request, name, default):
+    try:
+        return datetime.date.fromisoformat(request.GET.get(name, ''))
+    except ValueError:
+        return default
+
+
+@finance_required
+def revenue_report(request):
+    end = report_date(request, 'end', timezone.localdate())
+    start = report_date(request, 'start', end - datetime.timedelta(days=30))
+    if start > end:
+        start, end = end, start
+    streams = DailyRevenue.STREAM_CHOICES
+    per_stream = {stream: Coalesce(Sum('amount', filter=Q(stream=stream)), 0.0) for stream, _ in streams}
+    days = DailyRevenue.objects.filter(date__range=(start, end)).order_by('-date').values('date') \
+        .annotate(payments=Sum('payments'), total=Sum('amount'), **per_stream)
+    totals = DailyRevenue.totals(start, end)
+    context = {
+        'start': start,
+        'end': end,
+        'streams': [name for _, name in streams],
+        'days': [{**day, 'amounts': [day[stream] for stream, _ in streams]} for day in days],
+        'summary': [{
+            'name': name,
+            'payments': totals[f'{stream}_payments'],
+            'pending': totals[f'{stream}_pending'],
+            'amount': totals[f'{stream}_amount'],
+            'confirmed_amount': totals[f'{stream}_confirmed_amount'],
+        } for stream, name in streams],
+    }
+    return render(request, 'finance/reports/revenue.html', context)
+
+
+class BookingPaymentListView(KeysetListMixin, ListView):
     model = BookingPayment
     template_name = "finance/tables/booking-payment-list.html"
+    related = ('booking__service', 'booking__customer')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(confirmed=True)
-        return context
+    def get_queryset(self):
+        return super().get_queryset().filter(confirmed=True)
 
 
-class PendingBookingPaymentListView(ListView):
+class PendingBookingPaymentListView(KeysetListMixin, ListView):
     model = BookingPayment
     template_name = "finance/tables/pending-booking-payment-list.html"
+    related = ('booking__service', 'booking__customer')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(confirmed=False)
-        return context
+    def get_queryset(self):
+        return super().get_queryset().filter(confirmed=False)
 
 
-class OrderPaymentListView(ListView):
+class OrderPaymentListView(KeysetListMixin, ListView):
     model = OrderPayment
     template_name = "finance/tables/order-payment-list.html"
+    related = ('order__customer',)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(confirmed=True)
-        return context
+    def get_queryset(self):
+        return super().get_queryset().filter(confirmed=True)
 
 
-class PendingOrderPaymentListView(ListView):
+class PendingOrderPaymentListView(KeysetListMixin, ListView):
     model = OrderPayment
     template_name = "finance/tables/pending-order-payment-list.html"
+    related = ('order__customer',)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(confirmed=False)
-        return context
+    def get_queryset(self):
+        return super().get_queryset().filter(confirmed=False)
 
 
 def confirm_order_payment(request, order_id):
@@ -323,32 +360,29 @@ def feedback(request):
 def search(request):
     q = request.GET.get('search')
     context = {}
-    products = Product.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    services = Service.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    context['products'] = products
-    context['services'] = services
+    hits = search_index(q, kinds=('product', 'service'))
+    context['products'] = hits['product'].objects
+    context['services'] = hits['service'].objects
     context['q'] = q
     return render(request, 'finance/search.html', context)
 
 
-class PendingTrainingPaymentListView(ListView):
+class PendingTrainingPaymentListView(KeysetListMixin, ListView):
     model = TrainingPayment
     template_name = "finance/tables/pending-payment-list.html"
+    related = ('training__training__service', 'trainee')
 
-    def get_context_data(self, **kwargs):
-        context = super(PendingTrainingPaymentListView, self).get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter( is_confirmed=False)
-        return context
+    def get_queryset(self):
+        return super(PendingTrainingPaymentListView, self).get_queryset().filter(is_confirmed=False)
 
 
-class TrainingPaymentListView(ListView):
+class TrainingPaymentListView(KeysetListMixin, ListView):
     model = TrainingPayment
     template_name = "finance/tables/payment-list.html"
+    related = ('training__training__service', 'finance')
 
-    def get_context_data(self, **kwargs):
-        context = super(TrainingPaymentListView, self).get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(is_confirmed=True)
-        return context
+    def get_queryset(self):
+        return super(TrainingPaymentListView, self).get_queryset().filter(is_confirmed=True)
 
 
 def confirm_training_payment(request, slug):
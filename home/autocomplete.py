@@ -0,0 +1,169 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_LIMIT = 8
+# other workers' changes only reach this one through a rebuild, so rebuild at least this often
+AUTOCOMPLETE_MAX_AGE = 300
+
+Suggestion = namedtuple('Suggestion', ['kind', 'id', 'label', 'slug'])
+
+
+def words(text):
+    return re.findall(r'\w+', text.casefold())
+
+
+# model: (kind, the fields its name is made of), only active and unarchived objects are offered to customers
+SUGGESTIONS = {
+    'store.Product': ('product', ('name',)),
+    'salonist.Service': ('service', ('name',)),
+    'salonist.Salonist': ('salonist', ('first_name', 'last_name')),
+}
+
+
+def slug_fields(model):
+    return ('slug',) if hasattr(model, 'slug') else ()
+
+
+def suggestion_for(obj):
+    kind, fields = SUGGESTIONS[obj._meta.label]
+    if not obj.is_active or obj.is_archived:
+        return kind, None
+    label = ' '.join(filter(None, (getattr(obj, field) for field in fields)))
+    return kind, Suggestion(kind, obj.pk, label, getattr(obj, 'slug', None))
+
+
+def suggestion_url(suggestion):
+    # only the handful of suggestions answered are reversed, not the whole catalogue
+    if suggestion.kind == 'product':
+        return reverse('customer:product-detail', args=[suggestion.slug])
+    if suggestion.kind == 'service':
+        return reverse('customer:service-detail', args=[suggestion.id])
+    return reverse('home:salonists')
+
+
+class PrefixIndex:
+    """
+    Catalogue names kept in sorted lists of (key, kind, id), so the names matching a prefix are one
+    contiguous run found by binary search.
+
+    names holds every name from its first word, words holds it again from each later word, so that
+    "sham" finds "Argan Shampoo" but names starting with the prefix are suggested first.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.words = []
+        self.suggestions = {}
+        self.lock = threading.Lock()
+        self.built = None
+        self.replay = None
+
+    @staticmethod
+    def keys(suggestion):
+        parts = words(suggestion.label)
+        keys = [(' '.join(parts[position:]), suggestion.kind, suggestion.id) for position in range(len(parts))]
+        return keys[:1], keys[1:]
+
+    def build(self):
+        """Read the whole catalogue into a new index and swap it in, replaying saves made meanwhile."""
+        with self.lock:
+            self.replay = []
+        suggestions = {}
+        for label, (kind, fields) in SUGGESTIONS.items():
+            model = apps.get_model(label)
+            slug = slug_fields(model)
+            # plain values rather than model instances, the catalogue may be large
+            rows = model.objects.filter(is_active=True, is_archived=False).values_list('pk', *slug, *fields)
+            for pk, *values in rows.iterator():
+                suggestions[kind, pk] = Suggestion(kind, pk, ' '.join(filter(None, values[len(slug):])),
+                                                   values[0] if slug else None)
+        names, later = [], []
+        for suggestion in suggestions.values():
+            first, rest = self.keys(suggestion)
+            names += first
+            later += rest
+        names.sort()
+        later.sort()
+        with self.lock:
+            replay, self.replay = self.replay, None
+            self.names, self.words, self.suggestions = names, later, suggestions
+            for kind, pk, suggestion in replay:
+                self.apply(kind, pk, suggestion)
+            self.built = time.monotonic()
+
+    def refresh(self):
+        # a stale index keeps answering while a thread rebuilds it
+        try:
+            self.build()
+        finally:
+            connection.close()
+
+    def apply(self, kind, pk, suggestion):
+        old = self.suggestions.pop((kind, pk), None)
+        if old is not None:
+            for entries, keys in zip((self.names, self.words), self.keys(old)):
+                for key in keys:
+                    position = bisect.bisect_left(entries, key)
+                    if position < len(entries) and entries[position] == key:
+                        del entries[position]
+        if suggestion is not None:
+            self.suggestions[kind, pk] = suggestion
+            for entries, keys in zip((self.names, self.words), self.keys(suggestion)):
+                for key in keys:
+                    bisect.insort(entries, key)
+
+    def update(self, obj, deleted=False):
+        """Bring obj's entries up to date after it was saved or deleted."""
+        kind, suggestion = suggestion_for(obj)
+        if deleted:
+            suggestion = None
+        with self.lock:
+            if self.replay is not None:
+                self.replay.append((kind, obj.pk, suggestion))
+            if self.built is not None:
+                self.apply(kind, obj.pk, suggestion)
+
+    def complete(self, q, limit=AUTOCOMPLETE_LIMIT):
+        """Up to limit suggestions with a word starting with q, names starting with it first."""
+        if self.built is None:
+            self.build()
+        elif time.monotonic() - self.built > getattr(settings, 'AUTOCOMPLETE_MAX_AGE', AUTOCOMPLETE_MAX_AGE) \
+                and self.replay is None:
+            self.built = time.monotonic()
+            threading.Thread(target=self.refresh, daemon=True).start()
+        prefix = ' '.join(words(q))
+        results, seen = [], set()
+        if not prefix:
+            return results
+        with self.lock:
+            for entries in (self.names, self.words):
+                position = bisect.bisect_left(entries, (prefix,))
+                while position < len(entries) and entries[position][0].startswith(prefix) and len(results) < limit:
+                    _, kind, pk = entries[position]
+                    if (kind, pk) not in seen:
+                        seen.add((kind, pk))
+                        results.append(self.suggestions[kind, pk])
+                    position += 1
+        return results
+
+
+index = PrefixIndex()
+
+
+def warm_up():
+    """Build the index as the worker starts, so the first customer to type doesn't wait for it."""
+    try:
+        index.build()
+    except DatabaseError:
+        logger.exception("Building the autocomplete index failed, it is built on first use instead")
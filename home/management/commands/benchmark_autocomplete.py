@@ -0,0 +1,62 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+
+from home.autocomplete import index
+from home.views import autocomplete
+from salonist.models import Service
+from store.models import Product
+
+WORDS = ("argan", "braids", "box", "knotless", "twist", "wig", "lace", "front", "shampoo", "conditioner", "oil",
+         "coconut", "shea", "butter", "relaxer", "weave", "cornrows", "locs", "retwist", "bob", "pixie", "curl",
+         "cream", "gel", "edge", "control", "spray", "serum", "mask", "treatment", "blow", "dry", "silk", "press")
+
+
+class Command(BaseCommand):
+    help = "Fills a catalogue of products and services, builds the autocomplete index over it and times the " \
+           "autocomplete view on random prefixes. Everything runs in a transaction that is rolled back, the " \
+           "database is left untouched."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=2022)
+
+    def handle(self, *args, **options):
+        if options['items'] < 1 or options['queries'] < 1:
+            raise CommandError("--items and --queries must be positive.")
+        generator = random.Random(options['seed'])
+        with transaction.atomic():
+            self.fill(generator, options['items'])
+            started = time.perf_counter()
+            index.build()
+            self.stdout.write(f"Built the index of {len(index.suggestions)} names in "
+                              f"{(time.perf_counter() - started) * 1000:.0f}ms\n")
+
+            factory = RequestFactory()
+            timings = []
+            for _ in range(options['queries']):
+                word = generator.choice(WORDS)
+                request = factory.get('/autocomplete/', {'q': word[:generator.randint(1, len(word))]})
+                started = time.perf_counter()
+                autocomplete(request)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(self.style.SUCCESS(f"{options['queries']} requests"))
+            self.stdout.write(f"  p50 {statistics.median(timings):.3f}ms, "
+                              f"p99 {timings[int(len(timings) * 0.99) - 1]:.3f}ms, max {timings[-1]:.3f}ms\n")
+            transaction.set_rollback(True)
+
+    def fill(self, generator, items):
+        def name():
+            return " ".join(generator.sample(WORDS, generator.randint(1, 4))).title()
+
+        products = items * 3 // 5
+        Product.objects.bulk_create([Product(name=name(), slug=f"benchmark-{number}", price=100, is_active=True)
+                                     for number in range(products)], batch_size=1000)
+        Service.objects.bulk_create([Service(name=name(), description="Benchmark", price=100, is_active=True)
+                                     for _ in range(items - products)], batch_size=1000)
@@ -0,0 +1,62 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+ASSET = re.compile(r'''(?:src|href|srcset)\s*=\s*["']([^"' ]+)''')
+
+
+class Command(BaseCommand):
+    help = "Loads the home page the way a browser with an empty cache does, then again with a warm one, " \
+           "and reports the bytes transferred for it and the assets it links to."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=None, help="Page to load, the home page by default.")
+        parser.add_argument('--encoding', default='br, gzip',
+                            help="Accept-Encoding the browser sends, '' for none.")
+
+    def handle(self, *args, **options):
+        # DEBUG links the unhashed names, measure what production serves
+        with override_settings(DEBUG=False):
+            client = Client(HTTP_ACCEPT_ENCODING=options['encoding'])
+            page = client.get(options['path'] or reverse('home:index'))
+            assets = sorted({url for url in ASSET.findall(page.content.decode())
+                             if url.startswith((settings.STATIC_URL, settings.MEDIA_URL))})
+
+            cold = Counter(requests=1, bytes=len(page.content))
+            warm = Counter(requests=1, bytes=len(page.content))
+            for url in assets:
+                response = client.get(url)
+                cold['requests'] += 1
+                # the 404 handler answers with a 200, only files StaticFilesMiddleware served have an ETag
+                if response.status_code != 200 or 'ETag' not in response:
+                    cold['missing'] += 1
+                    continue
+                size = self.size(response)
+                cold['bytes'] += size
+                cold['uncompressed'] += size if 'Content-Encoding' not in response else self.size(Client().get(url))
+                # within max-age an immutable asset isn't asked for again, the others are revalidated
+                if 'immutable' in response.get('Cache-Control', ''):
+                    continue
+                response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                warm['requests'] += 1
+                warm['bytes'] += self.size(response)
+
+        self.stdout.write(self.style.SUCCESS(f"Cold load of {page.request['PATH_INFO']}"))
+        self.stdout.write(f"  {cold['requests']} requests, {cold['missing']} missing, "
+                          f"{cold['bytes'] / 1024:.0f} KB transferred, assets "
+                          f"{(cold['bytes'] - len(page.content)) / 1024:.0f} KB of "
+                          f"{cold['uncompressed'] / 1024:.0f} KB uncompressed")
+        self.stdout.write(self.style.SUCCESS("Warm load"))
+        self.stdout.write(f"  {warm['requests']} requests, {warm['bytes'] / 1024:.0f} KB transferred")
+
+    @staticmethod
+    def size(response):
+        if response.status_code == 304:
+            return 0
+        if response.streaming:
+            return sum(len(chunk) for chunk in response.streaming_content)
+        return len(response.content)
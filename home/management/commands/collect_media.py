@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from home.models import MediaBlob
+from utils.storage import delete_blob, recount
+
+
+class Command(BaseCommand):
+    help = "Deletes the stored uploads no row references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help="Count the references from the rows first, rather than trusting the signals.")
+        # an upload is on disk before the row referencing it is committed
+        parser.add_argument('--grace', type=float, default=24,
+                            help="Hours an unreferenced file is kept for, so uploads in flight aren't deleted.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted.")
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f"Corrected the references of {recount()} file(s).")
+        orphans = MediaBlob.objects.filter(references__lte=0,
+                                           created__lt=timezone.now() - timedelta(hours=options['grace']))
+        deleted = size = 0
+        for blob in orphans.iterator():
+            if options['dry_run'] or delete_blob(default_storage, blob):
+                deleted += 1
+                size += blob.size
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} file(s), {size / 1024 / 1024:.1f} MB."))
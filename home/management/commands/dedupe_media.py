@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path, PurePosixPath
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from home.models import MediaBlob
+from utils.images import VARIANTS, FORMATS, variant_name
+from utils.storage import BLOBS_DIR, CHUNK_SIZE, ContentHashStorage, blob_name, content_hash, file_fields, recount
+
+
+class Command(BaseCommand):
+    help = "Moves the uploads stored before ContentHashStorage into its blobs, keeping one file per content, " \
+           "points the rows at them and counts their references."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be saved.")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentHashStorage):
+            raise CommandError("DEFAULT_FILE_STORAGE isn't a ContentHashStorage.")
+        fields = file_fields()
+        # the field defaults are shared by every row without an upload already
+        defaults = {field.default for _, field in fields if isinstance(field.default, str)}
+        names = set()
+        for model, field in fields:
+            names.update(model._base_manager.values_list(field.attname, flat=True).distinct())
+        names = sorted(name for name in names
+                       if name and name not in defaults and not name.startswith(f"{BLOBS_DIR}/"))
+
+        moved = duplicates = saved = missing = 0
+        targets = set()
+        for name in names:
+            path = Path(default_storage.path(name))
+            if not path.is_file():
+                missing += 1
+                continue
+            with path.open('rb') as file:
+                target = blob_name(content_hash(iter(lambda: file.read(CHUNK_SIZE), b'')), PurePosixPath(name).suffix)
+            size = path.stat().st_size
+            duplicate = target in targets or default_storage.exists(target)
+            targets.add(target)
+            if duplicate:
+                duplicates += 1
+                saved += size
+            else:
+                moved += 1
+            if options['dry_run']:
+                continue
+            # copy, repoint the rows, then delete the original, an interrupted run is finished by the next one
+            if not duplicate:
+                destination = Path(default_storage.path(target))
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                handle, temporary = tempfile.mkstemp(dir=destination.parent, suffix='.part')
+                os.close(handle)
+                shutil.copyfile(path, temporary)
+                os.replace(temporary, destination)
+            with transaction.atomic():
+                MediaBlob.objects.get_or_create(name=target, defaults={'size': size})
+                for model, field in fields:
+                    model._base_manager.filter(**{field.attname: name}).update(**{field.attname: target})
+            path.unlink()
+            # the blob's own variants are made the first time it is shown
+            for variant in VARIANTS:
+                for extension, *_ in FORMATS:
+                    default_storage.delete(variant_name(name, variant, extension))
+
+        if not options['dry_run']:
+            recount()
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} referenced file(s) are missing, left as they are."))
+        move, remove = ("Would move", "remove") if options['dry_run'] else ("Moved", "removed")
+        self.stdout.write(self.style.SUCCESS(
+            f"{move} {moved} file(s) into {BLOBS_DIR}/ and {remove} {duplicates} duplicate(s), "
+            f"saving {saved / 1024 / 1024:.1f} MB."))
@@ -0,0 +1,45 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from utils.synthetic import BATCH_SIZE, VOLUME, Generator
+
+
+class Command(BaseCommand):
+    help = "Generates a synthetic salon for load and benchmark work: users of every role, services, products " \
+           "with galleries and reviews, orders, bookings, appointments, payments, trainings and " \
+           "apprenticeships. Rows are bulk created in batches without sending signals, the same seed gives the " \
+           "same data. --scale multiplies every volume, e.g. --scale 100 writes several million rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0)
+        for name, count in VOLUME.items():
+            parser.add_argument(f'--{name}', type=int, help=f"Defaults to {count} times --scale.")
+        parser.add_argument('--seed', type=int, default=2022)
+        parser.add_argument('--until', type=datetime.date.fromisoformat,
+                            help="Last day of the generated history, YYYY-MM-DD. Defaults to today.")
+        parser.add_argument('--days', type=int, default=365, help="How many days of history to generate.")
+        parser.add_argument('--password', help="Password of every generated user. They can't log in without one.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        volume = {name: options[name] if options[name] is not None else round(count * options['scale'])
+                  for name, count in VOLUME.items()}
+        if any(count < 0 for count in volume.values()) or options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError("Volumes can't be negative, --days and --batch-size must be positive.")
+        generator = Generator(volume, seed=options['seed'], until=options['until'], days=options['days'],
+                              password=options['password'], batch_size=options['batch_size'])
+        started = time.perf_counter()
+        with transaction.atomic():
+            rebuilt = generator.generate()
+        elapsed = time.perf_counter() - started
+
+        for label, count in sorted(generator.written.items()):
+            self.stdout.write(f"  {label:36} {count:>10}")
+        for name, count in rebuilt.items():
+            self.stdout.write(f"  rebuilt {count} {name}")
+        total = sum(generator.written.values())
+        self.stdout.write(self.style.SUCCESS(f"Generated {total} rows in {elapsed:.1f}s, "
+                                             f"{total / elapsed:.0f} rows/s."))
@@ -0,0 +1,29 @@
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from salon.query_budgets import BUDGETS
+from utils import querybudget
+from utils.testing import LOCAL_CACHES
+
+
+class Command(BaseCommand):
+    help = "Requests every named route against a seeded dataset of a few rows and again of more rows, and " \
+           "reports the routes over their query budget or running more queries as rows grow, worst first. " \
+           "Everything runs in a transaction that is rolled back, the database is left untouched."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worst', type=int, default=10, help="How many of the worst routes to list.")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as root, \
+                override_settings(IMAGE_WORKERS=0, RECEIPT_WORKERS=0, RECEIPTS_ROOT=root, CACHES=LOCAL_CACHES), \
+                transaction.atomic():
+            results = querybudget.run(BUDGETS)
+            transaction.set_rollback(True)
+        self.stdout.write(querybudget.report(results, BUDGETS, options['worst']))
+        failed = [result for result in results if querybudget.failures(result)]
+        if failed or any(route not in BUDGETS for route in querybudget.named_routes()):
+            raise CommandError(f"{len(failed)} route(s) over their query budget.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from home.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full text search index of products, services and salonists."
+
+    def handle(self, *args, **options):
+        indexed = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} object(s)."))
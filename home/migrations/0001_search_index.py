@@ -0,0 +1,26 @@
+# Generated by Django 3.2.12 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+def backfill_search_index(apps, schema_editor):
+    from home.search import rebuild
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('salonist', '0001_initial'),
+        ('store', '0003_order_cart_totals'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE home_search_index USING fts5(title, body, prefix='2 3')",
+            "DROP TABLE home_search_index",
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,87 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+from utils import images, storage
+from . import autocomplete, search
+
+
+@receiver(post_save, sender='store.Product')
+@receiver(post_save, sender='salonist.Service')
+@receiver(post_save, sender='salonist.Salonist')
+def search_index(sender, instance, **kwargs):
+    search.index(instance)
+
+
+@receiver(post_delete, sender='store.Product')
+@receiver(post_delete, sender='salonist.Service')
+@receiver(post_delete, sender='salonist.Salonist')
+def search_unindex(sender, instance, **kwargs):
+    search.unindex(instance)
+
+
+@receiver(post_save, sender='store.Product')
+@receiver(post_save, sender='salonist.Service')
+@receiver(post_save, sender='salonist.Salonist')
+def autocomplete_index(sender, instance, **kwargs):
+    autocomplete.index.update(instance)
+
+
+@receiver(post_delete, sender='store.Product')
+@receiver(post_delete, sender='salonist.Service')
+@receiver(post_delete, sender='salonist.Salonist')
+def autocomplete_unindex(sender, instance, **kwargs):
+    autocomplete.index.update(instance, deleted=True)
+
+
+# the models with uploads
+UPLOADS = (
+    'store.Product', 'store.Gallery', 'salonist.Service', 'customer.CustomerProfile', 'salonist.SalonistProfile',
+    'manager.ManagerProfile', 'finance.FinanceProfile', 'stock.StockProfile', 'trainee.TraineeProfile',
+    'shipment.AgentProfile',
+)
+
+
+class MediaBlob(models.Model):
+    """A file stored once by utils.storage.ContentHashStorage, with the number of rows referencing it."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    references = models.IntegerField(default=0, help_text="Rows referencing the file, kept up to date by signals")
+    created = models.DateTimeField(_('Created'), auto_now_add=True, null=True)
+
+    class Meta:
+        verbose_name = 'Media Blob'
+        verbose_name_plural = 'Media Blobs'
+
+    def __str__(self):
+        return self.name
+
+
+# resized renditions of every upload, made in the background once it is committed
+def image_variants(sender, instance, **kwargs):
+    images.generate_on_commit(instance.image)
+
+
+# count the rows referencing each stored upload, so collect_media can delete the ones nothing uses
+def remember_stored_files(sender, instance, **kwargs):
+    instance.stored_files = storage.stored_names(instance)
+
+
+def count_stored_files(sender, instance, created, **kwargs):
+    before, after = {} if created else getattr(instance, 'stored_files', {}), storage.stored_names(instance)
+    changed = [attname for attname, name in after.items() if name is not None and before.get(attname) != name]
+    storage.release(*[before.get(attname) for attname in changed])
+    storage.retain(*[after[attname] for attname in changed])
+    instance.stored_files = after
+
+
+def release_stored_files(sender, instance, **kwargs):
+    storage.release(*storage.stored_names(instance).values())
+
+
+for upload in UPLOADS:
+    post_save.connect(image_variants, sender=upload)
+    post_init.connect(remember_stored_files, sender=upload)
+    post_save.connect(count_stored_files, sender=upload)
+    post_delete.connect(release_stored_files, sender=upload)
@@ -0,0 +1,119 @@
+import re
+from collections import namedtuple
+
+from django.apps import apps
+from django.db import connection
+
+SEARCH_TABLE = 'home_search_index'
+SEARCH_LIMIT = 50
+# column weights for bm25, a match in the title counts ten times one in the body
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+Hits = namedtuple('Hits', ['objects', 'count'])
+
+
+def product_document(product):
+    return product.name, product.description or ''
+
+
+def service_document(service):
+    return service.name, service.description or ''
+
+
+def salonist_document(salonist):
+    # inactive salonists stay out of the index so nobody finds them
+    if not salonist.is_active:
+        return None
+    return f"{salonist.first_name} {salonist.last_name}", ''
+
+
+# kind: (model, document, related) where document returns the (title, body) to index or None to leave the
+# object out, and related is what search results select along with each object
+DOCUMENTS = {
+    'product': ('store.Product', product_document, ()),
+    'service': ('salonist.Service', service_document, ()),
+    'salonist': ('salonist.Salonist', salonist_document, ('salonistprofile',)),
+}
+KINDS = tuple(DOCUMENTS)
+# every object's rowid is pk * STRIDE + its kind's position, so it can be replaced without a lookup
+STRIDE = 4
+
+
+def kind_of(model):
+    label = model._meta.label
+    for kind, (model_label, _, _) in DOCUMENTS.items():
+        if model_label == label:
+            return kind
+    return None
+
+
+def rowid(kind, pk):
+    return pk * STRIDE + KINDS.index(kind)
+
+
+def index(obj):
+    """Add obj to the index, or replace or remove its entry after it changed."""
+    kind = kind_of(type(obj))
+    document = DOCUMENTS[kind][1](obj)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [rowid(kind, obj.pk)])
+        if document is not None:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                           [rowid(kind, obj.pk), *document])
+
+
+def unindex(obj):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [rowid(kind_of(type(obj)), obj.pk)])
+
+
+def rebuild(registry=apps):
+    """Index every product, service and salonist from scratch, returning how many were indexed."""
+    indexed = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        for kind, (label, document, _) in DOCUMENTS.items():
+            rows = []
+            for obj in registry.get_model(label).objects.iterator():
+                entry = document(obj)
+                if entry is not None:
+                    rows.append([rowid(kind, obj.pk), *entry])
+            cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)", rows)
+            indexed += len(rows)
+    return indexed
+
+
+def match_expression(q):
+    """
+    The FTS5 query for what the user typed: every word must match the start of a word, in any order.
+
+    Only word characters are kept, so quotes and operators in the input can't break the query.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', q or ''))
+
+
+def search(q, kinds=KINDS, limit=SEARCH_LIMIT):
+    """
+    Search the index for q, returning {kind: Hits} with the best limit objects of each kind, best
+    first, and the number of matches.
+
+    One ranked query finds every match, then one query per kind loads its rows, the counts come with
+    the matches instead of from separate count queries.
+    """
+    ranked = {kind: [] for kind in kinds}
+    expression = match_expression(q)
+    if expression:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                           f"ORDER BY bm25({SEARCH_TABLE}, {TITLE_WEIGHT}, {BODY_WEIGHT})", [expression])
+            for (row,) in cursor.fetchall():
+                pk, position = divmod(row, STRIDE)
+                if KINDS[position] in ranked:
+                    ranked[KINDS[position]].append(pk)
+    hits = {}
+    for kind, pks in ranked.items():
+        label, _, related = DOCUMENTS[kind]
+        objects = apps.get_model(label).objects.select_related(*related).in_bulk(pks[:limit]) if pks else {}
+        hits[kind] = Hits([objects[pk] for pk in pks[:limit] if pk in objects], len(pks))
+    return hits
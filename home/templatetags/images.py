@@ -0,0 +1,30 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from utils.images import formats, variant_urls
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, variant, **attrs):
+    """
+    The variant of an uploaded image: {% picture object.image 'avatar' class="avatar-img" alt=object.name %}
+
+    WebP for the browsers that take it and JPEG for the others, or the original upload until the variant
+    has been generated.
+    """
+    if not image:
+        return ''
+    urls = variant_urls(image, variant)
+    if urls is None:
+        return format_html('<img src="{}"{}>', image.url, flatatt(attrs))
+    *sources, (fallback, _) = formats()
+    if not sources:
+        return format_html('<img src="{}" loading="lazy"{}>', urls[fallback], flatatt(attrs))
+    # display: contents lays the img out as if it were the picture's parent's child
+    return format_html('<picture style="display: contents">{}<img src="{}" loading="lazy"{}></picture>',
+                       format_html_join('', '<source srcset="{}" type="image/{}">',
+                                        ((urls[extension], extension) for extension, _ in sources)),
+                       urls[fallback], flatatt(attrs))
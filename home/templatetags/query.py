@@ -0,0 +1,16 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def query_string(context, name, value=None):
+    """
+    The current query string with name set to value, or dropped without one, keeping every other
+    parameter: <a href="?{% query_string 'orders' page.next_cursor %}">
+    """
+    query = context['request'].GET.copy()
+    query.pop(name, None)
+    if value not in (None, ''):
+        query[name] = value
+    return query.urlencode()
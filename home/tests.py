@@ -1,3 +1,308 @@
+import datetime
+import gzip
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import brotli
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from django.template import Context, Template
 from django.test import TestCase
+from django.urls import reverse
+
+from customer.models import Customer, CustomerActivity
+from home import autocomplete, search
+from home.models import MediaBlob
+from salon.query_budgets import BUDGETS
+from salonist.models import Salonist, Service
+from service.models import Appointment
+from store.models import Order, Product
+from utils import images, querybudget, staticfiles, synthetic
+
+
+class SearchTest(TestCase):
+
+    def setUp(self):
+        self.shampoo = Product.objects.create(name="Argan Shampoo", price=900, image="product/shampoo.jpg",
+                                              description="Washes gently")
+        self.conditioner = Product.objects.create(name="Conditioner", price=700, image="product/conditioner.jpg",
+                                                  description="Use after the argan shampoo")
+        self.braids = Service.objects.create(name="Box Braids", price=2500,
+                                             description="Knotless braids, any length")
+        self.salonist = Salonist.objects.create(email="amani@example.com", username="amani",
+                                                first_name="Amani", last_name="Wanjiru")
+
+    def test_prefix_matches_are_ranked_by_title(self):
+        hits = search.search("argan sham")
+        self.assertEqual(hits['product'].objects, [self.shampoo, self.conditioner])
+        self.assertEqual(hits['product'].count, 2)
+        self.assertEqual(search.search("brai")['service'].objects, [self.braids])
+        self.assertEqual(search.search("wanj")['salonist'].objects, [self.salonist])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.shampoo.name = "Argan Oil"
+        self.shampoo.description = ""
+        self.shampoo.save()
+        self.assertEqual(search.search("shampoo")['product'].objects, [self.conditioner])
+        self.conditioner.delete()
+        self.assertEqual(search.search("shampoo")['product'].count, 0)
+        self.salonist.is_active = False
+        self.salonist.save()
+        self.assertEqual(search.search("amani")['salonist'].count, 0)
+        self.assertEqual(search.rebuild(), 2)
+
+    def test_search_view_counts_every_kind_without_count_queries(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('home:search'), {'search': 'a" (*'})
+        self.assertEqual(response.context['count'], 4)
+        self.assertEqual(search.search('" OR')['product'].count, 0)
+
+
+class AutocompleteTest(TestCase):
+
+    def setUp(self):
+        self.shampoo = Product.objects.create(name="Argan Shampoo", price=900, is_active=True)
+        self.argan = Service.objects.create(name="Argan Oil Treatment", description="Oil", price=1500, is_active=True)
+        Product.objects.create(name="Argan Mask", price=500)
+        self.salonist = Salonist.objects.create(email="shani@example.com", username="shani",
+                                                first_name="Shani", last_name="Otieno")
+        autocomplete.index.build()
+
+    def complete(self, q):
+        return [(result['kind'], result['id']) for result in
+                self.client.get(reverse('home:autocomplete'), {'q': q}).json()['results']]
+
+    def test_names_starting_with_the_prefix_come_first(self):
+        self.assertEqual(self.complete("ARG"), [('service', self.argan.pk), ('product', self.shampoo.pk)])
+        self.assertEqual(self.complete("sha"), [('salonist', self.salonist.pk), ('product', self.shampoo.pk)])
+        self.assertEqual(self.complete("argan oil t"), [('service', self.argan.pk)])
+        self.assertEqual(self.complete(" "), [])
+
+    def test_saves_and_deletes_update_the_index(self):
+        self.shampoo.name = "Coconut Shampoo"
+        self.shampoo.save()
+        self.assertEqual(self.complete("argan"), [('service', self.argan.pk)])
+        self.assertEqual(self.complete("coco"), [('product', self.shampoo.pk)])
+        self.argan.is_archived = True
+        self.argan.save()
+        self.shampoo.delete()
+        self.assertEqual(self.complete("argan"), [])
+        self.assertEqual(self.complete("coco"), [])
+
+
+class QueryBudgetTest(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+
+    def test_every_route_has_a_budget_it_keeps_as_rows_grow(self):
+        self.assertEqual([route for route in querybudget.named_routes() if route not in BUDGETS], [])
+        with self.settings(IMAGE_WORKERS=0, RECEIPT_WORKERS=0, RECEIPTS_ROOT=self.root.name):
+            results = querybudget.run(BUDGETS)
+        self.assertEqual([result.route for result in results if querybudget.failures(result)], [],
+                         querybudget.report(results, BUDGETS))
+
+    def test_growth_fails_unless_known(self):
+        result = querybudget.Result('home:index', '/', 200, 2, 4, querybudget.Budget(4))
+        self.assertEqual(querybudget.failures(result), ["2 -> 4 queries for 2 -> 6 rows"])
+        result = result._replace(budget=querybudget.Budget(3, known="lists every review"))
+        self.assertEqual(querybudget.failures(result), ["4 queries over the budget of 3"])
+
+
+class GenerateDataTest(TestCase):
+    volume = {'managers': 1, 'finance': 1, 'stock': 1, 'customers': 20, 'salonists': 3, 'trainees': 5,
+              'services': 4, 'products': 10, 'orders': 40, 'bookings': 60, 'trainings': 2}
+
+    def generate(self):
+        generator = synthetic.Generator(self.volume, seed=7, until=datetime.date(2022, 6, 1), days=30)
+        generator.generate()
+        return generator
+
+    def test_writes_what_the_signals_would_have(self):
+        generator = self.generate()
+        self.assertEqual(generator.written['customer.Customer'], 20)
+        self.assertEqual(Customer.objects.filter(customerprofile__isnull=False, activity__isnull=False).count(), 20)
+        fields = ['orders', 'bookings', 'appointments', 'payments', 'lifetime_spend']
+        generated = list(CustomerActivity.objects.order_by('pk').values_list(*fields))
+        for customer in Customer.objects.all():
+            CustomerActivity.refresh(customer.pk, touch=False)
+        self.assertEqual(list(CustomerActivity.objects.order_by('pk').values_list(*fields)), generated)
+        for product in Product.objects.annotate(count=Count('review'), total=Coalesce(Sum('review__rating'), 0)):
+            self.assertEqual((product.rating_count, product.rating_sum), (product.count, product.total))
+        real = {f'real_{field}': value for field, value in Order.totals_expressions().items()}
+        for order in Order.objects.annotate(**real):
+            self.assertEqual(order.cart_items, order.real_cart_items)
+            self.assertAlmostEqual(order.cart_total, order.real_cart_total, places=2)
+
+    def test_appointments_do_not_overlap(self):
+        self.generate()
+        appointments = list(Appointment.objects.order_by('salonist', 'date'))
+        self.assertTrue(appointments)
+        for first, second in zip(appointments, appointments[1:]):
+            if first.salonist_id == second.salonist_id:
+                self.assertLessEqual(first.stop_date, second.date)
+
+    def test_same_seed_same_rows(self):
+        runs = []
+        for _ in range(2):
+            with transaction.atomic():
+                self.generate()
+                runs.append(list(Order.objects.order_by('pk').values_list(
+                    'customer__email', 'transaction_id', 'cart_total')))
+                transaction.set_rollback(True)
+        self.assertTrue(runs[0])
+        self.assertEqual(runs[0], runs[1])
+
+
+class ImageVariantTest(TestCase):
+
+    def setUp(self):
+        from PIL import Image
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.root = Path(media.name)
+        (self.root / 'product').mkdir()
+        Image.new('RGBA', (800, 400), (200, 0, 0, 128)).save(self.root / 'product' / 'comb.png')
+        images._ready.clear()
+        images._broken.clear()
+        settings = self.settings(MEDIA_ROOT=media.name, IMAGE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def size(self, name):
+        from PIL import Image
+
+        with Image.open(self.root / name) as image:
+            return image.format, image.mode, image.size
+
+    def test_uploads_get_resized_renditions_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="Comb", price=100, image='product/comb.png')
+        self.assertEqual(self.size('product/comb.avatar.jpg'), ('JPEG', 'RGB', (96, 96)))
+        self.assertEqual(self.size('product/comb.thumb.jpg'), ('JPEG', 'RGB', (320, 160)))
+        self.assertEqual(self.size('product/comb.large.jpg')[2], (800, 400))
+        if 'webp' in dict(images.formats()):
+            self.assertEqual(self.size('product/comb.avatar.webp'), ('WEBP', 'RGBA', (96, 96)))
+
+    def test_tag_picks_the_rendition_and_falls_back_to_the_original(self):
+        template = Template("{% load images %}{% picture product.image 'card' class='img-fluid' alt=product.name %}")
+        html = template.render(Context({'product': Product(name="Comb", image='product/comb.png')}))
+        self.assertIn('<img src="/media/product/comb.card.jpg" loading="lazy"', html)
+        self.assertIn(' class="img-fluid"', html)
+        if 'webp' in dict(images.formats()):
+            self.assertIn('<source srcset="/media/product/comb.card.webp" type="image/webp">', html)
+        html = template.render(Context({'product': Product(name="Gel", image='product/gel.png')}))
+        self.assertTrue(html.startswith('<img src="/media/product/gel.png"'))
+        self.assertEqual(template.render(Context({'product': Product(name="Gel")})), '')
+
+
+class MediaStorageTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.root = Path(media.name)
+        settings = self.settings(MEDIA_ROOT=media.name, IMAGE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def stored(self):
+        return sorted(path.relative_to(self.root).as_posix() for path in self.root.rglob('*') if path.is_file())
+
+    def test_the_same_upload_is_stored_once_and_collected_when_unused(self):
+        comb = Product.objects.create(name="Comb", price=100, image=SimpleUploadedFile('comb.png', b'comb'))
+        again = Product.objects.create(name="Comb", price=100, image=SimpleUploadedFile('COMB.PNG', b'comb'))
+        self.assertEqual(comb.image.name, again.image.name)
+        self.assertTrue(comb.image.name.startswith('blobs/'))
+        self.assertEqual(self.stored(), [comb.image.name])
+        self.assertEqual(MediaBlob.objects.get().references, 2)
+
+        comb.delete()
+        again = Product.objects.get(pk=again.pk)
+        again.image = SimpleUploadedFile('gel.png', b'gel')
+        again.save()
+        self.assertEqual(dict(MediaBlob.objects.values_list('name', 'references')),
+                         {comb.image.name: 0, again.image.name: 1})
+
+        call_command('collect_media', stdout=io.StringIO())
+        self.assertEqual(len(self.stored()), 2)
+        call_command('collect_media', grace=0, stdout=io.StringIO())
+        self.assertEqual(self.stored(), [again.image.name])
+        self.assertEqual(list(MediaBlob.objects.values_list('name', flat=True)), [again.image.name])
+
+    def test_existing_uploads_are_deduplicated_in_place(self):
+        (self.root / 'product').mkdir()
+        for name, content in (('a.png', b'comb'), ('b.png', b'comb'), ('c.png', b'gel')):
+            (self.root / 'product' / name).write_bytes(content)
+        products = [Product.objects.create(name=name, price=100, image=f'product/{name}.png') for name in 'abc']
+        call_command('dedupe_media', dry_run=True, stdout=io.StringIO())
+        self.assertEqual(len(self.stored()), 3)
+        # a run interrupted before the rows are repointed leaves them on their files
+        with mock.patch.object(MediaBlob.objects, 'get_or_create', side_effect=KeyboardInterrupt), \
+                self.assertRaises(KeyboardInterrupt):
+            call_command('dedupe_media', stdout=io.StringIO())
+        self.assertEqual(Product.objects.get(pk=products[0].pk).image.name, 'product/a.png')
+        self.assertTrue((self.root / 'product' / 'a.png').exists())
+
+        out = io.StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertIn("Moved 1 file(s) into blobs/ and removed 2 duplicate(s)", out.getvalue())
+        a, b, c = (Product.objects.get(pk=product.pk).image.name for product in products)
+        self.assertEqual(a, b)
+        self.assertEqual(self.stored(), sorted([a, c]))
+        self.assertEqual((self.root / c).read_bytes(), b'gel')
+        self.assertEqual(dict(MediaBlob.objects.values_list('name', 'references')), {a: 2, c: 1})
+
+
+class StaticFilesTest(TestCase):
+
+    def setUp(self):
+        static, media = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(static.cleanup)
+        self.addCleanup(media.cleanup)
+        self.css = b"body { color: #333; }\n" * 100
+        Path(static.name, 'site.css').write_bytes(self.css)
+        staticfiles.compress(Path(static.name, 'site.css'))
+        Path(media.name, 'blobs').mkdir()
+        Path(media.name, 'blobs', 'a.jpg').write_bytes(b'0123456789')
+        settings = self.settings(STATIC_ROOT=static.name, MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_compressed_variant_for_browsers_accepting_it(self):
+        response = self.client.get('/static/site.css', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual((response['Content-Encoding'], response['Content-Type']), ('gzip', 'text/css'))
+        self.assertEqual(gzip.decompress(self.body(response)), self.css)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response = self.client.get('/static/site.css', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(self.body(response)), self.css)
+        response = self.client.get('/static/site.css')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(self.body(response), self.css)
+
+    def test_etag_revalidation_and_ranges(self):
+        response = self.client.get('/media/blobs/a.jpg')
+        self.assertEqual(self.body(response), b'0123456789')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={staticfiles.ONE_YEAR}, immutable')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/media/blobs/a.jpg', HTTP_IF_NONE_MATCH=etag).status_code, 304)
 
-# Create your tests here.
+        response = self.client.get('/media/blobs/a.jpg', HTTP_RANGE='bytes=2-4')
+        self.assertEqual((response.status_code, response['Content-Range']), (206, 'bytes 2-4/10'))
+        self.assertEqual(self.body(response), b'234')
+        self.assertEqual(self.body(self.client.get('/media/blobs/a.jpg', HTTP_RANGE='bytes=-3')), b'789')
+        response = self.client.get('/media/blobs/a.jpg', HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/media/blobs/a.jpg', HTTP_RANGE='bytes=20-').status_code, 416)
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('search/', views.search, name="search"),
+    path('autocomplete/', views.autocomplete, name="autocomplete"),
     path('term_condition/', views.term_condition, name="term_condition"),
     path('privacy-policy/', views.privacy_policy, name="privacy_policy"),
     path('about-us/', views.about_us, name="about-us"),
@@ -1,10 +1,13 @@
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.views.generic import ListView
 
 from salonist.models import Salonist
 from service.models import Service
-from store.models import Product, Order
-from django.db.models import Q
+from store.models import Product
+
+from .autocomplete import index as prefix_index, suggestion_url
+from .search import search as search_index
 
 
 class Home(ListView):
@@ -14,13 +17,7 @@ class Home(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['object_list'] = self.object_list.filter(is_active=True, is_archived=False)
-        context['products'] = Product.objects.filter(is_active=True, is_archived=False)
-        if self.request.user.is_authenticated and self.request.user.is_customer:
-            customer = self.request.user.customer
-            order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-        else:
-            order = {}
-        context['order'] = order
+        context['products'] = Product.objects.filter(is_active=True, is_archived=False).by_rating()
         return context
 
 
@@ -30,54 +27,36 @@ class Salonists(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(is_active=True, is_archived=False)
-        if self.request.user.is_authenticated and self.request.user.is_customer:
-            customer = self.request.user.customer
-            order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-        else:
-            order = {}
-        context['order'] = order
+        context['object_list'] = self.object_list.filter(is_active=True, is_archived=False) \
+            .select_related('salonistprofile')
         return context
 
 
 def privacy_policy(request):
-    if request.user.is_authenticated and request.user.is_customer:
-        customer = request.user.customer
-        order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-    else:
-        order = {}
-    return render(request, "home/privacy-policy.html", {'order': order})
+    return render(request, "home/privacy-policy.html")
 
 
 def about_us(request):
-    if request.user.is_authenticated and request.user.is_customer:
-        customer = request.user.customer
-        order = Order.objects.filter(customer=customer, is_active=True, completed=False).first()
-    else:
-        order = {}
-    return render(request, "home/about-us.html", {'order': order})
+    return render(request, "home/about-us.html")
 
 
 def search(request):
     q = request.GET.get('search')
-    services = Service.objects.filter(
-        Q(name__icontains=q) | Q(description__icontains=q))
-    services_count = Service.objects.filter(
-        Q(name__icontains=q) | Q(description__icontains=q)).count()
-    products = Product.objects.filter(
-        Q(name__icontains=q) | Q(description__icontains=q))
-    products_count = Product.objects.filter(
-        Q(name__icontains=q) | Q(description__icontains=q)).count()
-    salonists = Salonist.objects.filter(
-        Q(first_name__icontains=q) | Q(last_name__icontains=q) & Q(is_active=True))
-    salonists_count = Salonist.objects.filter(
-        Q(first_name__icontains=q) | Q(last_name__icontains=q) & Q(is_active=True)).count()
-    count = services_count + products_count + salonists_count
+    hits = search_index(q)
     context = {
-        'services': services, 'products': products, 'search': q, 'salonists': salonists, 'count': count,
+        'services': hits['service'].objects, 'products': hits['product'].objects, 'search': q,
+        'salonists': hits['salonist'].objects, 'count': sum(kind.count for kind in hits.values()),
     }
     return render(request, 'home/search.html', context)
 
 
+def autocomplete(request):
+    data = {'results': [
+        {'kind': suggestion.kind, 'id': suggestion.id, 'label': suggestion.label, 'url': suggestion_url(suggestion)}
+        for suggestion in prefix_index.complete(request.GET.get('q', ''))
+    ]}
+    return JsonResponse(data)
+
+
 def term_condition(request):
     return render(request, "home/term-condition.html")
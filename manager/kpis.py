@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Subquery, Sum, Value
+from django.utils import timezone
+
+KPIS_KEY = 'manager:kpis'
+KPIS_TIMEOUT = 60
+
+
+def percent(part, whole):
+    return int(part / whole * 100) if whole else 0
+
+
+def scalar(queryset, aggregate):
+    """The aggregate of the whole queryset as a one row subquery."""
+    # grouped by a constant, which Django leaves out of the GROUP BY, rather than by every column
+    return Subquery(queryset.order_by().values(all=Value(1)).values(value=aggregate)[:1])
+
+
+def compute_kpis():
+    """
+    Every manager dashboard metric from one conditional aggregate query.
+
+    Salonists and customers are both CustomUser rows, counted through their child tables, appointments
+    and booking payments are folded in as scalar subqueries. Max() only lifts those into the aggregate,
+    there's always a row for it as the manager looking at the dashboard is a CustomUser too.
+    """
+    from service.models import Appointment, BookingPayment
+    from user.models import CustomUser
+
+    kpis = CustomUser.objects.aggregate(
+        salonists_total=Count('salonist'),
+        salonists_count=Count('salonist', filter=Q(is_active=True)),
+        customers_total=Count('customer'),
+        customers_count=Count('customer', filter=Q(is_active=True)),
+        appointments_total=Max(scalar(Appointment.objects.all(), Count('pk'))),
+        appointment_count=Max(scalar(Appointment.objects.filter(stop_date__gt=timezone.now()), Count('pk'))),
+        total_amount=Max(scalar(BookingPayment.objects.all(), Sum('amount'))),
+    )
+    for key in ('appointments_total', 'appointment_count'):
+        kpis[key] = kpis[key] or 0
+    kpis['total_amount'] = kpis['total_amount'] or 0.0
+    kpis['salonists_per'] = percent(kpis['salonists_count'], kpis['salonists_total'])
+    kpis['customers_per'] = percent(kpis['customers_count'], kpis['customers_total'])
+    kpis['appointment_per'] = percent(kpis['appointment_count'], kpis['appointments_total'])
+    return kpis
+
+
+def get_kpis():
+    """Cached dashboard metrics, dropped by signals whenever one of the counted tables changes."""
+    kpis = cache.get(KPIS_KEY)
+    if kpis is None:
+        kpis = compute_kpis()
+        cache.set(KPIS_KEY, kpis, KPIS_TIMEOUT)
+    return kpis
+
+
+def invalidate_kpis():
+    cache.delete(KPIS_KEY)
@@ -1,7 +1,8 @@
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from user.models import CustomUser, Profile, Feedback
+from .kpis import invalidate_kpis
 
 
 class Manager(CustomUser):
@@ -34,3 +35,15 @@ def manager_profile(sender, instance, created, **kwargs):
         ManagerProfile.objects.create(user=instance)
         instance.managerprofile.save()
 
+
+# the dashboard metrics are cached, drop them whenever a counted table changes
+@receiver(post_save, sender='customer.Customer')
+@receiver(post_save, sender='salonist.Salonist')
+@receiver(post_save, sender='service.Appointment')
+@receiver(post_save, sender='service.BookingPayment')
+@receiver(post_delete, sender='customer.Customer')
+@receiver(post_delete, sender='salonist.Salonist')
+@receiver(post_delete, sender='service.Appointment')
+@receiver(post_delete, sender='service.BookingPayment')
+def manager_kpis(sender, **kwargs):
+    invalidate_kpis()
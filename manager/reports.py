@@ -0,0 +1,52 @@
+from utils.reports import Report
+
+
+def salonist_status(salonist):
+    if salonist.is_active and salonist.is_verified:
+        return "Archived" if salonist.is_archived else "Active"
+    if salonist.is_active and not salonist.is_archived:
+        return "Unverified"
+    return ""
+
+
+PRODUCTS_REPORT = Report("Products", 'manager/receipts/products.html', "products", [
+    ("Product Name", lambda product: product.name),
+    ("Description", lambda product: product.description),
+    ("Quantity", lambda product: product.quantity),
+    ("Price", lambda product: product.price),
+    ("Date", lambda product: product.created),
+])
+SALONISTS_REPORT = Report("Salonists", 'manager/receipts/salonists.html', "salonists", [
+    ("Salonist Name", lambda salonist: salonist.get_full_name),
+    ("Email", lambda salonist: salonist.email),
+    ("Phone", lambda salonist: str(salonist.salonistprofile.phone_number or "")),
+    ("Status", salonist_status),
+    ("Date", lambda salonist: salonist.created),
+])
+TRAINING_COLUMNS = [
+    ("Service", lambda training: training.service.name),
+    ("Salonist", lambda training: training.salonist.get_full_name),
+    ("Price", lambda training: training.price),
+    ("Start Date", lambda training: training.date),
+    ("End Date", lambda training: training.end_date),
+    ("Status", lambda training: "Approved" if training.is_active else "Pending"),
+]
+TRAINING_REPORT = Report("Trainings", 'manager/receipts/training.html', "training", TRAINING_COLUMNS)
+PENDING_TRAINING_REPORT = Report("Pending Trainings", 'manager/receipts/pending_training.html', "pending-training",
+                                 TRAINING_COLUMNS)
+APPLICATION_COLUMNS = [
+    ("Code", lambda application: application.code),
+    ("Service", lambda application: application.training.service.name),
+    ("Salonist", lambda application: application.training.salonist.get_full_name),
+    ("Trainee", lambda application: application.trainee.get_full_name),
+    ("Price", lambda application: application.training.price),
+    ("Start Date", lambda application: application.training.date),
+    ("End Date", lambda application: application.training.end_date),
+    ("Status", lambda application: "Approved" if application.is_approved else "Pending"),
+]
+APPROVED_APPLICATIONS_REPORT = Report("Approved Training Applications",
+                                      'manager/receipts/approved_training_application.html',
+                                      "approved-training-applications", APPLICATION_COLUMNS)
+PENDING_APPLICATIONS_REPORT = Report("Pending Training Applications",
+                                     'manager/receipts/pending_training_application.html',
+                                     "pending-training-applications", APPLICATION_COLUMNS)
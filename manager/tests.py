@@ -1,6 +1,169 @@
-from django.test import TestCase
+import io
+import tempfile
+from pathlib import Path
 
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
 
-def application(env, start_response):
-    start_response('200 OK', [('Content-Type', 'text/html')])
-    return [b"Hello World"]  # python3
+from customer.models import Customer
+from manager.kpis import compute_kpis, get_kpis
+from manager.models import Manager
+from manager.reports import PRODUCTS_REPORT
+from manager.views import CustomersListView
+from service.models import Booking, BookingPayment, Service
+from store.models import Product
+from utils.metrics import MetricsMiddleware, registry
+from utils.reports import chunks
+
+
+class ManagerKpisTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_empty_database(self):
+        with self.assertNumQueries(1):
+            kpis = compute_kpis()
+        self.assertEqual((kpis['customers_per'], kpis['salonists_per'], kpis['total_amount']), (0, 0, 0.0))
+
+    def test_cached_and_invalidated(self):
+        self.assertEqual(get_kpis()['customers_count'], 0)
+        with self.assertNumQueries(0):
+            get_kpis()
+        Customer.objects.create(email="new@example.com", username="new")
+        kpis = get_kpis()
+        self.assertEqual((kpis['customers_count'], kpis['customers_per']), (1, 100))
+
+    def test_payments_in_the_same_query(self):
+        customer = Customer.objects.create(email="new@example.com", username="new")
+        booking = Booking.objects.create(transaction_id="T1", customer=customer,
+                                         service=Service.objects.create(name="Braids", description="", price=1500))
+        BookingPayment.objects.bulk_create([BookingPayment(booking=booking, customer=customer, mpesa="M1", amount=1000),
+                                            BookingPayment(booking=booking, customer=customer, mpesa="M2", amount=500)])
+        with self.assertNumQueries(1):
+            kpis = compute_kpis()
+        self.assertEqual((kpis['total_amount'], kpis['appointments_total'], kpis['customers_total']), (1500, 0, 1))
+
+
+class ReportTest(TestCase):
+
+    def setUp(self):
+        Product.objects.bulk_create([Product(name=f"Product {number}", slug=f"product-{number}", price=number,
+                                             quantity=number, description="") for number in range(7)])
+
+    def test_chunks_are_bounded_queries(self):
+        with self.assertNumQueries(3):
+            sizes = [len(chunk) for chunk in chunks(Product.objects.all(), size=3)]
+        self.assertEqual(sizes, [3, 3, 1])
+
+    def test_csv_is_streamed(self):
+        response = PRODUCTS_REPORT.csv(Product.objects.all())
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "Product Name,Description,Quantity,Price,Date")
+        self.assertEqual(len(lines), 8)
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+        response = PRODUCTS_REPORT.xlsx(Product.objects.all())
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook["Products"].values)
+        self.assertEqual((len(rows), rows[1][0]), (8, "Product 0"))
+
+
+class KeysetListTest(TestCase):
+
+    def setUp(self):
+        self.customers = [Customer.objects.create(email=f"customer{number}@example.com", username=f"customer{number}")
+                          for number in range(5)]
+
+    def page(self, **params):
+        response = CustomersListView.as_view(per_page=2)(RequestFactory().get('/manager/customers/', params))
+        return response.context_data['page']
+
+    def test_pages_follow_the_cursor_with_profiles_selected(self):
+        with self.assertNumQueries(1):
+            page = self.page()
+            phones = [customer.customerprofile.phone_number for customer in page]
+        self.assertEqual(len(phones), 2)
+        self.assertEqual(list(page), self.customers[:2:-1])
+        self.assertEqual(list(self.page(after=page.next_cursor)), self.customers[2:0:-1])
+        last = self.page(after=self.customers[1].pk)
+        self.assertEqual((list(last), last.has_next), ([self.customers[0]], False))
+
+
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_requests_are_recorded_per_route(self):
+        self.client.get(reverse('home:index'))
+        self.client.get(reverse('home:index'))
+        self.client.get('/no-such-page/')
+        routes = registry.as_json()['routes']
+        self.assertEqual(routes['home:index']['salon_request_seconds']['count'], 2)
+        self.assertEqual(routes['home:index']['salon_request_queries']['buckets']['+Inf'], 2)
+        self.assertGreater(routes['home:index']['salon_response_bytes']['sum'], 0)
+        self.assertIn('<unresolved>', routes)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_endpoint_needs_a_manager_or_the_token(self):
+        self.client.get(reverse('home:index'))
+        url = reverse('project_manager:metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn('salon_request_seconds_bucket{route="home:index",le="+Inf"} 1', response.content.decode())
+        self.assertIn('salon_responses_total{route="home:index",status="2xx"} 1', response.content.decode())
+
+    def test_streamed_responses_are_recorded_once_sent(self):
+        for number in range(3):
+            Product.objects.create(name=f"Product {number}", price=100)
+        request = RequestFactory().get('/report.csv')
+        response = MetricsMiddleware(lambda request: PRODUCTS_REPORT.csv(Product.objects.all()))(request)
+        self.assertEqual(registry.as_json()['routes'], {})
+        body = b''.join(response.streaming_content)
+        response.close()
+        histograms = registry.as_json()['routes']['<unresolved>']
+        self.assertEqual(histograms['salon_response_bytes']['sum'], len(body))
+        self.assertEqual(histograms['salon_request_queries']['sum'], 1)
+
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.settings(METRICS_SLOW_REQUEST=0), self.assertLogs('utils.metrics', 'WARNING'):
+            self.client.get(reverse('home:salonists'))
+        slowest = registry.as_json()['slowest']
+        self.assertEqual(slowest[0]['route'], 'home:salonists')
+        self.assertIn('SELECT', slowest[0]['sql'][0]['sql'])
+
+
+class ProfilerTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.manager = Manager.objects.create(email="manager@example.com", username="manager", is_manager=True,
+                                              is_active=True, is_verified=True, is_approved=True)
+
+    def profiles(self):
+        return list(Path(self.media.name).glob('profiles/*.folded'))
+
+    def test_managers_can_profile_a_request(self):
+        with self.settings(MEDIA_ROOT=self.media.name, PROFILE_INTERVAL=0.001):
+            self.client.get(reverse('home:index'), {'profile': 1})
+            self.assertEqual(self.profiles(), [])
+            self.client.force_login(self.manager)
+            response = self.client.get(reverse('home:salonists'), HTTP_X_PROFILE='1')
+        profile, = self.profiles()
+        self.assertEqual(response['X-Profile'], f"/media/profiles/{profile.name}")
+        self.assertIn('-home-salonists-', profile.name)
+
+    def test_rate_limited(self):
+        self.client.force_login(self.manager)
+        with self.settings(MEDIA_ROOT=self.media.name, PROFILE_RATE=1):
+            self.assertIn('X-Profile', self.client.get(reverse('home:index'), {'profile': 1}))
+            self.assertNotIn('X-Profile', self.client.get(reverse('home:index'), {'profile': 1}))
+        self.assertEqual(len(self.profiles()), 1)
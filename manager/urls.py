@@ -22,6 +22,8 @@ urlpatterns = [
     path('manager_training/', manager_required(views.TrainingListView.as_view()), name="manager_training"),
     path('manager_pending/', manager_required(views.PendingTrainingListView.as_view()),
          name="pending_manager_training"),
+    path('kpis/', manager_required(views.kpis), name="kpis"),
+    path('metrics/', views.metrics, name="metrics"),
     path('search/', manager_required(views.search), name="search"),
     path('feedback/', manager_required(views.feedback), name="feedback"),
     path('password/', manager_required(views.password_change), name="password_change"),
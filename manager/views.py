@@ -1,35 +1,39 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login, logout, update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import ImproperlyConfigured
 from django.core.mail import send_mail
-from django.db.models import Sum, Q
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
-from django.template.loader import render_to_string
 from django.urls import NoReverseMatch
-from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.utils.encoding import force_bytes, force_text
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.views import View
 from django.views.generic import ListView, CreateView
-from weasyprint import HTML
 
 from customer.models import Customer
+from home.search import search as search_index
 from manager.forms import ManagerProfileForm, ManagerForm, ManagerSignUpForm, ManagerFeedbackForm
+from manager.kpis import get_kpis
 from manager.models import Manager, ManagerFeedback
+from manager.reports import APPROVED_APPLICATIONS_REPORT, PENDING_APPLICATIONS_REPORT, PENDING_TRAINING_REPORT, \
+    PRODUCTS_REPORT, SALONISTS_REPORT, TRAINING_REPORT
 from manager.tokens import account_activation_token
 from salonist.forms import SalonistForm, SalonistSignUpForm
 from salonist.models import Salonist
 from service.forms import ServiceForm, ApprenticeshipForm, SalonistServiceForm
-from service.models import Appointment, BookingPayment, Service, Apprenticeship, SalonistService
+from service.models import Appointment, Service, Apprenticeship, SalonistService
 from store.forms import ProductForm
 from store.models import Product
 from trainee.forms import TrainingForm
 from trainee.models import Training, TrainingApplication
 from user.decorators import manager_required
 from user.models import CustomUser
+from utils.metrics import registry
+from utils.pagination import KeysetListMixin
 
 
 def error_404(request, exception):
@@ -188,50 +192,72 @@ class VerifyEmail(View):
 class Home(ListView):
     model = Manager
     template_name = "manager/index.html"
+    recent = 10
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['salonists_count'] = Salonist.objects.filter(is_active=True).count()
-        context['salonists_per'] = int((context['salonists_count'] / Salonist.objects.all().count()) * 100)
-        context['salonists'] = Salonist.objects.filter(is_active=True)
-        context['customers'] = Customer.objects.all()
-        context['customers_count'] = context['customers'].filter(is_active=True).count()
-        context['customers_per'] = int((context['customers_count'] / context['customers'].count()) * 100)
-        context['appointments'] = Appointment.objects.all()
-        context['appointment_count'] = context['appointments'].filter(stop_date__gt=timezone.now()).count()
-        context['appointment_per'] = int((context['appointment_count'] / context['appointments'].count()) * 100)
-        context['total_amount'] = BookingPayment.objects.all().aggregate(Sum('amount')).get('amount__sum', 0.00)
+        context.update(get_kpis())
+        context['salonists'] = Salonist.objects.filter(is_active=True).select_related('salonistprofile') \
+            .prefetch_related('salonistservice_set__service').order_by('-pk')[:self.recent]
+        context['customers'] = Customer.objects.select_related('customerprofile').order_by('-pk')[:self.recent]
+        context['appointments'] = Appointment.objects.select_related(
+            'salonist', 'booking__service', 'booking__customer').order_by('-date')[:self.recent]
         return context
 
 
-class CustomersListView(ListView):
+def kpis(request):
+    return JsonResponse(get_kpis())
+
+
+def metrics(request):
+    """
+    The request metrics of this worker in the Prometheus text format, or as JSON with the slowest
+    requests and their SQL given ?format=json. Open to managers, or to scrapers sending METRICS_TOKEN.
+    """
+    token = settings.METRICS_TOKEN
+    if not (token and constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}")):
+        return manager_required(render_metrics)(request)
+    return render_metrics(request)
+
+
+def render_metrics(request):
+    if request.GET.get('format') == 'json':
+        return JsonResponse(registry.as_json())
+    return HttpResponse(registry.as_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class CustomersListView(KeysetListMixin, ListView):
     model = Customer
     template_name = "manager/tables/customers-list.html"
+    related = ('customerprofile',)
 
 
-class SalonistsListView(ListView):
+class SalonistsListView(KeysetListMixin, ListView):
     model = Salonist
     template_name = "manager/tables/salonists-list.html"
+    related = ('salonistprofile',)
 
 
-class ProductsListView(ListView):
+class ProductsListView(KeysetListMixin, ListView):
     model = Product
     template_name = "manager/tables/products-list.html"
 
 
-class ServicesListView(ListView):
+class ServicesListView(KeysetListMixin, ListView):
     model = Service
     template_name = "manager/tables/services-list.html"
 
 
-class ApprenticeshipListView(ListView):
+class ApprenticeshipListView(KeysetListMixin, ListView):
     model = Apprenticeship
     template_name = "manager/tables/apprenticeship-list.html"
+    related = ('salonist__salonistprofile',)
 
 
-class SalonistServiceListView(ListView):
+class SalonistServiceListView(KeysetListMixin, ListView):
     model = SalonistService
     template_name = "manager/tables/salonists-service-list.html"
+    related = ('salonist__salonistprofile', 'service')
 
 
 class ServiceCreateView(CreateView):
@@ -463,10 +489,9 @@ def feedback(request):
 def search(request):
     q = request.GET.get('search')
     context = {}
-    products = Product.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    services = Service.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    context['products'] = products
-    context['services'] = services
+    hits = search_index(q, kinds=('product', 'service'))
+    context['products'] = hits['product'].objects
+    context['services'] = hits['service'].objects
     context['q'] = q
     return render(request, 'manager/search.html', context)
 
@@ -505,44 +530,37 @@ class TrainingCreateView(CreateView):
         return redirect('manager:add_training')
 
 
-class TrainingListView(ListView):
+class TrainingListView(KeysetListMixin, ListView):
     model = Training
     template_name = "manager/tables/training-list.html"
+    related = ('service', 'salonist')
 
-    def get_context_data(self, **kwargs):
-        context = super(TrainingListView, self).get_context_data(**kwargs)
-        context['object_list'] = self.object_list.all()
-        return context
 
-
-class PendingTrainingListView(ListView):
+class PendingTrainingListView(KeysetListMixin, ListView):
     model = Training
     template_name = "manager/tables/pending-training-list.html"
+    related = ('service', 'salonist')
 
-    def get_context_data(self, **kwargs):
-        context = super(PendingTrainingListView, self).get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(is_active=False)
-        return context
+    def get_queryset(self):
+        return super(PendingTrainingListView, self).get_queryset().filter(is_active=False)
 
 
-class ApprovedTrainingApplicationListView(ListView):
+class ApprovedTrainingApplicationListView(KeysetListMixin, ListView):
     model = TrainingApplication
     template_name = "manager/tables/approved-training-application-list.html"
+    related = ('training__service', 'training__salonist', 'trainee')
 
-    def get_context_data(self, **kwargs):
-        context = super(ApprovedTrainingApplicationListView, self).get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(is_approved=True)
-        return context
+    def get_queryset(self):
+        return super(ApprovedTrainingApplicationListView, self).get_queryset().filter(is_approved=True)
 
 
-class PendingTrainingApplicationListView(ListView):
+class PendingTrainingApplicationListView(KeysetListMixin, ListView):
     model = TrainingApplication
     template_name = "manager/tables/pending-training-application-list.html"
+    related = ('training__service', 'training__salonist', 'trainee')
 
-    def get_context_data(self, **kwargs):
-        context = super(PendingTrainingApplicationListView, self).get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(is_approved=False)
-        return context
+    def get_queryset(self):
+        return super(PendingTrainingApplicationListView, self).get_queryset().filter(is_approved=False)
 
 
 def confirm_training_application(request, application_id):
@@ -560,91 +578,34 @@ def confirm_training_application(request, application_id):
 
 
 def approved_training_application_pdf(request):
-    """Generate pdf."""
-    # Model data
-    data = {'object_list': TrainingApplication.objects.filter(is_approved=True)}
-    # Rendered
-    html_string = render_to_string('manager/receipts/approved_training_application.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename=approved-training-applications.pdf "
-    return response
+    """Generate pdf, or csv and xlsx with ?format=."""
+    return APPROVED_APPLICATIONS_REPORT.response(request, TrainingApplication.objects.filter(is_approved=True)
+                                                 .select_related('training__service', 'training__salonist', 'trainee'))
 
 
 def pending_training_application_pdf(request):
-    """Generate pdf."""
-    # Model data
-    data = {'object_list': TrainingApplication.objects.filter(is_approved=False)}
-    # Rendered
-    html_string = render_to_string('manager/receipts/pending_training_application.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename=pending-training-applications.pdf "
-    return response
+    """Generate pdf, or csv and xlsx with ?format=."""
+    return PENDING_APPLICATIONS_REPORT.response(request, TrainingApplication.objects.filter(is_approved=False)
+                                                .select_related('training__service', 'training__salonist', 'trainee'))
 
 
 def pending_training_pdf(request):
-    """Generate pdf."""
-    # Model data
-    data = {'object_list': Training.objects.filter(is_active=False)}
-    # Rendered
-    html_string = render_to_string('manager/receipts/pending_training.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename=pending-training.pdf "
-    return response
+    """Generate pdf, or csv and xlsx with ?format=."""
+    return PENDING_TRAINING_REPORT.response(
+        request, Training.objects.filter(is_active=False).select_related('service', 'salonist'))
 
 
 def training_pdf(request):
-    """Generate pdf."""
-    # Model data
-    data = {'object_list': Training.objects.all()}
-    # Rendered
-    html_string = render_to_string('manager/receipts/training.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename=training.pdf "
-    return response
+    """Generate pdf, or csv and xlsx with ?format=."""
+    return TRAINING_REPORT.response(request, Training.objects.select_related('service', 'salonist'))
 
 
 def salonists_pdf(request):
-    """Generate pdf."""
-    # Model data
-    data = {'object_list': Salonist.objects.all()}
-    # Rendered
-    html_string = render_to_string('manager/receipts/salonists.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename=salonists.pdf "
-    return response
+    """Generate pdf, or csv and xlsx with ?format=."""
+    return SALONISTS_REPORT.response(request, Salonist.objects.select_related('salonistprofile'))
 
 
 def products_pdf(request):
-    """Generate pdf."""
-    # Model data
-    data = {'object_list': Product.objects.all()}
-    # Rendered
-    html_string = render_to_string('manager/receipts/products.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename=products.pdf "
-    return response
+    """Generate pdf, or csv and xlsx with ?format=."""
+    return PRODUCTS_REPORT.response(request, Product.objects.all())
 
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'salon.settings')
 
 application = get_asgi_application()
+
+from home.autocomplete import warm_up  # noqa: E402, needs the apps loaded by get_asgi_application
+
+warm_up()
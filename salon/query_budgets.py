@@ -0,0 +1,197 @@
+"""
+The query budget of every named route, checked by home.tests.QueryBudgetTest against a seeded dataset.
+
+A budget is the most queries the route may run with utils.querybudget.LARGE_ROWS rows of everything,
+a route whose count still grows with the rows is marked known with the reason until it is fixed.
+Run `python manage.py query_budget` for the report.
+"""
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from utils.querybudget import Budget
+
+
+def verify(role):
+    return lambda dataset: {'uidb64': urlsafe_base64_encode(force_bytes(getattr(dataset, role).pk)),
+                            'token': 'expired'}
+
+
+def order_payment(dataset):
+    return {'order_id': dataset.order_payment.pk}
+
+
+def booking_payment(dataset):
+    return {'booking_id': dataset.booking_payment.pk}
+
+
+def product(dataset):
+    return {'slug': dataset.product.slug}
+
+
+def service(dataset):
+    return {'service_id': dataset.service.pk}
+
+
+def search(dataset):
+    return {'search': 'seeded'}
+
+
+BUDGETS = {
+    # finance
+    'finance:confirm_order_payment': Budget(14, order_payment),
+    'finance:confirm_booking_payment': Budget(14, booking_payment),
+    'finance:confirm_training_payment': Budget(15, lambda dataset: {'slug': dataset.training_payment.pk}),
+    'finance:revenue_report': Budget(6),
+    'finance:search': Budget(5, query=search, skip="finance/search.html doesn't exist"),
+    'finance:feedback': Budget(4),
+    'finance:password_change': Budget(4),
+    'finance:faq': Budget(2, skip="finance/faq.html doesn't exist"),
+    'finance:profile_main': Budget(4),
+    'finance:booking_payment': Budget(5),
+    'finance:pending_booking_payment': Budget(5),
+    'finance:order_payment': Budget(5),
+    'finance:pending_order_payment': Budget(5),
+    'finance:pending_payment': Budget(5),
+    'finance:payment': Budget(5),
+    'finance:login': Budget(2),
+    'finance:register': Budget(2),
+    'finance:verify': Budget(1, verify('finance')),
+    'finance:index': Budget(5),
+    # manager
+    'manager:add_training': Budget(5),
+    'manager:confirm_training_application': Budget(8, lambda dataset: {'application_id': dataset.application.pk}),
+    'manager:approved_training_application_pdf': Budget(4),
+    'manager:pending_training_application_pdf': Budget(4),
+    'manager:pending_training_pdf': Budget(4),
+    'manager:training_pdf': Budget(4),
+    'manager:salonists_pdf': Budget(4),
+    'manager:products_pdf': Budget(4),
+    'manager:manager_training_application': Budget(5),
+    'manager:manager_pending_training_application': Budget(5),
+    'manager:manager_training': Budget(5),
+    'manager:pending_manager_training': Budget(5),
+    'manager:kpis': Budget(5),
+    'manager:metrics': Budget(4),
+    'manager:search': Budget(5, query=search, skip="manager/search.html doesn't exist"),
+    'manager:feedback': Budget(4),
+    'manager:password_change': Budget(4),
+    'manager:faq': Budget(2, skip="manager/faq.html doesn't exist"),
+    'manager:profile_main': Budget(4),
+    'manager:create_salonist_service': Budget(6),
+    'manager:salonist_service_list': Budget(5),
+    'manager:apprenticeships': Budget(5),
+    'manager:create_apprenticeship': Budget(5),
+    'manager:create_salonist': Budget(4),
+    'manager:create_product': Budget(4),
+    'manager:create_service': Budget(4),
+    'manager:services': Budget(5),
+    'manager:products': Budget(5),
+    'manager:salonists': Budget(5),
+    'manager:customers': Budget(5),
+    'manager:login': Budget(2),
+    'manager:register': Budget(2),
+    'manager:verify': Budget(1, verify('manager')),
+    'manager:index': Budget(10),
+    # salonist
+    'salonist:confirm_order_payment': Budget(14, order_payment),
+    'salonist:confirm_booking_payment': Budget(14, booking_payment),
+    'salonist:search': Budget(5, query=search, skip="salonist/search.html doesn't exist"),
+    'salonist:feedback': Budget(4),
+    'salonist:password_change': Budget(4),
+    'salonist:faq': Budget(2, skip="salonist/faq.html doesn't exist"),
+    'salonist:profile_main': Budget(5),
+    'salonist:schedule_appointment': Budget(5),
+    'salonist:appointment_list': Budget(5),
+    'salonist:apprenticeship_list': Budget(6),
+    'salonist:add_training': Budget(5),
+    'salonist:salonist_training': Budget(5),
+    'salonist:login': Budget(2),
+    'salonist:register': Budget(2),
+    'salonist:verify': Budget(1, verify('salonist')),
+    'salonist:index': Budget(5),
+    # customer
+    'customer:order_payment': Budget(4, lambda dataset: {'pk': dataset.order_payment.pk}),
+    'customer:appointment': Budget(6),
+    'customer:service-detail': Budget(4, lambda dataset: {'pk': dataset.service.pk}),
+    'customer:product-detail': Budget(5, product),
+    'customer:book_appointment': Budget(2),
+    'customer:appointment_slots': Budget(6, query=lambda dataset: {'booking': dataset.booking.pk}),
+    'customer:generate_booking_receipt_pdf': Budget(3, lambda dataset: {'slug': dataset.booking.pk}),
+    'customer:generate_appointment_receipt_pdf': Budget(6, lambda dataset: {'slug': dataset.appointment.pk}),
+    'customer:generate_order_receipt_pdf': Budget(5, lambda dataset: {'slug': dataset.order.pk}),
+    'customer:generate_order_payment_receipt_pdf': Budget(3, lambda dataset: {'slug': dataset.order_payment.pk}),
+    'customer:generate_booking_payment_receipt_pdf': Budget(3, lambda dataset: {'slug': dataset.booking_payment.pk}),
+    'customer:book_hairstyle': Budget(5, service),
+    'customer:booking_payment': Budget(3, service),
+    'customer:booking_checkout': Budget(6),
+    'customer:order_list': Budget(5),
+    'customer:checkout_pay': Budget(4),
+    'customer:checkout': Budget(7),
+    'customer:update_cart': Budget(2),
+    'customer:clear_cart': Budget(6),
+    'customer:increase_quantity': Budget(9, product),
+    'customer:decrease_quantity': Budget(9, product),
+    'customer:remove_from_cart': Budget(9, product),
+    'customer:remove_from_wishlist': Budget(7, product),
+    'customer:cart_list': Budget(7),
+    'customer:add_to_cart': Budget(14, product),
+    'customer:add_to_wishlist': Budget(7, product),
+    'customer:password_change': Budget(5),
+    'customer:change_password': Budget(2),
+    'customer:faq': Budget(2, skip="customer/faq.html doesn't exist"),
+    'customer:wishlist_list': Budget(6),
+    'customer:profile': Budget(4),
+    'customer:profile_main': Budget(5),
+    'customer:add_booking': Budget(7, lambda dataset: {'slug': dataset.service.pk}),
+    'customer:login': Budget(3),
+    'customer:logout': Budget(4),
+    'customer:feedback_api': Budget(2),
+    'customer:feedback': Budget(5),
+    'customer:verify': Budget(1, verify('customer')),
+    'customer:register': Budget(3),
+    'customer:apprenticeship_list': Budget(4),
+    'customer:booking_list': Budget(7),
+    'customer:index': Budget(9),
+    # trainee
+    'trainee:feedback': Budget(4),
+    'trainee:change_password': Budget(4),
+    'trainee:training_application_receipt_pdf': Budget(5),
+    'trainee:approved_training_application_receipt_pdf': Budget(3, lambda dataset: {'slug': dataset.application.pk}),
+    'trainee:apply_training': Budget(5),
+    'trainee:apply_for_training': Budget(6, lambda dataset: {'slug': dataset.training.pk}),
+    'trainee:training_payment': Budget(5),
+    'trainee:pending_training': Budget(5),
+    'trainee:trainings': Budget(5),
+    'trainee:training': Budget(5),
+    'trainee:pending_payment': Budget(5),
+    'trainee:payment': Budget(5),
+    'trainee:faq': Budget(2, skip="trainee/faq.html doesn't exist"),
+    'trainee:profile': Budget(4),
+    'trainee:login': Budget(2),
+    'trainee:verify': Budget(1, verify('trainee')),
+    'trainee:register': Budget(2),
+    'trainee:index': Budget(13),
+    # shipment
+    'shipment:index': Budget(0),
+    # stock
+    'stock:search': Budget(5, query=search, skip="stock/search.html doesn't exist"),
+    'stock:feedback': Budget(4),
+    'stock:password_change': Budget(4),
+    'stock:faq': Budget(2, skip="stock/faq.html doesn't exist"),
+    'stock:profile_main': Budget(4),
+    'stock:create_product': Budget(4),
+    'stock:add_product_gallery': Budget(6, product),
+    'stock:restock_product': Budget(3, product),
+    'stock:products': Budget(5),
+    'stock:login': Budget(2),
+    'stock:register': Budget(2),
+    'stock:index': Budget(12),
+    # home
+    'home:search': Budget(3, query=search),
+    'home:autocomplete': Budget(3, query=lambda dataset: {'q': 'seed'}),
+    'home:term_condition': Budget(0),
+    'home:privacy_policy': Budget(0),
+    'home:about-us': Budget(0),
+    'home:salonists': Budget(1),
+    'home:index': Budget(2),
+}
@@ -52,11 +52,14 @@ INSTALLED_APPS = [
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 
 MIDDLEWARE = [
+    'utils.staticfiles.StaticFilesMiddleware',
+    'utils.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'utils.profiling.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,6 +77,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'customer.context_processors.cart',
             ],
         },
     },
@@ -91,6 +95,18 @@ DATABASES = {
     }
 }
 
+# Cache
+# shared between worker processes so that signal invalidation reaches every worker
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+    }
+}
+# tests run against a cache of their own, see utils.testing.TestRunner
+TEST_RUNNER = 'utils.testing.TestRunner'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -140,4 +156,37 @@ STATIC_URL = '/static/'
 STATIC_ROOT = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = 'media/'
+# collectstatic hashes the names of static files and writes gzip and brotli variants of them, which
+# utils.staticfiles.StaticFilesMiddleware serves with the uploads, caching the hashed names for a year and
+# the others for STATIC_MAX_AGE seconds
+STATICFILES_STORAGE = 'utils.staticfiles.CompressedManifestStorage'
+STATIC_MAX_AGE = 60
+# uploads are stored once per content, see utils.storage.ContentHashStorage
+DEFAULT_FILE_STORAGE = 'utils.storage.ContentHashStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+# how book_appointment picks a free salonist: least_booked, round_robin or earliest_free
+APPOINTMENT_ASSIGNMENT = 'least_booked'
+
+# pdf receipts are rendered by a pool of RECEIPT_WORKERS processes (0 renders in the request) and
+# cached under RECEIPTS_ROOT, a request waits at most RECEIPT_TIMEOUT seconds for one
+RECEIPTS_ROOT = BASE_DIR / 'receipts'
+RECEIPT_WORKERS = 2
+RECEIPT_TIMEOUT = 30
+
+# resized WebP and JPEG renditions of uploaded images are made by a pool of IMAGE_WORKERS processes
+# (0 makes them in the request) and stored next to the uploads, see utils.images.VARIANTS
+IMAGE_WORKERS = 1
+
+# utils.metrics.MetricsMiddleware logs requests slower than METRICS_SLOW_REQUEST seconds with their SQL and
+# keeps the METRICS_SLOW_LOG slowest, manager:metrics serves them to managers or to a scraper sending
+# "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_SLOW_REQUEST = 1.0
+METRICS_SLOW_LOG = 20
+METRICS_TOKEN = None
+
+# utils.profiling.ProfilerMiddleware samples a request every PROFILE_INTERVAL seconds when a manager adds
+# ?profile=1 or an X-Profile: 1 header, at most PROFILE_RATE requests per PROFILE_PERIOD seconds
+PROFILE_INTERVAL = 0.005
+PROFILE_RATE = 5
+PROFILE_PERIOD = 300
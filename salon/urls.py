@@ -1,5 +1,3 @@
-from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
 from django.urls import path, include
@@ -38,8 +36,6 @@ urlpatterns = [
     path('stock/', include(('stock.urls', 'stock'), namespace="stock")),
     path('', include(('home.urls', 'home'), namespace="home")),
 ]
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 handler404 = 'manager.views.error_404'
 handler500 = 'manager.views.error_500'
 handler403 = 'manager.views.error_403'
@@ -2,7 +2,6 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login, logout, update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.core.exceptions import ImproperlyConfigured
-from django.db.models import Sum, Q
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.urls import NoReverseMatch
@@ -11,18 +10,21 @@ from django.utils.http import urlsafe_base64_decode
 from django.views import View
 from django.views.generic import ListView, CreateView
 
+from finance.models import DailyRevenue
+from home.search import search as search_index
 from manager.tokens import account_activation_token
 from salonist.forms import SalonistForm
 from salonist.forms import SalonistProfileForm, SalonistSignUpForm, SalonistFeedbackForm
 from salonist.models import Salonist
 from salonist.models import SalonistFeedback
 from service.forms import AppointmentForm
-from service.models import BookingPayment, Service, Appointment, Apprenticeship
-from store.models import Product, OrderPayment
+from service.models import BookingPayment, Appointment, Apprenticeship, ApprenticeshipApplication
+from store.models import OrderPayment
 from trainee.forms import TrainingForm
 from trainee.models import Training
 from user.decorators import salonist_required
 from user.models import CustomUser
+from utils.pagination import KeysetListMixin
 
 
 def login(request):
@@ -164,26 +166,28 @@ class Home(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['order_payment_count'] = OrderPayment.objects.filter(confirmed=False).count()
-        context['order_total'] = OrderPayment.objects.all().aggregate(Sum('amount')).get('amount__sum', 0.00)
-        context['booking_count'] = BookingPayment.objects.filter(confirmed=False).count()
-        context['total_amount'] = BookingPayment.objects.all().aggregate(Sum('amount')).get('amount__sum', 0.00)
+        revenue = DailyRevenue.totals()
+        context['order_payment_count'] = revenue['order_pending']
+        context['order_total'] = revenue['order_amount']
+        context['booking_count'] = revenue['booking_pending']
+        context['total_amount'] = revenue['booking_amount']
         return context
 
 
-class AppointmentListView(ListView):
+class AppointmentListView(KeysetListMixin, ListView):
     model = Appointment
     template_name = "salonist/tables/appointment-list.html"
+    related = ('customer', 'booking')
 
 
-class ApprenticeshipListView(ListView):
-    model = Apprenticeship
+class ApprenticeshipListView(KeysetListMixin, ListView):
+    # applications to the first open apprenticeship program
+    model = ApprenticeshipApplication
     template_name = "salonist/tables/apprenticeship-list.html"
+    related = ('customer',)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(closed=False).first().apprenticeshipapplication_set.all()
-        return context
+    def get_queryset(self):
+        return super().get_queryset().filter(program=Apprenticeship.objects.filter(closed=False).first())
 
 
 class ScheduleAppointmentCreateView(CreateView):
@@ -316,10 +320,9 @@ def feedback(request):
 def search(request):
     q = request.GET.get('search')
     context = {}
-    products = Product.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    services = Service.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    context['products'] = products
-    context['services'] = services
+    hits = search_index(q, kinds=('product', 'service'))
+    context['products'] = hits['product'].objects
+    context['services'] = hits['service'].objects
     context['q'] = q
     return render(request, 'salonist/search.html', context)
 
@@ -358,11 +361,10 @@ class TrainingCreateView(CreateView):
         return redirect('salonist:add_training')
 
 
-class TrainingListView(ListView):
+class TrainingListView(KeysetListMixin, ListView):
     model = Training
     template_name = "salonist/tables/training-list.html"
+    related = ('service',)
 
-    def get_context_data(self, **kwargs):
-        context = super(TrainingListView, self).get_context_data(**kwargs)
-        context['object_list'] = self.object_list.filter(salonist=self.request.user.salonist)
-        return context
+    def get_queryset(self):
+        return super(TrainingListView, self).get_queryset().filter(salonist=self.request.user.salonist)
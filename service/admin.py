@@ -1,7 +1,8 @@
 from django.contrib import admin, messages
+from django.db import transaction
 from django.utils.translation import ngettext
 from .models import Service, SalonistService, Booking, BookingPayment, Appointment, Apprenticeship, \
-    ApprenticeshipApplication
+    ApprenticeshipApplication, SalonistLoad
 
 
 class ServiceAdmin(admin.ModelAdmin):
@@ -109,7 +110,13 @@ class BookingPaymentAdmin(admin.ModelAdmin):
     actions = ['confirmed']
 
     def confirmed(self, request, queryset):
-        updated = queryset.update(confirmed=True)
+        # saved one by one rather than updated, so the revenue rollups and receipts follow
+        payments = list(queryset.filter(confirmed=False))
+        with transaction.atomic():
+            for payment in payments:
+                payment.confirmed = True
+                payment.save()
+        updated = len(payments)
         self.message_user(request, ngettext(
             '%d Booking Payment has successfully been marked as active.',
             '%d Booking Payments have been successfully marked as active.',
@@ -216,6 +223,20 @@ class ApprenticeshipApplicationAdmin(admin.ModelAdmin):
         return True
 
 
+class SalonistLoadAdmin(admin.ModelAdmin):
+    list_display = ('salonist', 'date', 'appointments', 'minutes', 'last_assigned')
+    list_filter = ('date',)
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(Service, ServiceAdmin)
 admin.site.register(SalonistService, SalonistServiceAdmin)
 admin.site.register(Booking, BookingAdmin)
@@ -223,3 +244,4 @@ admin.site.register(BookingPayment, BookingPaymentAdmin)
 admin.site.register(Appointment, AppointmentAdmin)
 admin.site.register(Apprenticeship, ApprenticeshipAdmin)
 admin.site.register(ApprenticeshipApplication, ApprenticeshipApplicationAdmin)
+admin.site.register(SalonistLoad, SalonistLoadAdmin)
@@ -0,0 +1,80 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .scheduling import OPENING_TIME, available_salonists, overlapping
+
+LEAST_BOOKED = 'least_booked'
+ROUND_ROBIN = 'round_robin'
+EARLIEST_FREE = 'earliest_free'
+
+
+def day_load(start, field):
+    from .models import SalonistLoad
+    return Subquery(SalonistLoad.objects.filter(salonist=OuterRef('pk'), date=timezone.localdate(start))
+                    .values(field)[:1])
+
+
+def least_booked(salonists, start, stop):
+    """The salonist with the fewest minutes booked that day, from the precomputed load counters."""
+    return salonists.annotate(booked=Coalesce(day_load(start, 'minutes'), Value(0))).order_by('booked', 'pk')
+
+
+def round_robin(salonists, start, stop):
+    """The salonist who was assigned least recently that day, never assigned ones first."""
+    return salonists.annotate(assigned=day_load(start, 'last_assigned')) \
+        .order_by(F('assigned').asc(nulls_first=True), 'pk')
+
+
+def earliest_free(salonists, start, stop):
+    """The salonist who has been free the longest when the appointment starts, keeping the gaps short."""
+    from .models import Appointment
+    opening = timezone.make_aware(datetime.datetime.combine(timezone.localdate(start), OPENING_TIME))
+    free_since = Appointment.objects.filter(salonist=OuterRef('pk'), date__gte=opening, stop_date__lte=start) \
+        .order_by('-stop_date').values('stop_date')[:1]
+    return salonists.annotate(free_since=Subquery(free_since)).order_by(F('free_since').asc(nulls_first=True), 'pk')
+
+
+STRATEGIES = {
+    LEAST_BOOKED: least_booked,
+    ROUND_ROBIN: round_robin,
+    EARLIEST_FREE: earliest_free,
+}
+
+
+def assign_salonist(service, start, stop, strategy=None, salonist=None):
+    """
+    Pick a free salonist for the service over [start, stop) with one of STRATEGIES, by default the
+    APPOINTMENT_ASSIGNMENT setting. salonist restricts the choice to the one the customer picked.
+    """
+    strategy = STRATEGIES[strategy or getattr(settings, 'APPOINTMENT_ASSIGNMENT', LEAST_BOOKED)]
+    salonists = available_salonists(service, start, stop)
+    if salonist:
+        salonists = salonists.filter(pk=salonist)
+    return strategy(salonists, start, stop).first()
+
+
+def schedule_appointment(appointment, strategy=None, salonist=None):
+    """
+    Assign a salonist to the unsaved appointment and save it, returning the salonist or None when
+    nobody is free.
+
+    The chosen salonist's row is locked and the overlap checked again before saving, so two
+    concurrent bookings can't both take the same interval.
+    """
+    from salonist.models import Salonist
+    with transaction.atomic():
+        chosen = assign_salonist(appointment.booking.service, appointment.date, appointment.stop_date,
+                                 strategy, salonist)
+        if chosen is None:
+            return None
+        list(Salonist.objects.select_for_update().filter(pk=chosen.pk).values_list('pk'))
+        if overlapping([chosen.pk], appointment.date, appointment.stop_date).exists():
+            return None
+        appointment.salonist = chosen
+        appointment.save()
+    return chosen
@@ -33,6 +33,11 @@ class AppointmentForm(ModelForm):
         model = Appointment
         fields = ['booking', 'stop_date', 'date']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # bookings are labelled with their service's name
+        self.fields['booking'].queryset = Booking.objects.select_related('service')
+
 
 class ApprenticeshipForm(ModelForm):
     class Meta:
@@ -0,0 +1,93 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from customer.models import Customer
+from salonist.models import Salonist, Service
+from service.assignment import STRATEGIES, schedule_appointment
+from service.models import Appointment, Booking, SalonistLoad, SalonistService
+from service.scheduling import CLOSING_TIME, OPENING_TIME, SLOT_STEP, free_slots
+
+
+class Command(BaseCommand):
+    help = "Simulates a busy Saturday of booking attempts against every assignment strategy and compares them. " \
+           "A customer whose time is taken books the first suggested free slot that day instead. Everything " \
+           "runs in a transaction that is rolled back, the database is left untouched."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salonists', type=int, default=20)
+        parser.add_argument('--attempts', type=int, default=2000)
+        parser.add_argument('--strategy', choices=list(STRATEGIES), action='append',
+                            help="Strategy to run, repeat for several. Defaults to all of them.")
+        parser.add_argument('--seed', type=int, default=2022)
+
+    def handle(self, *args, **options):
+        if options['salonists'] < 1 or options['attempts'] < 1:
+            raise CommandError("--salonists and --attempts must be positive.")
+        today = timezone.localdate()
+        saturday = today + datetime.timedelta(days=(5 - today.weekday()) % 7 or 7)
+        self.stdout.write(f"{options['attempts']} booking attempts for {options['salonists']} salonists "
+                          f"on {saturday}\n")
+        for strategy in options['strategy'] or STRATEGIES:
+            self.run(strategy, saturday, options)
+
+    def attempts(self, saturday, options):
+        """The same random stream of requested intervals for every strategy."""
+        generator = random.Random(options['seed'])
+        opening = timezone.make_aware(datetime.datetime.combine(saturday, OPENING_TIME))
+        steps = int((datetime.datetime.combine(saturday, CLOSING_TIME) -
+                     datetime.datetime.combine(saturday, OPENING_TIME)) / SLOT_STEP)
+        for _ in range(options['attempts']):
+            duration = datetime.timedelta(minutes=generator.choice((30, 45, 60, 90, 120)))
+            start = opening + generator.randrange(steps) * SLOT_STEP
+            yield start, min(start + duration, opening + steps * SLOT_STEP)
+
+    def run(self, strategy, saturday, options):
+        with transaction.atomic():
+            service = Service.objects.create(name="Benchmark", description="Benchmark", price=1000, is_active=True)
+            salonists = []
+            for number in range(options['salonists']):
+                salonist = Salonist.objects.create(email=f"benchmark{number}@example.com",
+                                                   username=f"benchmark-salonist-{number}", is_active=True)
+                # half of them offer the service through their profile, the other half through SalonistService
+                if number % 2:
+                    SalonistService.objects.create(salonist=salonist, service=service, is_active=True)
+                else:
+                    salonist.salonistprofile.service = service
+                    salonist.salonistprofile.save()
+                salonists.append(salonist)
+            customer = Customer.objects.create(email="benchmark@example.com", username="benchmark-customer")
+            booking = Booking.objects.create(transaction_id="BENCHMARK", service=service, customer=customer)
+
+            queries = []
+            booked, moved = 0, 0
+            started = time.perf_counter()
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                for start, stop in self.attempts(saturday, options):
+                    appointment = Appointment(booking=booking, customer=customer, date=start, stop_date=stop)
+                    if schedule_appointment(appointment, strategy) is not None:
+                        booked += 1
+                        continue
+                    for slot in free_slots(service, stop - start, count=1, after=start, days=0):
+                        appointment = Appointment(booking=booking, customer=customer, date=slot.start,
+                                                  stop_date=slot.stop)
+                        if schedule_appointment(appointment, strategy, slot.salonist.pk) is not None:
+                            moved += 1
+            elapsed = time.perf_counter() - started
+
+            minutes = dict(SalonistLoad.objects.filter(salonist__in=salonists, date=saturday)
+                           .values_list('salonist', 'minutes'))
+            load = [minutes.get(salonist.pk, 0) for salonist in salonists]
+            self.stdout.write(self.style.SUCCESS(strategy))
+            self.stdout.write(f"  booked {booked} at the requested time, {moved} at a suggested one, "
+                              f"{options['attempts'] - booked - moved} turned away")
+            self.stdout.write(f"  minutes per salonist min {min(load)}, max {max(load)}, "
+                              f"stdev {statistics.pstdev(load):.1f}")
+            self.stdout.write(f"  {elapsed:.2f}s, {elapsed / options['attempts'] * 1000:.2f}ms and "
+                              f"{len(queries) / options['attempts']:.1f} queries per attempt\n")
+            transaction.set_rollback(True)
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.12 on 2026-10-18 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0004_alter_bookingpayment_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingpayment',
+            name='completed',
+            field=models.BooleanField(default=False, help_text='Means customer completed payment'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.12 on 2026-10-18 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0005_bookingpayment_completed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['salonist', 'date', 'stop_date'], name='appointment_salonist_dates'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.12 on 2026-10-18 01:48
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_salonist_load(apps, schema_editor):
+    Appointment = apps.get_model('service', 'Appointment')
+    SalonistLoad = apps.get_model('service', 'SalonistLoad')
+    loads = {}
+    for salonist, start, stop, created in Appointment.objects.values_list('salonist', 'date', 'stop_date', 'created') \
+            .iterator():
+        day = timezone.localdate(start)
+        load = loads.setdefault((salonist, day), SalonistLoad(salonist_id=salonist, date=day))
+        load.appointments += 1
+        load.minutes += int((stop - start).total_seconds() // 60)
+        if created and (load.last_assigned is None or created > load.last_assigned):
+            load.last_assigned = created
+    SalonistLoad.objects.bulk_create(loads.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salonist', '0001_initial'),
+        ('service', '0006_appointment_salonist_dates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalonistLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('appointments', models.IntegerField(default=0)),
+                ('minutes', models.IntegerField(default=0, help_text='Minutes booked on the day')),
+                ('last_assigned', models.DateTimeField(blank=True, help_text='When the latest appointment of the day was booked', null=True)),
+                ('salonist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='salonist.salonist')),
+            ],
+            options={
+                'verbose_name': 'Salonist Load',
+                'verbose_name_plural': 'Salonists Load',
+                'unique_together': {('salonist', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_salonist_load, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from salonist.models import Salonist, Service
 from customer.models import Customer
@@ -56,6 +59,37 @@ class Appointment(models.Model):
     updated = models.DateTimeField(_('Updated'), auto_now=True, null=True)
     created = models.DateTimeField(_('Created'), auto_now_add=True, null=True)
 
+    class Meta:
+        indexes = [
+            # overlap checks and day schedules filter on the salonist then a date range
+            models.Index(fields=['salonist', 'date', 'stop_date'], name='appointment_salonist_dates'),
+        ]
+
+
+class SalonistLoad(models.Model):
+    salonist = models.ForeignKey(Salonist, on_delete=models.CASCADE)
+    date = models.DateField()
+    appointments = models.IntegerField(default=0)
+    minutes = models.IntegerField(default=0, help_text="Minutes booked on the day")
+    last_assigned = models.DateTimeField(null=True, blank=True,
+                                         help_text="When the latest appointment of the day was booked")
+
+    class Meta:
+        verbose_name = 'Salonist Load'
+        verbose_name_plural = 'Salonists Load'
+        unique_together = ('salonist', 'date')
+
+    @classmethod
+    def refresh(cls, salonist_id, day):
+        """Recompute the salonist's counters for one day from the appointments starting on it."""
+        appointments = list(Appointment.objects.filter(salonist_id=salonist_id, date__date=day)
+                            .values_list('date', 'stop_date', 'created'))
+        cls.objects.update_or_create(salonist_id=salonist_id, date=day, defaults={
+            'appointments': len(appointments),
+            'minutes': sum(int((stop - start).total_seconds() // 60) for start, stop, _created in appointments),
+            'last_assigned': max((created for _start, _stop, created in appointments if created), default=None),
+        })
+
 
 class Apprenticeship(models.Model):
     salonist = models.ForeignKey(Salonist, on_delete=models.CASCADE)
@@ -76,3 +110,22 @@ class ApprenticeshipApplication(models.Model):
     attended = models.BooleanField(help_text="Means Customer attended the program")
     updated = models.DateTimeField(_('Updated'), auto_now=True, null=True)
     created = models.DateTimeField(_('Created'), auto_now_add=True, null=True)
+
+
+# keep the per-day salonist load counters in step with the appointments, including the day and
+# salonist an edited appointment moved away from
+@receiver(pre_save, sender=Appointment)
+def appointment_previous_load(sender, instance, **kwargs):
+    instance._previous_load = Appointment.objects.filter(pk=instance.pk).values_list('salonist', 'date').first() \
+        if instance.pk else None
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_load(sender, instance, **kwargs):
+    loads = {(instance.salonist_id, timezone.localdate(instance.date))}
+    previous = getattr(instance, '_previous_load', None)
+    if previous:
+        loads.add((previous[0], timezone.localdate(previous[1])))
+    for salonist_id, day in loads:
+        SalonistLoad.refresh(salonist_id, day)
@@ -0,0 +1,141 @@
+import bisect
+import datetime
+from collections import defaultdict, namedtuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+OPENING_TIME = datetime.time(8)
+CLOSING_TIME = datetime.time(20)
+SLOT_STEP = datetime.timedelta(minutes=15)
+SEARCH_DAYS = 14
+
+Slot = namedtuple('Slot', ['salonist', 'start', 'stop'])
+
+
+def overlapping(salonist_ids, start, stop):
+    """
+    Appointments of the given salonists that overlap [start, stop).
+
+    Two intervals overlap exactly when each starts before the other one stops, so this one
+    condition replaces checking for start, stop and containment separately. Back to back
+    appointments don't overlap.
+    """
+    from .models import Appointment
+    return Appointment.objects.filter(salonist_id__in=salonist_ids, date__lt=stop, stop_date__gt=start)
+
+
+def qualified_salonists(service):
+    """Active salonists offering the service, through their profile or an active SalonistService."""
+    from salonist.models import Salonist
+    return Salonist.objects.filter(is_active=True).filter(
+        Q(salonistprofile__service=service) |
+        Q(salonistservice__service=service, salonistservice__is_active=True, salonistservice__is_archived=False)
+    ).distinct()
+
+
+def available_salonists(service, start, stop):
+    """Qualified salonists with nothing booked over [start, stop), in one query."""
+    busy = overlapping(qualified_salonists(service).values('pk'), start, stop).values('salonist')
+    return qualified_salonists(service).exclude(pk__in=busy)
+
+
+class DaySchedule:
+    """
+    One salonist's booked intervals for a day, kept sorted and merged so that a free check is a
+    binary search instead of a scan.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.stops = []
+        for start, stop in sorted(intervals):
+            self.add(start, stop)
+
+    def add(self, start, stop):
+        index = bisect.bisect_left(self.starts, start)
+        # merge with every neighbour the new interval touches
+        if index and self.stops[index - 1] >= start:
+            index -= 1
+            start = self.starts[index]
+        end = index
+        while end < len(self.starts) and self.starts[end] <= stop:
+            stop = max(stop, self.stops[end])
+            end += 1
+        self.starts[index:end] = [start]
+        self.stops[index:end] = [stop]
+
+    def is_free(self, start, stop):
+        index = bisect.bisect_left(self.starts, stop)
+        return index == 0 or self.stops[index - 1] <= start
+
+    def next_free(self, start, stop):
+        """The earliest start at or after start when [start, start + length) is free."""
+        length = stop - start
+        index = bisect.bisect_right(self.starts, start)
+        if index and self.stops[index - 1] > start:
+            start = self.stops[index - 1]
+        while index < len(self.starts) and self.starts[index] < start + length:
+            start = self.stops[index]
+            index += 1
+        return start
+
+
+def align(moment, step=SLOT_STEP):
+    """Round moment up to the next multiple of step past the local hour."""
+    moment = timezone.localtime(moment)
+    hour = moment.replace(minute=0, second=0, microsecond=0)
+    return hour + -(-(moment - hour) // step) * step
+
+
+def load_schedules(salonist_ids, start, stop):
+    """Every salonist's appointments between start and stop, in one query, as DaySchedules per date."""
+    schedules = defaultdict(DaySchedule)
+    rows = overlapping(salonist_ids, start, stop).order_by('date').values_list('salonist', 'date', 'stop_date')
+    for salonist, date, stop_date in rows:
+        day = timezone.localtime(date).date()
+        while day <= timezone.localtime(stop_date).date():
+            schedules[salonist, day].add(date, stop_date)
+            day += datetime.timedelta(days=1)
+    return schedules
+
+
+def free_slots(service, duration, count=5, after=None, days=SEARCH_DAYS):
+    """
+    The next count free slots of duration for the service across every qualified salonist.
+
+    Two queries in total: one for the salonists and one for their appointments over the search
+    window. The slots are then found in memory, day by day, within opening hours and aligned to
+    SLOT_STEP, earliest first.
+    """
+    after = max(after or timezone.now(), timezone.now())
+    salonists = {salonist.pk: salonist for salonist in qualified_salonists(service)}
+    if not salonists or duration <= datetime.timedelta(0):
+        return []
+    first_day = timezone.localtime(after).date()
+    last_closing = timezone.make_aware(datetime.datetime.combine(first_day + datetime.timedelta(days=days),
+                                                                 CLOSING_TIME))
+    schedules = load_schedules(list(salonists), after, last_closing)
+
+    slots = []
+    for offset in range(days + 1):
+        day = first_day + datetime.timedelta(days=offset)
+        opening = timezone.make_aware(datetime.datetime.combine(day, OPENING_TIME))
+        closing = timezone.make_aware(datetime.datetime.combine(day, CLOSING_TIME))
+        today = []
+        for pk, salonist in salonists.items():
+            schedule = schedules.get((pk, day), DaySchedule())
+            start, found = align(max(opening, after)), 0
+            # each salonist offers at most count slots a day, enough to fill the answer on their own
+            while start + duration <= closing and found < count:
+                free = schedule.next_free(start, start + duration)
+                if free != start:
+                    start = align(free)
+                    continue
+                today.append(Slot(salonist, start, start + duration))
+                start += SLOT_STEP
+                found += 1
+        slots += sorted(today, key=lambda slot: (slot.start, slot.salonist.pk))
+        if len(slots) >= count:
+            break
+    return slots[:count]
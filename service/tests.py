@@ -1,3 +1,101 @@
+import datetime
+
 from django.test import TestCase
+from django.utils import timezone
+
+from customer.models import Customer
+from salonist.models import Salonist, Service
+from service.assignment import EARLIEST_FREE, LEAST_BOOKED, ROUND_ROBIN, schedule_appointment
+from service.models import Appointment, Booking, SalonistLoad, SalonistService
+from service.scheduling import DaySchedule, available_salonists, free_slots, overlapping, qualified_salonists
+
+
+def at(day, hour, minute=0):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour, minute)))
+
+
+class DayScheduleTest(TestCase):
+
+    def test_intervals_are_merged_and_searched(self):
+        day = datetime.date(2030, 1, 7)
+        schedule = DaySchedule([(at(day, 11), at(day, 12)), (at(day, 9), at(day, 10)), (at(day, 10), at(day, 10, 30))])
+        self.assertEqual(len(schedule.starts), 2)
+        self.assertTrue(schedule.is_free(at(day, 10, 30), at(day, 11)))
+        self.assertFalse(schedule.is_free(at(day, 10, 15), at(day, 11)))
+        self.assertEqual(schedule.next_free(at(day, 9), at(day, 10)), at(day, 12))
+        self.assertEqual(schedule.next_free(at(day, 9, 30), at(day, 9, 45)), at(day, 10, 30))
+
+
+class SalonistsTestCase(TestCase):
+
+    def setUp(self):
+        self.service = Service.objects.create(name="Braids", description="Braids", price=1500)
+        self.first = Salonist.objects.create(email="first@example.com", username="first", is_active=True)
+        self.first.salonistprofile.service = self.service
+        self.first.salonistprofile.save()
+        self.second = Salonist.objects.create(email="second@example.com", username="second", is_active=True)
+        SalonistService.objects.create(salonist=self.second, service=self.service, is_active=True)
+        Salonist.objects.create(email="idle@example.com", username="idle", is_active=True)
+        customer = Customer.objects.create(email="client@example.com", username="client")
+        self.booking = Booking.objects.create(transaction_id="B1", service=self.service, customer=customer)
+        self.day = timezone.localdate() + datetime.timedelta(days=1)
+
+    def book(self, salonist, start, stop):
+        return Appointment.objects.create(booking=self.booking, salonist=salonist, date=start, stop_date=stop)
+
+
+class SchedulingTest(SalonistsTestCase):
+
+    def test_overlap_is_one_query(self):
+        self.book(self.first, at(self.day, 9), at(self.day, 10))
+        with self.assertNumQueries(1):
+            self.assertTrue(overlapping([self.first.pk], at(self.day, 9, 30), at(self.day, 9, 45)).exists())
+        self.assertFalse(overlapping([self.first.pk], at(self.day, 10), at(self.day, 11)).exists())
+        self.assertEqual(set(qualified_salonists(self.service)), {self.first, self.second})
+        self.assertEqual(list(available_salonists(self.service, at(self.day, 9), at(self.day, 10))), [self.second])
+
+    def test_free_slots_skip_booked_intervals(self):
+        for salonist in (self.first, self.second):
+            self.book(salonist, at(self.day, 8), at(self.day, 9, 30))
+        self.book(self.first, at(self.day, 9, 30), at(self.day, 19))
+        with self.assertNumQueries(2):
+            slots = free_slots(self.service, datetime.timedelta(hours=1), count=3, after=at(self.day, 7))
+        self.assertEqual([(slot.salonist, slot.start) for slot in slots], [
+            (self.second, at(self.day, 9, 30)),
+            (self.second, at(self.day, 9, 45)),
+            (self.second, at(self.day, 10)),
+        ])
+        late = free_slots(self.service, datetime.timedelta(hours=1), count=1, after=at(self.day, 18, 50))
+        self.assertEqual([(slot.salonist, slot.start) for slot in late], [(self.first, at(self.day, 19))])
+
+
+class AssignmentTest(SalonistsTestCase):
+
+    def test_load_counters_follow_appointments(self):
+        appointment = self.book(self.first, at(self.day, 9), at(self.day, 10, 30))
+        load = SalonistLoad.objects.get(salonist=self.first, date=self.day)
+        self.assertEqual((load.appointments, load.minutes), (1, 90))
+        appointment.salonist = self.second
+        appointment.save()
+        self.assertEqual(SalonistLoad.objects.get(salonist=self.first, date=self.day).minutes, 0)
+        self.assertEqual(SalonistLoad.objects.get(salonist=self.second, date=self.day).minutes, 90)
+        appointment.delete()
+        self.assertEqual(SalonistLoad.objects.get(salonist=self.second, date=self.day).appointments, 0)
+
+    def schedule(self, strategy, hour):
+        appointment = Appointment(booking=self.booking, date=at(self.day, hour), stop_date=at(self.day, hour + 1))
+        return schedule_appointment(appointment, strategy)
+
+    def test_strategies_spread_the_bookings(self):
+        self.book(self.first, at(self.day, 8), at(self.day, 9))
+        self.assertEqual(self.schedule(LEAST_BOOKED, 10), self.second)
+        self.assertEqual(self.schedule(LEAST_BOOKED, 11), self.first)
+        self.assertEqual(self.schedule(ROUND_ROBIN, 12), self.second)
+        self.assertEqual(self.schedule(ROUND_ROBIN, 13), self.first)
+        self.book(self.second, at(self.day, 14), at(self.day, 15))
+        self.assertEqual(self.schedule(EARLIEST_FREE, 15), self.first)
 
-# Create your tests here.
+    def test_busy_interval_is_not_double_booked(self):
+        self.book(self.first, at(self.day, 9), at(self.day, 10))
+        self.book(self.second, at(self.day, 9), at(self.day, 10))
+        self.assertIsNone(self.schedule(LEAST_BOOKED, 9))
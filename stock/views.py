@@ -4,7 +4,7 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import ImproperlyConfigured
 from django.core.mail import send_mail
-from django.db.models import Sum, Q
+from django.db.models import Sum
 from django.forms import inlineformset_factory
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
@@ -16,14 +16,17 @@ from django.views import View
 from django.views.generic import ListView, CreateView
 
 from customer.models import Customer
+from home.search import search as search_index
 from salonist.models import Salonist
-from service.models import Appointment, BookingPayment, Service
+from service.models import Appointment, BookingPayment
 from stock.forms import StockProfileForm, StockForm, StockSignUpForm, StockFeedbackForm
 from stock.models import Stock, StockFeedback
 from store.forms import ProductForm, GalleryForm
 from store.models import Product, Gallery
+from store.stock import release_stock
 from user.decorators import stock_required
 from user.models import CustomUser
+from utils.pagination import KeysetListMixin
 
 
 def login(request):
@@ -141,7 +144,7 @@ class Home(ListView):
         return context
 
 
-class ProductsListView(ListView):
+class ProductsListView(KeysetListMixin, ListView):
     model = Product
     template_name = "stock/tables/products-list.html"
 
@@ -241,10 +244,9 @@ def feedback(request):
 def search(request):
     q = request.GET.get('search')
     context = {}
-    products = Product.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    services = Service.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))
-    context['products'] = products
-    context['services'] = services
+    hits = search_index(q, kinds=('product', 'service'))
+    context['products'] = hits['product'].objects
+    context['services'] = hits['service'].objects
     context['q'] = q
     return render(request, 'stock/search.html', context)
 
@@ -266,3 +268,19 @@ def add_product_gallery(request, slug):
     context['object'] = product
     context['formset'] = formset
     return render(request, 'stock/forms/create-gallery.html', context)
+
+
+@stock_required
+def restock_product(request, slug):
+    product = get_object_or_404(Product, slug=slug)
+    if request.method == "POST":
+        try:
+            quantity = int(request.POST.get('quantity', 0))
+        except ValueError:
+            quantity = 0
+        if quantity > 0:
+            release_stock([(product.pk, quantity)])
+            messages.success(request, f"{quantity} {product.name} have been added to stock.")
+        else:
+            messages.info(request, "Enter a valid quantity to restock.")
+    return redirect('stock:products')
@@ -1,4 +1,5 @@
 from django.contrib import admin, messages
+from django.db import transaction
 from django.utils.translation import ngettext
 from .models import Product, Gallery, Review, Order, OrderItem, OrderPayment, Wishlist
 
@@ -12,9 +13,19 @@ class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'price', 'image', 'description', 'quantity', 'discount')
     search_fields = ('name', 'description',)
     list_filter = ('is_discount', 'is_active', 'is_archived', 'updated', 'created')
+    # kept by the review signals
+    readonly_fields = ('rating_sum', 'rating_count', 'rating_avg')
 
     actions = ['make_active', 'make_inactive']
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            # the ratings read with the product may be stale by now, leave them to the signals
+            obj.save(update_fields=[field.name for field in obj._meta.concrete_fields
+                                    if not field.primary_key and field.name not in self.readonly_fields])
+        else:
+            obj.save()
+
     def make_active(self, request, queryset):
         updated = queryset.update(is_active=True, is_archived=False)
         self.message_user(request, ngettext(
@@ -133,7 +144,13 @@ class OrderPaymentAdmin(admin.ModelAdmin):
     actions = ['confirmed']
 
     def confirmed(self, request, queryset):
-        updated = queryset.update(confirmed=True)
+        # saved one by one rather than updated, so the revenue rollups and receipts follow
+        payments = list(queryset.filter(confirmed=False))
+        with transaction.atomic():
+            for payment in payments:
+                payment.confirmed = True
+                payment.save()
+        updated = len(payments)
         self.message_user(request, ngettext(
             '%d Order Payment has successfully been marked as confirmed.',
             '%d Order Payments have been successfully marked as confirmed.',
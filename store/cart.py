@@ -0,0 +1,176 @@
+import contextlib
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+ACTIVE_ORDER_TIMEOUT = 60 * 5
+
+
+def active_order_key(customer_id):
+    return f"store:active-order:{customer_id}"
+
+
+def get_active_order(user):
+    """
+    Return the customer's open cart, or None.
+
+    The order is cached per customer so the header cart badge costs no queries, signals on Order and
+    OrderItem drop the entry whenever the cart changes. The entry carries when the customer joined, so a
+    customer given the pk of a deleted one doesn't see their cart.
+    """
+    key = active_order_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None and cached[1:] == (user.date_joined,):
+        return cached[0]
+    from .models import Order
+    order = Order.objects.filter(customer_id=user.pk, is_active=True, completed=False).first()
+    # None is cached too, so that "no open cart" costs no query either
+    cache.set(key, (order, user.date_joined), ACTIVE_ORDER_TIMEOUT)
+    return order
+
+
+def invalidate_active_order(*customer_ids):
+    """
+    Drop the customers' cached carts now, for the rest of this request, and again once the transaction
+    commits, as a concurrent request may have cached the old cart in between.
+    """
+    keys = [active_order_key(customer_id) for customer_id in customer_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+_deferred = threading.local()
+
+
+@contextlib.contextmanager
+def totals_deferred():
+    """
+    Inside it the OrderItem receivers leave the order totals and the cached cart alone, for a caller
+    changing many items to update them once afterwards.
+    """
+    previous = getattr(_deferred, 'active', False)
+    _deferred.active = True
+    try:
+        yield
+    finally:
+        _deferred.active = previous
+
+
+def totals_are_deferred():
+    return getattr(_deferred, 'active', False)
+
+
+class CartError(Exception):
+    """Raised when a batch of cart operations is malformed."""
+
+
+CART_ACTIONS = ('add', 'decrease', 'set', 'remove')
+
+
+def _parse_operations(operations):
+    if not isinstance(operations, list):
+        raise CartError("operations must be a list")
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('action') not in CART_ACTIONS or not operation.get('slug'):
+            raise CartError(f"each operation needs an action ({', '.join(CART_ACTIONS)}) and a product slug")
+        try:
+            quantity = int(operation.get('quantity', 1))
+        except (TypeError, ValueError):
+            raise CartError(f"quantity for {operation['slug']} must be a number")
+        if quantity < 0:
+            raise CartError(f"quantity for {operation['slug']} can't be negative")
+        parsed.append((operation['action'], str(operation['slug']), quantity))
+    return parsed
+
+
+def cart_state(order):
+    """Serializable snapshot of the cart for JSON responses."""
+    if order is None:
+        return {'items': [], 'cart_items': 0, 'cart_total': 0.0}
+    return {
+        'items': [{
+            'slug': item.product.slug,
+            'name': item.product.name,
+            'quantity': item.quantity,
+            'price': item.get_price,
+            'total': item.get_total,
+        } for item in order.orderitem_set.select_related('product').order_by('created')],
+        'cart_items': order.cart_items,
+        'cart_total': order.cart_total,
+    }
+
+
+def apply_cart_operations(customer_id, operations):
+    """
+    Apply a list of {'action', 'slug', 'quantity'} operations to the customer's open cart.
+
+    Products, the order and its items are each loaded with one query and the changes are written
+    back in bulk inside one transaction, so the query count doesn't grow with the number of
+    operations. Operations that can't be applied (unknown product, not enough stock) are skipped
+    and reported in 'info'.
+    """
+    from .models import Order, OrderItem, Product, Wishlist
+    from utils.utils import generate_key
+
+    operations = _parse_operations(operations)
+    messages, info = [], []
+    with transaction.atomic():
+        products = {product.slug: product for product in
+                    Product.objects.filter(slug__in={slug for _, slug, _ in operations})}
+        order = Order.objects.select_for_update() \
+            .filter(customer_id=customer_id, is_active=True, completed=False).first()
+        items = {item.product_id: item for item in order.orderitem_set.all()} if order else {}
+        quantities = {product_id: item.quantity for product_id, item in items.items()}
+        for action, slug, quantity in operations:
+            product = products.get(slug)
+            if product is None:
+                info.append(f"{slug} is not available")
+                continue
+            current = quantities.get(product.pk, 0)
+            if action == 'add':
+                wanted = current + quantity
+            elif action == 'decrease':
+                wanted = max(current - quantity, 0)
+            elif action == 'set':
+                wanted = quantity
+            else:
+                wanted = 0
+            if wanted > current and wanted > product.quantity:
+                info.append(f"{wanted} {product.name} are not available we only have {product.quantity} remaining.")
+                continue
+            quantities[product.pk] = wanted
+            if wanted:
+                messages.append(f"{product.name} quantity is now {wanted}")
+            elif current:
+                messages.append(f"{product.name} has been removed from cart")
+
+        if order is None and any(quantities.values()):
+            order = Order.objects.create(customer_id=customer_id, is_active=True, completed=False,
+                                         transaction_id=generate_key(6, 6))
+        if order is not None:
+            now = timezone.now()
+            created = [OrderItem(order=order, product_id=product_id, quantity=quantity)
+                       for product_id, quantity in quantities.items() if quantity and product_id not in items]
+            changed = []
+            for product_id, item in items.items():
+                if quantities[product_id] and quantities[product_id] != item.quantity:
+                    item.quantity = quantities[product_id]
+                    item.updated = now
+                    changed.append(item)
+            removed = [item.pk for product_id, item in items.items() if not quantities[product_id]]
+            OrderItem.objects.bulk_create(created)
+            OrderItem.objects.bulk_update(changed, ['quantity', 'updated'])
+            if removed:
+                # the totals are updated once below rather than by the signal of every deleted item
+                with totals_deferred():
+                    OrderItem.objects.filter(pk__in=removed).delete()
+            added = [product_id for product_id, quantity in quantities.items() if quantity]
+            if added:
+                Wishlist.objects.filter(customer_id=customer_id, product_id__in=added, cart=False).update(cart=True)
+            Order.objects.filter(pk=order.pk).update(**Order.totals_expressions(), updated=now)
+            order.refresh_from_db(fields=['cart_items', 'cart_total'])
+    invalidate_active_order(customer_id)
+    return {'messages': messages, 'info': info, 'cart': cart_state(order)}
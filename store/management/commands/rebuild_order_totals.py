@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from store.models import Order
+
+
+class Command(BaseCommand):
+    help = "Checks the denormalized Order.cart_items and Order.cart_total against the order items and rebuilds them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Only report orders whose stored totals differ, do not rebuild them.")
+
+    def handle(self, *args, **options):
+        expected = Order.objects.annotate(
+            expected_items=Order.totals_expressions()['cart_items'],
+            expected_total=Order.totals_expressions()['cart_total'],
+        ).values_list('id', 'cart_items', 'cart_total', 'expected_items', 'expected_total')
+        stale = []
+        for pk, cart_items, cart_total, expected_items, expected_total in expected.iterator():
+            if cart_items != expected_items or abs(cart_total - expected_total) > 0.005:
+                stale.append(pk)
+                self.stdout.write(f"order {pk}: stored {cart_items} items / {cart_total:.2f}, "
+                                  f"expected {expected_items} items / {expected_total:.2f}")
+        if options['check']:
+            if stale:
+                raise CommandError(f"{len(stale)} order(s) have stale totals.")
+            self.stdout.write(self.style.SUCCESS("All order totals are up to date."))
+            return
+        with transaction.atomic():
+            updated = Order.objects.update(**Order.totals_expressions())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt totals for {updated} order(s), {len(stale)} were stale."))
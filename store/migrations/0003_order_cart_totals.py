@@ -0,0 +1,40 @@
+# Generated by Django 3.2.12 on 2026-10-18 01:33
+
+from django.db import migrations, models
+from django.db.models import F, FloatField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Order = apps.get_model('store', 'Order')
+    OrderItem = apps.get_model('store', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    quantity = items.annotate(value=Sum('quantity')).values('value')
+    total = items.annotate(
+        value=Sum(F('product__price') * F('product__discount') * F('quantity'), output_field=FloatField())
+    ).values('value')
+    Order.objects.update(
+        cart_items=Coalesce(Subquery(quantity, output_field=IntegerField()), 0),
+        cart_total=Coalesce(Subquery(total, output_field=FloatField()), 0.0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='cart_items',
+            field=models.IntegerField(default=0, help_text='Number of items in the order, kept up to date by signals'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='cart_total',
+            field=models.FloatField(default=0.0, help_text='Discounted order total, kept up to date by signals'),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
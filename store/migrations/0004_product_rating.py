@@ -0,0 +1,51 @@
+# Generated by Django 3.2.12 on 2026-10-18 02:35
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Review = apps.get_model('store', 'Review')
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+
+    def per_product(aggregate, output_field, default):
+        return Coalesce(Subquery(reviews.annotate(value=aggregate).values('value'), output_field=output_field),
+                        default)
+
+    Product.objects.update(
+        rating_sum=per_product(Sum('rating'), IntegerField(), 0),
+        rating_count=per_product(Count('pk'), IntegerField(), 0),
+        rating_avg=per_product(Avg('rating'), FloatField(), 0.0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_order_cart_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.FloatField(default=0.0, help_text='Average review rating, kept up to date by signals'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.IntegerField(default=0, help_text='Number of reviews, kept up to date by signals'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.IntegerField(default=0, help_text='Sum of the review ratings, kept up to date by signals'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-rating_avg', '-rating_count'], name='store_product_rating_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,15 @@
 from autoslug import AutoSlugField
 from django.db import models
+from django.db.models import Case, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
 from customer.models import Customer
 from finance.models import Finance
+from .cart import invalidate_active_order, totals_are_deferred
 from .utils import generate_code
 
 PERCENT_DISCOUNT = (
@@ -30,6 +36,13 @@ PERCENT_DISCOUNT = (
 )
 
 
+class ProductQuerySet(models.QuerySet):
+
+    def by_rating(self):
+        """Best rated first, the stored average needs no join to the reviews."""
+        return self.order_by('-rating_avg', '-rating_count', '-created')
+
+
 class Product(models.Model):
     slug = AutoSlugField(populate_from='slug_name')
     discount = models.FloatField(default=1.0, choices=PERCENT_DISCOUNT)
@@ -42,11 +55,17 @@ class Product(models.Model):
                                       help_text=_('when active, discount will be applied'))
     is_active = models.BooleanField(_('Active'), default=False, help_text=_('Activated, allow to publish'))
     is_archived = models.BooleanField(_('Archived'), default=False, help_text=_('Activated, gets unpublished'))
+    rating_sum = models.IntegerField(default=0, help_text="Sum of the review ratings, kept up to date by signals")
+    rating_count = models.IntegerField(default=0, help_text="Number of reviews, kept up to date by signals")
+    rating_avg = models.FloatField(default=0.0, help_text="Average review rating, kept up to date by signals")
     created = models.DateTimeField(_('Created'), auto_now_add=True, null=True)
     updated = models.DateTimeField(_('Updated'), auto_now=True, null=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created"]
+        indexes = [models.Index(fields=['-rating_avg', '-rating_count'], name='store_product_rating_idx')]
 
     @property
     def gallery(self):
@@ -54,16 +73,24 @@ class Product(models.Model):
 
     @property
     def reviews_rating(self):
-        review_total = 0
-        number_of_reviews = 0
-        reviews_all = self.productreview_set.all()
-        for review in reviews_all:
-            if review.rating is not None:
-                review_rating = review.rating
-                review_total += review_rating
-                number_of_reviews += 1
-        average_rating = review_total // number_of_reviews
-        return average_rating
+        return self.rating_avg
+
+    @property
+    def stars(self):
+        """Whether each of the five stars is filled, for the rounded average rating."""
+        filled = round(self.rating_avg)
+        return [star < filled for star in range(5)]
+
+    @staticmethod
+    def rating_expressions(rating, count):
+        """The rating columns after adding count reviews rating a total of rating, both negative to remove them."""
+        rating_sum, rating_count = F('rating_sum') + rating, F('rating_count') + count
+        return {
+            'rating_sum': rating_sum,
+            'rating_count': rating_count,
+            'rating_avg': Case(When(rating_count__gt=-count, then=Cast(rating_sum, FloatField()) / rating_count),
+                               default=Value(0.0), output_field=FloatField()),
+        }
 
     @property
     def image_url(self):
@@ -103,20 +130,31 @@ class Order(models.Model):
     is_active = models.BooleanField(_('Active'), default=False)  # true means complete
     is_archived = models.BooleanField(_('Archived'), default=False,
                                       help_text=_('Means the oder has been cancelled.'))  # order cancelled
+    cart_items = models.IntegerField(default=0, help_text="Number of items in the order, kept up to date by signals")
+    cart_total = models.FloatField(default=0.0, help_text="Discounted order total, kept up to date by signals")
     created = models.DateTimeField(_('Created'), auto_now_add=True, null=True)
     updated = models.DateTimeField(_('Updated'), auto_now=True, null=True)
 
     @property
     def get_cart_total(self):
-        order_items = self.orderitem_set.all()
-        total = (sum([item.get_total for item in order_items]))
-        return total
+        return self.cart_total
 
     @property
     def get_cart_items(self):
-        order_items = self.orderitem_set.all()
-        total = (sum([item.quantity for item in order_items]))
-        return total
+        return self.cart_items
+
+    @staticmethod
+    def totals_expressions():
+        """Correlated subqueries computing the real cart_items and cart_total of each order row."""
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        quantity = items.annotate(value=Sum('quantity')).values('value')
+        total = items.annotate(
+            value=Sum(F('product__price') * F('product__discount') * F('quantity'), output_field=FloatField())
+        ).values('value')
+        return {
+            'cart_items': Coalesce(Subquery(quantity, output_field=IntegerField()), 0),
+            'cart_total': Coalesce(Subquery(total, output_field=FloatField()), 0.0),
+        }
 
 
 class OrderItem(models.Model):
@@ -158,3 +196,54 @@ class Wishlist(models.Model):
     cart = models.BooleanField(default=False, help_text="means product is in cart")
     created = models.DateTimeField(_('Created'), auto_now_add=True, null=True)
     updated = models.DateTimeField(_('Updated'), auto_now=True, null=True)
+
+
+# keep the product rating aggregates in step with the reviews, a changed rating or product moves the review
+@receiver(pre_save, sender=Review)
+def review_previous_rating(sender, instance, **kwargs):
+    instance.previous_rating = Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first() \
+        if instance.pk else None
+
+
+@receiver(post_save, sender=Review)
+def review_rating(sender, instance, **kwargs):
+    previous, current = getattr(instance, 'previous_rating', None), (instance.product_id, int(instance.rating))
+    if previous != current:
+        if previous:
+            Product.objects.filter(pk=previous[0]).update(**Product.rating_expressions(-previous[1], -1))
+        Product.objects.filter(pk=current[0]).update(**Product.rating_expressions(current[1], 1))
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted_rating(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).update(**Product.rating_expressions(-int(instance.rating), -1))
+
+
+# keep the denormalized order totals in step with the order items, bumping updated so the order's
+# cached receipt is rendered again
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_totals(sender, instance, **kwargs):
+    if totals_are_deferred():
+        return
+    Order.objects.filter(pk=instance.order_id).update(**Order.totals_expressions(), updated=timezone.now())
+    customer_id = instance.order.customer_id if OrderItem.order.is_cached(instance) else \
+        Order.objects.filter(pk=instance.order_id).values_list('customer_id', flat=True).first()
+    invalidate_active_order(customer_id)
+
+
+# price or discount changes are reflected in open carts only, completed orders keep what was paid
+@receiver(post_save, sender=Product)
+def product_cart_totals(sender, instance, created, **kwargs):
+    if not created:
+        orders = Order.objects.filter(orderitem__product=instance, completed=False)
+        customer_ids = set(orders.values_list('customer_id', flat=True))
+        if customer_ids:
+            orders.update(**Order.totals_expressions(), updated=timezone.now())
+            invalidate_active_order(*customer_ids)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_active_cart(sender, instance, **kwargs):
+    invalidate_active_order(instance.customer_id)
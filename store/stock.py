@@ -0,0 +1,119 @@
+from collections import OrderedDict, namedtuple
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .cart import invalidate_active_order, totals_deferred
+from .models import Order, OrderItem, Product
+
+Shortfall = namedtuple('Shortfall', ['product', 'requested', 'available'])
+
+
+class StockShortage(Exception):
+    """Raised when one or more products do not have enough quantity to cover a reservation."""
+
+    def __init__(self, shortfalls):
+        self.shortfalls = shortfalls
+        super().__init__(", ".join(
+            f"{item.requested} {item.product.name} requested but only {item.available} available"
+            for item in shortfalls
+        ))
+
+
+def _merge(items):
+    # combine repeated products so each one is checked against its total requested quantity
+    requested = OrderedDict()
+    for product_id, quantity in items:
+        if quantity > 0:
+            requested[product_id] = requested.get(product_id, 0) + quantity
+    return requested
+
+
+def _requested_case(requested):
+    return Case(*[When(pk=product_id, then=Value(quantity)) for product_id, quantity in requested.items()],
+                default=Value(0), output_field=IntegerField())
+
+
+def find_shortfalls(items):
+    """Return a Shortfall for every product in items whose quantity cannot cover the requested amount."""
+    requested = _merge(items)
+    products = Product.objects.filter(pk__in=requested).annotate(requested=_requested_case(requested)) \
+        .filter(quantity__lt=F('requested'))
+    return [Shortfall(product, requested[product.pk], max(product.quantity, 0)) for product in products]
+
+
+def reserve_stock(items):
+    """
+    Take (product_id, quantity) pairs out of stock, all or nothing.
+
+    A single guarded UPDATE subtracts every requested quantity where quantity >= requested. If it
+    does not touch every product the transaction is rolled back and StockShortage lists all the
+    products that fell short, so concurrent buyers can never take the last unit twice.
+    """
+    requested = _merge(items)
+    if not requested:
+        return 0
+    try:
+        with transaction.atomic():
+            amount = _requested_case(requested)
+            updated = Product.objects.filter(pk__in=requested).annotate(requested=amount) \
+                .filter(quantity__gte=F('requested')).update(quantity=F('quantity') - amount)
+            if updated != len(requested):
+                raise StockShortage([])
+    except StockShortage:
+        # look the shortfalls up after the rollback so covered products show their real quantity
+        raise StockShortage(find_shortfalls(requested.items())) from None
+    return updated
+
+
+def release_stock(items):
+    """Put (product_id, quantity) pairs back into stock, e.g. for a restock or a cancelled order."""
+    requested = _merge(items)
+    if not requested:
+        return 0
+    return Product.objects.filter(pk__in=requested).update(quantity=F('quantity') + _requested_case(requested))
+
+
+def order_lines(order):
+    return order.orderitem_set.values_list('product_id', 'quantity')
+
+
+def reserve_order(order):
+    """Reserve stock for every item of order, raises StockShortage if any item can't be covered."""
+    return reserve_stock(order_lines(order))
+
+
+def reconcile_order(order):
+    """
+    Bring the order's items back within the quantities in stock.
+
+    One annotated query finds the items asking for more than is available, then a single UPDATE
+    clamps those that still have stock and a single DELETE drops those that are sold out. Returns
+    the Shortfall list so the page can tell the customer what changed; available == 0 means the
+    item was removed from the order.
+    """
+    items = OrderItem.objects.filter(order=order, quantity__gt=F('product__quantity')) \
+        .annotate(available=Greatest(F('product__quantity'), Value(0))).select_related('product')
+    shortfalls, clamped, removed = [], {}, []
+    for item in items:
+        shortfalls.append(Shortfall(item.product, item.quantity, item.available))
+        if item.available > 0:
+            clamped[item.pk] = item.available
+        else:
+            removed.append(item.pk)
+    if not shortfalls:
+        return shortfalls
+    with transaction.atomic():
+        if clamped:
+            OrderItem.objects.filter(pk__in=clamped).update(quantity=Case(
+                *[When(pk=pk, then=Value(quantity)) for pk, quantity in clamped.items()],
+                output_field=IntegerField()))
+        if removed:
+            with totals_deferred():
+                OrderItem.objects.filter(pk__in=removed).delete()
+        Order.objects.filter(pk=order.pk).update(**Order.totals_expressions(), updated=timezone.now())
+    order.refresh_from_db(fields=['cart_items', 'cart_total'])
+    invalidate_active_order(order.customer_id)
+    return shortfalls
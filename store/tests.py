@@ -1,3 +1,224 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from customer.models import Customer
+from store.admin import ProductAdmin
+from store.cart import CartError, active_order_key, apply_cart_operations, get_active_order
+from store.models import Order, OrderItem, Product, Review
+from store.stock import StockShortage, reconcile_order, reserve_order, reserve_stock
+
+
+class StockReservationTest(TestCase):
+
+    def setUp(self):
+        self.comb = Product.objects.create(name="Comb", price=100, quantity=5)
+        self.gel = Product.objects.create(name="Gel", price=300, quantity=1)
+
+    def test_reserve_subtracts_quantities(self):
+        reserve_stock([(self.comb.pk, 2), (self.gel.pk, 1)])
+        self.comb.refresh_from_db()
+        self.gel.refresh_from_db()
+        self.assertEqual(self.comb.quantity, 3)
+        self.assertEqual(self.gel.quantity, 0)
+
+    def test_shortage_reports_every_product_and_changes_nothing(self):
+        with self.assertRaises(StockShortage) as raised:
+            reserve_stock([(self.comb.pk, 6), (self.gel.pk, 2)])
+        self.assertEqual({(s.product.pk, s.requested, s.available) for s in raised.exception.shortfalls},
+                         {(self.comb.pk, 6, 5), (self.gel.pk, 2, 1)})
+        self.comb.refresh_from_db()
+        self.assertEqual(self.comb.quantity, 5)
+
+    def test_partial_shortage_rolls_back_covered_products(self):
+        with self.assertRaises(StockShortage):
+            reserve_stock([(self.comb.pk, 2), (self.gel.pk, 2)])
+        self.comb.refresh_from_db()
+        self.assertEqual(self.comb.quantity, 5)
+
+    def test_repeated_products_are_merged(self):
+        with self.assertRaises(StockShortage):
+            reserve_stock([(self.gel.pk, 1), (self.gel.pk, 1)])
+
+    def test_reconcile_clamps_and_removes_items(self):
+        customer = Customer.objects.create(email="shopper@example.com", username="shopper")
+        order = Order.objects.create(customer=customer, is_active=True, transaction_id="T1")
+        OrderItem.objects.create(order=order, product=self.comb, quantity=7)
+        OrderItem.objects.create(order=order, product=self.gel, quantity=1)
+        Product.objects.filter(pk=self.gel.pk).update(quantity=0)
+        shortfalls = reconcile_order(order)
+        self.assertEqual({(s.product.pk, s.requested, s.available) for s in shortfalls},
+                         {(self.comb.pk, 7, 5), (self.gel.pk, 1, 0)})
+        self.assertEqual(list(order.orderitem_set.values_list('product', 'quantity')), [(self.comb.pk, 5)])
+        self.assertEqual((order.cart_items, order.cart_total), (5, 500))
+        with self.assertNumQueries(1):
+            self.assertEqual(reconcile_order(order), [])
+
+
+class CartOperationsTest(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(email="shopper@example.com", username="shopper")
+        self.products = [Product.objects.create(name=f"Product {number}", price=100 * (number + 1), quantity=3)
+                         for number in range(6)]
+
+    def test_operations_are_applied_and_totals_returned(self):
+        first, second, third = self.products[:3]
+        result = apply_cart_operations(self.customer.pk, [
+            {'action': 'add', 'slug': first.slug, 'quantity': 2},
+            {'action': 'add', 'slug': second.slug},
+            {'action': 'set', 'slug': third.slug, 'quantity': 3},
+            {'action': 'decrease', 'slug': third.slug},
+        ])
+        self.assertEqual(result['cart']['cart_items'], 5)
+        self.assertEqual(result['cart']['cart_total'], 2 * 100 + 200 + 2 * 300)
+        result = apply_cart_operations(self.customer.pk, [
+            {'action': 'remove', 'slug': first.slug},
+            {'action': 'add', 'slug': second.slug, 'quantity': 5},
+        ])
+        self.assertEqual([item['slug'] for item in result['cart']['items']], [second.slug, third.slug])
+        self.assertEqual(len(result['info']), 1)
+        order = Order.objects.get(customer=self.customer, is_active=True, completed=False)
+        self.assertEqual((order.cart_items, order.cart_total), (3, 200 + 2 * 300))
+
+    def test_query_count_does_not_grow_with_operations(self):
+        apply_cart_operations(self.customer.pk, [{'action': 'add', 'slug': self.products[0].slug}])
+        with self.assertNumQueries(10):
+            apply_cart_operations(self.customer.pk, [{'action': 'add', 'slug': self.products[1].slug}])
+        with self.assertNumQueries(10):
+            apply_cart_operations(self.customer.pk, [{'action': 'add', 'slug': product.slug}
+                                                     for product in self.products[2:]])
+
+    def test_removing_items_costs_the_same_queries_for_one_or_many(self):
+        apply_cart_operations(self.customer.pk, [{'action': 'add', 'slug': product.slug} for product in self.products])
+        with self.assertNumQueries(11):
+            apply_cart_operations(self.customer.pk, [{'action': 'remove', 'slug': self.products[0].slug}])
+        with self.assertNumQueries(11):
+            result = apply_cart_operations(self.customer.pk, [{'action': 'remove', 'slug': product.slug}
+                                                              for product in self.products[1:5]])
+        self.assertEqual((result['cart']['cart_items'], result['cart']['cart_total']), (1, 600.0))
+
+    def test_malformed_operations_are_rejected(self):
+        with self.assertRaises(CartError):
+            apply_cart_operations(self.customer.pk, [{'action': 'explode', 'slug': self.products[0].slug}])
+
+
+class ActiveOrderCacheTest(TestCase):
+
+    def test_a_reused_customer_pk_does_not_inherit_the_cached_cart(self):
+        # like query_budget's seeded customers, rolled back with their carts still cached
+        with transaction.atomic():
+            customer = Customer.objects.create(email="gone@example.com", username="gone")
+            Order.objects.create(customer=customer, is_active=True, transaction_id="CART")
+            self.assertIsNotNone(get_active_order(customer))
+            pk = customer.pk
+            transaction.set_rollback(True)
+        newcomer = Customer.objects.create(pk=pk, email="new@example.com", username="new")
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_active_order(newcomer))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_active_order(newcomer))
+
+    def test_invalidated_again_once_committed(self):
+        customer = Customer.objects.create(email="shopper@example.com", username="shopper")
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(customer=customer, is_active=True, transaction_id="CART")
+            # a concurrent request caching the cart before the commit
+            self.assertEqual(get_active_order(customer), order)
+            order.completed = True
+            order.save()
+            cache.set(active_order_key(customer.pk), (order, customer.date_joined))
+        self.assertIsNone(get_active_order(customer))
+
+
+class ProductRatingTest(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(email="customer@example.com", username="customer")
+        self.comb = Product.objects.create(name="Comb", price=100, quantity=5)
+        self.gel = Product.objects.create(name="Gel", price=300, quantity=1)
+
+    def ratings(self, product):
+        product.refresh_from_db()
+        return product.rating_sum, product.rating_count, product.rating_avg
+
+    def review(self, product, rating):
+        return Review.objects.create(product=product, customer=self.customer, review="", rating=rating)
+
+    def test_unreviewed_product(self):
+        self.assertEqual((self.comb.reviews_rating, self.comb.stars), (0.0, [False] * 5))
+
+    def test_reviews_keep_the_aggregates(self):
+        first, _ = self.review(self.comb, 4), self.review(self.comb, 5)
+        self.assertEqual(self.ratings(self.comb), (9, 2, 4.5))
+        first.rating = 1
+        first.save()
+        self.assertEqual(self.ratings(self.comb), (6, 2, 3.0))
+        first.product = self.gel
+        first.save()
+        self.assertEqual((self.ratings(self.comb), self.ratings(self.gel)), ((5, 1, 5.0), (1, 1, 1.0)))
+        first.delete()
+        self.assertEqual(self.ratings(self.gel), (0, 0, 0.0))
+
+    def test_admin_leaves_the_aggregates_to_the_signals(self):
+        admin = ProductAdmin(Product, site)
+        self.assertEqual(set(admin.get_readonly_fields(None)), {'rating_sum', 'rating_count', 'rating_avg'})
+        stale = Product.objects.get(pk=self.comb.pk)
+        self.review(self.comb, 4)
+        stale.name = "Wide Comb"
+        admin.save_model(None, stale, None, True)
+        self.assertEqual(self.ratings(self.comb), (4, 1, 4.0))
+        self.assertEqual(self.comb.name, "Wide Comb")
+
+    def test_listed_by_rating_without_extra_queries(self):
+        self.review(self.gel, 5)
+        self.review(self.comb, 3)
+        with self.assertNumQueries(1):
+            products = [(product.name, product.stars.count(True)) for product in Product.objects.by_rating()]
+        self.assertEqual(products, [("Gel", 5), ("Comb", 3)])
+
+
+class ParallelCheckoutTest(TransactionTestCase):
+    buyers = 8
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Shampoo", price=500, quantity=3)
+        self.orders = []
+        for number in range(self.buyers):
+            customer = Customer.objects.create(email=f"buyer{number}@example.com", username=f"buyer{number}")
+            order = Order.objects.create(customer=customer, is_active=True, transaction_id=f"T{number}")
+            OrderItem.objects.create(order=order, product=self.product, quantity=1)
+            self.orders.append(order)
+
+    def checkout(self, order, barrier, results):
+        barrier.wait()
+        try:
+            while True:
+                try:
+                    reserve_order(order)
+                    results.append(True)
+                    break
+                except StockShortage:
+                    results.append(False)
+                    break
+                except OperationalError:
+                    # sqlite locks the whole database for writers, the client simply retries
+                    continue
+        finally:
+            connection.close()
+
+    def test_last_units_are_never_oversold(self):
+        barrier = threading.Barrier(self.buyers)
+        results = []
+        threads = [threading.Thread(target=self.checkout, args=(order, barrier, results)) for order in self.orders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.product.refresh_from_db()
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(results.count(False), self.buyers - 3)
+        self.assertEqual(self.product.quantity, 0)
@@ -47,8 +47,18 @@ class TrainingApplicationForm(ModelForm):
         model = TrainingApplication
         fields = ['training']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # trainings are labelled with their service's name
+        self.fields['training'].queryset = Training.objects.select_related('service')
+
 
 class TrainingPaymentForm(ModelForm):
     class Meta:
         model = TrainingPayment
         fields = ['training', 'amount', 'mpesa']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # applications are labelled with their training's service and the trainee's name
+        self.fields['training'].queryset = TrainingApplication.objects.select_related('training__service', 'trainee')
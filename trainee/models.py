@@ -5,6 +5,7 @@ from django.dispatch import receiver
 from finance.models import Finance
 from salonist.models import Salonist
 from service.models import Service
+from trainee.receipts import APPROVED_TRAINING_RECEIPT, TRAINING_APPLICATIONS_RECEIPT, applications_receipt_args
 from user.models import CustomUser, Profile, Feedback
 
 
@@ -81,3 +82,11 @@ def trainee_profile(sender, instance, created, **kwargs):
     if created:
         TraineeProfile.objects.create(user=instance)
         instance.traineeprofile.save()
+
+
+# render the trainee's receipts in the background once an application is paid for
+@receiver(post_save, sender=TrainingApplication)
+def training_receipts(sender, instance, **kwargs):
+    if instance.is_paid:
+        APPROVED_TRAINING_RECEIPT.prerender(instance)
+        TRAINING_APPLICATIONS_RECEIPT.prerender(*applications_receipt_args(instance.trainee))
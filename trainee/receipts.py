@@ -0,0 +1,17 @@
+from utils.receipts import Receipt
+
+TRAINING_APPLICATIONS_RECEIPT = Receipt('trainee/receipts/training-application-receipt.html',
+                                        "{object.first_name}-training-application.pdf")
+APPROVED_TRAINING_RECEIPT = Receipt('trainee/receipts/approved-training-application.html',
+                                    "{object.training.service.name}-approved-training-application.pdf")
+
+
+def applications_receipt_args(trainee):
+    """
+    (object, context, updated) for the receipt listing all the trainee's applications, which is
+    cached until the latest of them changes.
+    """
+    from trainee.models import TrainingApplication
+    applications = TrainingApplication.objects.filter(trainee=trainee).select_related('training__service')
+    latest = applications.order_by('-updated').values_list('updated', flat=True).first()
+    return trainee, {'object_list': applications}, latest
@@ -3,22 +3,22 @@ from django.contrib.auth import authenticate, login as auth_login, logout, updat
 from django.contrib.auth.forms import PasswordChangeForm
 from django.core.exceptions import ImproperlyConfigured
 from django.db.models import ExpressionWrapper, F, fields
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
-from django.template.loader import render_to_string
 from django.urls import NoReverseMatch
 from django.utils import timezone
 from django.utils.encoding import force_text
 from django.utils.http import urlsafe_base64_decode
 from django.views import View
 from django.views.generic import ListView, CreateView
-from weasyprint import HTML
 
 from salonist.tokens import account_activation_token
 from trainee.forms import TraineeSignUpForm, TraineeFeedbackForm, TraineeProfileForm, TraineeForm, \
     TrainingApplicationForm, TrainingPaymentForm
 from trainee.models import Trainee, TraineeFeedback, TrainingApplication, TrainingPayment, Training
+from trainee.receipts import APPROVED_TRAINING_RECEIPT, TRAINING_APPLICATIONS_RECEIPT, applications_receipt_args
 from user.models import CustomUser
+from utils.pagination import KeysetListMixin
 from utils.utils import generate_key
 
 
@@ -32,7 +32,7 @@ class Home(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         trainee = self.request.user.trainee
-        context['object_list'] = self.object_list.filter(trainee=trainee)
+        context['object_list'] = self.object_list.filter(trainee=trainee).select_related('training__service')
         context['paid_trainee_count'] = context['object_list'].filter(is_approved=True, is_paid=True).count()
         context['paid_trainee_per'] = int((context['paid_trainee_count'] / context['object_list'].count()) * 100)
         context['not_paid_trainee_count'] = context['object_list'].filter(is_approved=True, is_paid=False).count()
@@ -48,33 +48,14 @@ class Home(ListView):
 
 def training_application_receipt_pdf(request):
     """Generate pdf."""
-    # Model data
     trainee = Trainee.objects.get(id=request.user.id)
-    data = {'object_list': TrainingApplication.objects.filter(trainee=trainee)}
-    # Rendered
-    html_string = render_to_string('trainee/receipts/training-application-receipt.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename={trainee.first_name}-training-application.pdf "
-    return response
+    return TRAINING_APPLICATIONS_RECEIPT.response(*applications_receipt_args(trainee))
 
 
 def approved_training_application_receipt_pdf(request, slug):
     """Generate pdf."""
-    # Model data
-    data = {'object': TrainingApplication.objects.get(id=slug)}
-    # Rendered
-    html_string = render_to_string('trainee/receipts/approved-training-application.html', data)
-    html = HTML(string=html_string)
-    result = html.write_pdf()
-    # Creating http response
-    response = HttpResponse(result, content_type='application/pdf;')
-    response['Content-Disposition'] = f"inline; filename={data['object'].training.service.name}" \
-                                      f"-approved-training-application.pdf "
-    return response
+    return APPROVED_TRAINING_RECEIPT.response(
+        TrainingApplication.objects.select_related('training__service', 'trainee').get(id=slug))
 
 
 def login(request):
@@ -271,16 +252,15 @@ def feedback(request):
     return render(request, 'trainee/forms/feedback.html', data)
 
 
-class TrainingsListView(ListView):
+class TrainingsListView(KeysetListMixin, ListView):
     model = Training
     template_name = "trainee/tables/trainings.html"
+    related = ('service', 'salonist')
 
-    def get_context_data(self, **kwargs):
-        context = super(TrainingsListView, self).get_context_data(**kwargs)
+    def get_queryset(self):
         duration = ExpressionWrapper(F('end_date') - F('date'), output_field=fields.DurationField())
-        context['object_list'] = self.object_list.filter(
+        return super(TrainingsListView, self).get_queryset().filter(
             date__gte=timezone.now(), end_date__gt=timezone.now()).annotate(duration=duration)
-        return context
 
 
 def apply_training(request):
@@ -328,48 +308,42 @@ def training_payment(request):
     return render(request, 'trainee/forms/payment-form.html', data)
 
 
-class PendingTrainingListView(ListView):
+class PendingTrainingListView(KeysetListMixin, ListView):
     model = TrainingApplication
     template_name = "trainee/tables/pending-training-list.html"
+    related = ('training__service',)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        trainee = self.request.user.trainee
-        context['object_list'] = self.object_list.filter(trainee=trainee, is_approved=False)
-        return context
+    def get_queryset(self):
+        return super().get_queryset().filter(trainee=self.request.user.trainee, is_approved=False)
 
 
-class TrainingListView(ListView):
+class TrainingListView(KeysetListMixin, ListView):
     model = TrainingApplication
     template_name = "trainee/tables/training-list.html"
+    related = ('training__service',)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        trainee = self.request.user.trainee
-        context['object_list'] = self.object_list.filter(trainee=trainee, is_approved=True)
-        return context
+    def get_queryset(self):
+        return super().get_queryset().filter(trainee=self.request.user.trainee, is_approved=True)
 
 
-class PendingTrainingPaymentListView(ListView):
+class PendingTrainingPaymentListView(KeysetListMixin, ListView):
     model = TrainingPayment
     template_name = "trainee/tables/pending-payment-list.html"
+    related = ('training__training__service',)
 
-    def get_context_data(self, **kwargs):
-        context = super(PendingTrainingPaymentListView, self).get_context_data(**kwargs)
-        trainee = self.request.user.trainee
-        context['object_list'] = self.object_list.filter(trainee=trainee, is_confirmed=False)
-        return context
+    def get_queryset(self):
+        return super(PendingTrainingPaymentListView, self).get_queryset().filter(
+            trainee=self.request.user.trainee, is_confirmed=False)
 
 
-class TrainingPaymentListView(ListView):
+class TrainingPaymentListView(KeysetListMixin, ListView):
     model = TrainingPayment
     template_name = "trainee/tables/payment-list.html"
+    related = ('training__training__service',)
 
-    def get_context_data(self, **kwargs):
-        context = super(TrainingPaymentListView, self).get_context_data(**kwargs)
-        trainee = self.request.user.trainee
-        context['object_list'] = self.object_list.filter(trainee=trainee, is_confirmed=True)
-        return context
+    def get_queryset(self):
+        return super(TrainingPaymentListView, self).get_queryset().filter(
+            trainee=self.request.user.trainee, is_confirmed=True)
 
 
 def apply_for_training(request, slug):
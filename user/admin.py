@@ -1,6 +1,8 @@
 from django.contrib import admin, messages
+from django.utils import timezone
 from django.utils.translation import ngettext
-from .models import CustomUser, Profile, Feedback
+
+from .models import CustomUser, Profile, Feedback, OutgoingEmail
 
 
 class CustomUserAdmin(admin.ModelAdmin):
@@ -91,6 +93,27 @@ class FeedbackAdmin(admin.ModelAdmin):
         return True
 
 
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'send_after', 'sent', 'created')
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('attempts', 'last_error', 'claim', 'sent')
+
+    actions = ['retry']
+
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=OutgoingEmail.SENT).update(
+            status=OutgoingEmail.PENDING, attempts=0, claim='', send_after=timezone.now())
+        self.message_user(request, ngettext(
+            '%d email will be sent again.',
+            '%d emails will be sent again.',
+            updated,
+        ) % updated, messages.SUCCESS)
+
+    retry.short_description = "Send again"
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Feedback, FeedbackAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
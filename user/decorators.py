@@ -18,14 +18,18 @@ def customer_required(function=None, redirect_field_name=REDIRECT_FIELD_NAME, lo
     return actual_decorator
 
 
+def is_manager(u):
+    return u.is_authenticated and u.is_active and u.is_manager and not u.is_archived and u.is_verified and \
+        u.is_approved
+
+
 def manager_required(function=None, redirect_field_name=REDIRECT_FIELD_NAME, login_url='manager:login'):
     """
     Decorator for views that checks that the logged in user is a manager,
     redirects to the log-in page if necessary.
     """
     actual_decorator = user_passes_test(
-        lambda
-            u: u.is_active and u.is_manager and not u.is_archived and u.is_verified and u.is_approved and u.is_authenticated,
+        is_manager,
         login_url=login_url,
         redirect_field_name=redirect_field_name
     )
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user import outbox
+
+
+class Command(BaseCommand):
+    help = "Sends the due emails of the outbox in batches, each over one connection to the mail server. " \
+           "With --loop it keeps polling for new ones, run it next to the web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Keep sending until interrupted.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds between polls of an empty outbox with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failures = outbox.drain(options['batch_size'])
+            if sent or failures or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Sent {sent} email(s), {failures} failed."))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.12 on 2026-10-18 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_customuser_is_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('html_body', models.TextField(blank=True)),
+                ('from_email', models.CharField(blank=True, max_length=255)),
+                ('recipients', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('send_after', models.DateTimeField(help_text='Not sent before, pushed back while a worker holds it or after a failed attempt')),
+                ('claim', models.CharField(blank=True, help_text='The worker sending it', max_length=32)),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='Sent')),
+                ('updated', models.DateTimeField(auto_now=True, null=True, verbose_name='Updated')),
+                ('created', models.DateTimeField(auto_now_add=True, null=True, verbose_name='Created')),
+            ],
+            options={
+                'verbose_name': 'Outgoing Email',
+                'verbose_name_plural': 'Outbox',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outgoingemail',
+            index=models.Index(fields=['status', 'send_after'], name='user_outgoi_status_248133_idx'),
+        ),
+    ]
@@ -2,7 +2,6 @@ import autoslug
 from autoslug import AutoSlugField
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.core.mail import send_mail
 from django.db import models
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
@@ -11,6 +10,7 @@ from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
 
 from .managers import CustomUserManager
+from .outbox import enqueue_mail
 
 GENDER_TYPES = (
     ('m', 'Male'),
@@ -129,6 +129,38 @@ class Feedback(models.Model):
         verbose_name_plural = 'Feedback'
 
 
+class OutgoingEmail(models.Model):
+    """
+    An email waiting in the outbox. Signals enqueue them in the transaction that saves the row they are
+    about, the send_outbox command delivers them.
+    """
+    PENDING, SENT, FAILED = 'pending', 'sent', 'failed'
+    STATUSES = ((PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed'))
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    send_after = models.DateTimeField(help_text="Not sent before, pushed back while a worker holds it or "
+                                                "after a failed attempt")
+    claim = models.CharField(max_length=32, blank=True, help_text="The worker sending it")
+    sent = models.DateTimeField(_('Sent'), null=True, blank=True)
+    updated = models.DateTimeField(_('Updated'), auto_now=True, null=True)
+    created = models.DateTimeField(_('Created'), auto_now_add=True, null=True)
+
+    class Meta:
+        verbose_name = 'Outgoing Email'
+        verbose_name_plural = 'Outbox'
+        indexes = [models.Index(fields=['status', 'send_after'])]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)}"
+
+
 # signal to send an email to the admin when a user creates a new account
 @receiver(post_save, sender=CustomUser, dispatch_uid='register')
 def register(sender, instance, **kwargs):
@@ -136,19 +168,18 @@ def register(sender, instance, **kwargs):
         subject = 'Verification of the %s account' % instance.get_full_name
         message = 'A new user has registered'
         from_email = settings.EMAIL_HOST_USER
-        send_mail(subject, message, from_email, [from_email], fail_silently=False)
+        enqueue_mail(subject, message, from_email, [from_email])
 
 
 # automatically sends mail to applicant when they click apply button
 @receiver(post_save, sender=Feedback)
 def feedback(sender, instance, created, **kwargs):
     if created:
-        print(instance.admin.email)
         to_email = instance.admin.email
         subject = instance.subject
         msg_plain = render_to_string('applicant/emails/feedback.txt', {'message': instance.message, })
         msg_html = render_to_string('applicant/emails/feedback.html', {
             'instance': instance,
         })
-        send_mail(subject, msg_plain, 'Varal Software Trainee', [to_email], html_message=msg_html)
+        enqueue_mail(subject, msg_plain, 'Varal Software Trainee', [to_email], html_message=msg_html)
 
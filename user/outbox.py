@@ -0,0 +1,113 @@
+import datetime
+import logging
+import uuid
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+# a worker holds the emails it claimed this long, a crashed worker's emails are sent by another after it
+LEASE = datetime.timedelta(minutes=5)
+# wait before the attempt after each failed one, the email is given up on after the last
+RETRY_DELAYS = [datetime.timedelta(minutes=minutes) for minutes in (1, 5, 30, 120)]
+
+
+def enqueue_mail(subject, message, from_email, recipient_list, html_message=None):
+    """send_mail, but the email is written to the outbox and sent later by the send_outbox command."""
+    from .models import OutgoingEmail
+
+    return OutgoingEmail.objects.create(subject=subject, body=message, html_body=html_message or '',
+                                        from_email=from_email or '', recipients=list(recipient_list),
+                                        send_after=timezone.now())
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Lease up to batch_size due emails to this worker, oldest first, and return them."""
+    from .models import OutgoingEmail
+
+    now, token = timezone.now(), uuid.uuid4().hex
+    due = list(OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING, send_after__lte=now)
+               .order_by('send_after', 'pk').values_list('pk', flat=True)[:batch_size])
+    # rechecking send_after in the update leaves out what another worker claimed in the meantime
+    OutgoingEmail.objects.filter(pk__in=due, status=OutgoingEmail.PENDING, send_after__lte=now) \
+        .update(claim=token, send_after=now + LEASE)
+    return list(OutgoingEmail.objects.filter(claim=token).order_by('pk'))
+
+
+def message(email, connection):
+    mail = EmailMultiAlternatives(email.subject, email.body, email.from_email or None, email.recipients,
+                                  connection=connection)
+    if email.html_body:
+        mail.attach_alternative(email.html_body, 'text/html')
+    return mail
+
+
+def failed(email, error):
+    """Record a failed attempt, scheduling the next one or giving up after the last."""
+    from .models import OutgoingEmail
+
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+    email.claim = ''
+    if email.attempts > len(RETRY_DELAYS):
+        email.status = OutgoingEmail.FAILED
+        logger.error("Giving up on outgoing email %s after %d attempts: %s", email.pk, email.attempts,
+                     email.last_error)
+    else:
+        email.send_after = timezone.now() + RETRY_DELAYS[email.attempts - 1]
+    email.save(update_fields=['attempts', 'last_error', 'claim', 'status', 'send_after', 'updated'])
+
+
+def send_batch(batch_size=BATCH_SIZE):
+    """
+    Send a batch of due emails over one connection to the mail server, returning how many were sent and
+    how many failed. An email that fails is retried later on its own, without holding up the batch.
+    """
+    from .models import OutgoingEmail
+
+    emails = claim(batch_size)
+    if not emails:
+        return 0, 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            failed(email, error)
+        return 0, len(emails)
+
+    sent, failures = [], 0
+    try:
+        for email in emails:
+            try:
+                message(email, connection).send()
+            except Exception as error:
+                failures += 1
+                failed(email, error)
+                # the server may have dropped the connection along with the message
+                connection.close()
+                connection.open()
+            else:
+                sent.append(email.pk)
+    except Exception as error:
+        # reconnecting failed, the rest of the batch waits for the next attempt
+        for email in emails[len(sent) + failures:]:
+            failures += 1
+            failed(email, error)
+    finally:
+        connection.close()
+        now = timezone.now()
+        OutgoingEmail.objects.filter(pk__in=sent).update(status=OutgoingEmail.SENT, sent=now, claim='', updated=now)
+    return len(sent), failures
+
+
+def drain(batch_size=BATCH_SIZE):
+    """Send batches until no email is due, returning how many were sent and how many failed."""
+    sent = failures = 0
+    while True:
+        batch_sent, batch_failures = send_batch(batch_size)
+        if not batch_sent and not batch_failures:
+            return sent, failures
+        sent, failures = sent + batch_sent, failures + batch_failures
@@ -1,3 +1,69 @@
-from django.test import TestCase
+import smtplib
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from user import outbox
+from user.models import CustomUser, OutgoingEmail
+
+
+class CountingBackend(locmem.EmailBackend):
+    """The locmem backend, counting its connections and bouncing mail to bounce@example.com."""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if any('bounce@example.com' in message.to for message in messages):
+            raise smtplib.SMTPRecipientsRefused({'bounce@example.com': (550, b"No such user")})
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='user.tests.CountingBackend', EMAIL_HOST_USER='admin@example.com')
+class OutboxTest(TestCase):
+
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def test_signals_enqueue_instead_of_sending(self):
+        CustomUser.objects.create(email="new@example.com", username="new", first_name="New", last_name="User")
+        self.assertEqual(mail.outbox, [])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.subject, email.recipients, email.status),
+                         ("Verification of the New User account", ['admin@example.com'], OutgoingEmail.PENDING))
+
+    def test_batches_are_sent_over_one_connection(self):
+        for number in range(5):
+            outbox.enqueue_mail(f"Email {number}", "Body", "salon@example.com", ["to@example.com"],
+                                html_message="<p>Body</p>")
+        self.assertEqual(outbox.drain(batch_size=3), (5, 0))
+        self.assertEqual(CountingBackend.opened, 2)
+        self.assertEqual([message.subject for message in mail.outbox], [f"Email {number}" for number in range(5)])
+        self.assertEqual(mail.outbox[0].alternatives, [("<p>Body</p>", 'text/html')])
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.SENT, sent__isnull=False).count(), 5)
+        self.assertEqual(outbox.drain(), (0, 0))
+
+    def test_failures_are_retried_then_given_up(self):
+        bounce = outbox.enqueue_mail("Bounce", "Body", "salon@example.com", ["bounce@example.com"])
+        outbox.enqueue_mail("Delivered", "Body", "salon@example.com", ["to@example.com"])
+        self.assertEqual(outbox.drain(), (1, 1))
+        self.assertEqual([message.subject for message in mail.outbox], ["Delivered"])
+        bounce.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.attempts), (OutgoingEmail.PENDING, 1))
+        self.assertGreater(bounce.send_after, timezone.now())
+        self.assertIn("SMTPRecipientsRefused", bounce.last_error)
+
+        def retry():
+            OutgoingEmail.objects.filter(pk=bounce.pk).update(send_after=timezone.now())
+            return outbox.drain()
+
+        for _ in outbox.RETRY_DELAYS[1:]:
+            self.assertEqual(retry(), (0, 1))
+        with self.assertLogs('user.outbox', 'ERROR'):
+            self.assertEqual(retry(), (0, 1))
+        bounce.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.attempts), (OutgoingEmail.FAILED, len(outbox.RETRY_DELAYS) + 1))
@@ -0,0 +1,167 @@
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# variant: (width, height, crop to fill the box rather than fit inside it), twice the size they are shown at
+VARIANTS = {
+    'avatar': (96, 96, True),
+    'thumb': (320, 320, False),
+    'card': (640, 640, False),
+    'large': (1280, 1280, False),
+}
+# (extension, Pillow format, Pillow feature it needs), the last one is the fallback every browser shows
+FORMATS = (('webp', 'WEBP', 'webp'), ('jpg', 'JPEG', 'jpg'))
+QUALITY = 80
+
+_pool = None
+_pending = {}
+# (name, variant) known to be on disk, and names that could not be read, so neither is looked at again
+_ready = set()
+_broken = set()
+_lock = threading.Lock()
+
+
+def pool():
+    """The per-process Pillow pool, started on first use like the receipt pool."""
+    global _pool
+    if _pool is None:
+        _pool = concurrent.futures.ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS,
+                                                       mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+@functools.lru_cache()
+def formats():
+    """(extension, Pillow format) of the FORMATS this Pillow was built to write."""
+    from PIL import features
+
+    return [(extension, image_format) for extension, image_format, feature in FORMATS if features.check(feature)]
+
+
+def variant_name(name, variant, extension):
+    """Where a variant of the upload name is stored, next to it: product/a.png -> product/a.thumb.webp"""
+    path = PurePosixPath(name)
+    return str(path.with_name(f"{path.stem}.{variant}.{extension}"))
+
+
+def transparent(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def flatten(image):
+    """The image without transparency, on white, for formats that have none."""
+    from PIL import Image
+
+    if transparent(image):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def write_variants(root, name):
+    """
+    Write every variant of root/name in every format, in a pool process. Files are written next to their
+    final names and moved into place, so a page never links a partial image.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(Path(root) / name) as original:
+        original = ImageOps.exif_transpose(original)
+        for variant, (width, height, crop) in VARIANTS.items():
+            if crop:
+                image = ImageOps.fit(original, (width, height), Image.LANCZOS)
+            else:
+                # thumbnail only ever shrinks, a small upload keeps its size
+                image = original.copy()
+                image.thumbnail((width, height), Image.LANCZOS)
+            for extension, image_format in formats():
+                path = Path(root) / variant_name(name, variant, extension)
+                handle, temporary = tempfile.mkstemp(dir=path.parent, suffix='.part')
+                try:
+                    with os.fdopen(handle, 'wb') as target:
+                        rendition = flatten(image) if image_format == 'JPEG' else \
+                            image.convert('RGBA' if transparent(image) else 'RGB')
+                        rendition.save(target, image_format, quality=QUALITY, optimize=image_format == 'JPEG')
+                    os.replace(temporary, path)
+                except BaseException:
+                    os.unlink(temporary)
+                    raise
+    return name
+
+
+def generated(name, future):
+    with _lock:
+        _pending.pop(name, None)
+    if future.exception() is not None:
+        _broken.add(name)
+        logger.error("Generating the variants of %s failed", name, exc_info=future.exception())
+
+
+def generate(name):
+    """Generate the variants of the upload name in the pool, unless they exist or are already on their way."""
+    if not name or name in _broken:
+        return
+    if all(exists(name, variant) for variant in VARIANTS):
+        return
+    if not (Path(settings.MEDIA_ROOT) / name).exists():
+        _broken.add(name)
+        logger.info("Can't generate the variants of %s, the file is missing", name)
+        return
+    if not settings.IMAGE_WORKERS:
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(write_variants(settings.MEDIA_ROOT, name))
+        except Exception as error:
+            future.set_exception(error)
+        generated(name, future)
+        return
+    with _lock:
+        if name in _pending:
+            return
+        future = _pending[name] = pool().submit(write_variants, str(settings.MEDIA_ROOT), name)
+    future.add_done_callback(lambda done: generated(name, done))
+
+
+def generate_on_commit(image):
+    """Generate the variants of an ImageField's file once the upload is committed, without waiting for them."""
+    if image:
+        name = image.name
+        transaction.on_commit(lambda: generate(name))
+
+
+def exists(name, variant):
+    if (name, variant) in _ready:
+        return True
+    if all((Path(settings.MEDIA_ROOT) / variant_name(name, variant, extension)).exists()
+           for extension, _ in formats()):
+        _ready.add((name, variant))
+        return True
+    return False
+
+
+def variant_urls(image, variant):
+    """
+    {extension: url} of a variant of an ImageField's file. A variant that isn't there yet is generated in
+    the background and None returned, so the page falls back to the original this once.
+    """
+    if not image:
+        return None
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown image variant {variant!r}, expected one of {', '.join(VARIANTS)}.")
+    if not exists(image.name, variant):
+        generate(image.name)
+        if not exists(image.name, variant):
+            return None
+    return {extension: image.storage.url(variant_name(image.name, variant, extension)) for extension, _ in formats()}
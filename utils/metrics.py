@@ -0,0 +1,226 @@
+import bisect
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the histogram buckets, the last bucket is +Inf
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+BYTES = (1000, 10000, 100000, 1000000, 10000000)
+# name: (help, buckets)
+HISTOGRAMS = {
+    'salon_request_seconds': ("Wall time of the request per route.", SECONDS),
+    'salon_request_db_seconds': ("Time spent in database queries per route.", SECONDS),
+    'salon_request_queries': ("Database queries run per route.", QUERIES),
+    'salon_response_bytes': ("Size of the response body per route.", BYTES),
+}
+# the SQL kept per request for the slow request log, a request running more is truncated
+MAX_STATEMENTS = 100
+UNRESOLVED = '<unresolved>'
+
+
+class Histogram:
+    """A Prometheus style histogram: a count per bucket, the total and the sum of the observations."""
+
+    __slots__ = ('bounds', 'buckets', 'count', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) per bucket, ending with +Inf."""
+        return list(zip([*map(str, self.bounds), '+Inf'], itertools.accumulate(self.buckets)))
+
+
+class Registry:
+    """
+    Request metrics of this process, per URL name: a histogram of each of HISTOGRAMS, responses per status
+    class and the slowest requests along with their SQL.
+
+    Every worker process keeps its own registry, scraping one worker shows that worker's share of the
+    traffic.
+    """
+
+    def __init__(self, slow_log=20):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.statuses = {}
+        self.slow_log = slow_log
+        self.slowest = []
+        self.counter = itertools.count()
+
+    def record(self, route, status, seconds, db_seconds, queries, size, statements=None):
+        with self.lock:
+            histograms = self.routes.get(route)
+            if histograms is None:
+                histograms = self.routes[route] = {name: Histogram(bounds) for name, (_, bounds) in HISTOGRAMS.items()}
+            histograms['salon_request_seconds'].observe(seconds)
+            histograms['salon_request_db_seconds'].observe(db_seconds)
+            histograms['salon_request_queries'].observe(queries)
+            histograms['salon_response_bytes'].observe(size)
+            key = (route, f"{status // 100}xx")
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            if statements is not None and self.slow_log:
+                # a min-heap of the slowest requests, the counter breaks ties without comparing the dicts
+                entry = (seconds, next(self.counter), {
+                    'route': route, 'status': status, 'seconds': round(seconds, 6),
+                    'db_seconds': round(db_seconds, 6), 'queries': queries, 'bytes': size,
+                    'sql': statements,
+                })
+                if len(self.slowest) < self.slow_log:
+                    heapq.heappush(self.slowest, entry)
+                elif seconds > self.slowest[0][0]:
+                    heapq.heapreplace(self.slowest, entry)
+
+    def reset(self):
+        with self.lock:
+            self.routes, self.statuses, self.slowest = {}, {}, []
+
+    def as_json(self):
+        with self.lock:
+            return {
+                'routes': {route: {
+                    name: {'count': histogram.count, 'sum': histogram.sum, 'buckets': dict(histogram.cumulative())}
+                    for name, histogram in histograms.items()
+                } for route, histograms in sorted(self.routes.items())},
+                'responses': [{'route': route, 'status': status, 'count': count}
+                              for (route, status), count in sorted(self.statuses.items())],
+                'slowest': [entry for _, _, entry in sorted(self.slowest, key=lambda entry: entry[0], reverse=True)],
+            }
+
+    def as_prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            routes = sorted(self.routes.items())
+            for name, (description, _) in HISTOGRAMS.items():
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+                for route, histograms in routes:
+                    histogram = histograms[name]
+                    label = f'route="{escape(route)}"'
+                    lines += [f'{name}_bucket{{{label},le="{bound}"}} {count}'
+                              for bound, count in histogram.cumulative()]
+                    lines += [f"{name}_sum{{{label}}} {histogram.sum}", f"{name}_count{{{label}}} {histogram.count}"]
+            lines += ["# HELP salon_responses_total Responses per route and status class.",
+                      "# TYPE salon_responses_total counter"]
+            lines += [f'salon_responses_total{{route="{escape(route)}",status="{status}"}} {count}'
+                      for (route, status), count in sorted(self.statuses.items())]
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry(getattr(settings, 'METRICS_SLOW_LOG', 20))
+
+
+class QueryTimer:
+    """A database execute wrapper adding up the time and number of the queries of one request."""
+
+    __slots__ = ('seconds', 'count', 'statements')
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.seconds += elapsed
+            self.count += 1
+            if len(self.statements) < MAX_STATEMENTS:
+                # only the statement text, formatting the parameters of every query would cost more than timing it
+                self.statements.append((elapsed, sql))
+
+
+def route_name(request):
+    """'namespace:name' of the url the request resolved to, with the app's namespace, not the instance's."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return UNRESOLVED
+    return ':'.join([*match.app_names, match.url_name])
+
+
+class MetricsMiddleware:
+    """
+    Records the wall time, database time, query count and response size of every request into the
+    registry, per URL name. Requests slower than METRICS_SLOW_REQUEST seconds are logged with their SQL
+    and the METRICS_SLOW_LOG slowest of them kept for the metrics endpoint.
+
+    Put it first in MIDDLEWARE so the time covers every other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow = getattr(settings, 'METRICS_SLOW_REQUEST', 1.0)
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+
+        if not response.streaming:
+            self.record(request, response, started, timer, len(response.content))
+        elif getattr(response, 'file_to_stream', None) is not None:
+            # a file is ready once returned, wrapping it would lose the server's sendfile
+            self.record(request, response, started, timer, int(response.get('Content-Length') or 0) or
+                        remaining_size(response.file_to_stream))
+        else:
+            # a streamed body is made while it is sent, its queries and bytes are counted until it is closed
+            sent = [0]
+            response.streaming_content = self.stream(response.streaming_content, timer, sent)
+            response._resource_closers.append(lambda: self.record(request, response, started, timer, sent[0]))
+        return response
+
+    @staticmethod
+    def stream(content, timer, sent):
+        content = iter(content)
+        while True:
+            with connection.execute_wrapper(timer):
+                chunk = next(content, None)
+            if chunk is None:
+                return
+            sent[0] += len(chunk)
+            yield chunk
+
+    def record(self, request, response, started, timer, size):
+        elapsed = time.perf_counter() - started
+        route = route_name(request)
+        statements = None
+        if elapsed >= self.slow:
+            statements = [{'seconds': round(seconds, 6), 'sql': sql}
+                          for seconds, sql in sorted(timer.statements, key=lambda statement: -statement[0])]
+            logger.warning("Slow request %s %s (%s) took %.3fs, %.3fs in %d queries:\n%s", request.method,
+                           request.path, route, elapsed, timer.seconds, timer.count,
+                           '\n'.join(f"{statement['seconds']:.4f}s {statement['sql']}" for statement in statements))
+        registry.record(route, response.status_code, elapsed, timer.seconds, timer.count, size, statements)
+
+
+def remaining_size(file):
+    """Bytes left to read in a file object, 0 if it can't tell."""
+    try:
+        return os.fstat(file.fileno()).st_size - file.tell()
+    except (AttributeError, OSError, ValueError):
+        return 0
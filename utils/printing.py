@@ -0,0 +1,95 @@
+import mimetypes
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+
+PRINT_STYLESHEET = str(Path(__file__).resolve().parent / 'print.css')
+# relative and root relative urls in the html resolve against this, the fetcher maps them to disk
+BASE_URL = 'file:///'
+
+
+def static_path(name):
+    """The file behind a static name, an absolute path is returned as it is."""
+    if Path(name).is_absolute():
+        return Path(name)
+    found = finders.find(name)
+    return Path(found) if found else Path(settings.STATIC_ROOT) / name
+
+
+def asset_path(url):
+    """The local file a url points at: static and media urls on any host or files inside BASE_DIR, else None."""
+    parsed = urlparse(url)
+    path = unquote(parsed.path)
+    try:
+        if path.startswith(settings.STATIC_URL):
+            local = static_path(path[len(settings.STATIC_URL):])
+        elif path.startswith(settings.MEDIA_URL):
+            local = Path(settings.MEDIA_ROOT) / path[len(settings.MEDIA_URL):]
+        elif parsed.scheme == 'file':
+            local = Path(path)
+        else:
+            return None
+    except SuspiciousFileOperation:
+        return None
+    local = local.resolve()
+    return local if Path(settings.BASE_DIR).resolve() in local.parents else None
+
+
+@lru_cache(maxsize=128)
+def read_asset(path):
+    return path.read_bytes()
+
+
+def local_url_fetcher(url, timeout=10, ssl_context=None):
+    """
+    A WeasyPrint url fetcher that only ever reads from disk, so a render never waits on the network.
+
+    Static and media urls are served from their directories whatever host they name, anything else
+    is refused and left out of the document. Files are read once per process.
+    """
+    from weasyprint import default_url_fetcher
+
+    if url.startswith('data:'):
+        return default_url_fetcher(url)
+    path = asset_path(url)
+    if path is None:
+        raise ValueError(f"Not fetching {url}, only local files are printed")
+    return {
+        'string': read_asset(path),
+        'mime_type': mimetypes.guess_type(path.name)[0],
+        'filename': path.name,
+        'redirected_url': url,
+    }
+
+
+@lru_cache(maxsize=None)
+def font_config():
+    """One font configuration per process, so fonts from @font-face rules are loaded once."""
+    from weasyprint.fonts import FontConfiguration
+    return FontConfiguration()
+
+
+@lru_cache(maxsize=None)
+def stylesheet(name):
+    """The stylesheet at a path or static name, parsed once per process and shared by every render."""
+    from weasyprint import CSS
+    return CSS(filename=str(static_path(name)), url_fetcher=local_url_fetcher, font_config=font_config())
+
+
+def document(html_string, stylesheets=(PRINT_STYLESHEET,), base_url=BASE_URL):
+    """html_string laid out with the cached stylesheets, fonts and the local url fetcher."""
+    from weasyprint import HTML
+
+    html = HTML(string=html_string, base_url=base_url, url_fetcher=local_url_fetcher)
+    return html.render(stylesheets=[stylesheet(str(name)) for name in stylesheets], font_config=font_config())
+
+
+def warm_up():
+    """Pool initializer: set Django up and parse the print stylesheet before the first render arrives."""
+    import django
+    django.setup()
+    stylesheet(PRINT_STYLESHEET)
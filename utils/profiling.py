@@ -0,0 +1,107 @@
+import secrets
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from user.decorators import is_manager
+
+PROFILES_DIR = 'profiles'
+RATE_KEY = 'profiling:started'
+
+
+class Sampler(threading.Thread):
+    """
+    Samples the stack of one thread every interval seconds, counting each distinct stack.
+
+    Only the profiled request pays for it, the thread waits on an event between samples.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+    def folded(self):
+        """The samples in the folded stacks format flamegraph.pl, speedscope and inferno read."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def allowed():
+    """Whether another profile fits in PROFILE_RATE per PROFILE_PERIOD seconds, counted in the shared cache."""
+    cache.add(RATE_KEY, 0, settings.PROFILE_PERIOD)
+    try:
+        return cache.incr(RATE_KEY) <= settings.PROFILE_RATE
+    except ValueError:
+        # the window expired between add and incr
+        cache.add(RATE_KEY, 1, settings.PROFILE_PERIOD)
+        return True
+
+
+class ProfilerMiddleware:
+    """
+    Samples a single request on demand, when a manager asks with ?profile=1 or an X-Profile: 1 header,
+    and saves the stacks under MEDIA_ROOT/profiles in the folded format flame graphs are drawn from.
+    The response's X-Profile header names the file.
+
+    One request is profiled at a time per process, at most PROFILE_RATE of them per PROFILE_PERIOD, so
+    it stays safe on live traffic. Put it after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        if not self.requested(request) or not is_manager(request.user) or not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            if not allowed():
+                return self.get_response(request)
+            sampler = Sampler(threading.get_ident(), settings.PROFILE_INTERVAL)
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            response['X-Profile'] = self.save(request, sampler)
+            return response
+        finally:
+            self.lock.release()
+
+    @staticmethod
+    def requested(request):
+        return request.GET.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+
+    @staticmethod
+    def save(request, sampler):
+        """Write the samples to a file named after the route, returning its media url."""
+        match = request.resolver_match
+        route = '-'.join([*match.app_names, match.url_name or 'view']) if match else 'unresolved'
+        # the media root is served, a random suffix keeps the profiles from being guessed
+        name = f"{timezone.now():%Y%m%d-%H%M%S}-{route}-{secrets.token_hex(8)}.folded"
+        path = Path(settings.MEDIA_ROOT) / PROFILES_DIR / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(sampler.folded())
+        return f"{settings.MEDIA_URL}{PROFILES_DIR}/{name}"
@@ -0,0 +1,220 @@
+import datetime
+import itertools
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+SMALL_ROWS = 2
+LARGE_ROWS = 6
+# the user each url namespace is requested as, anonymous when missing
+ROLES = {
+    'customer': 'customer',
+    'finance': 'finance',
+    'manager': 'manager',
+    'salonist': 'salonist',
+    'stock': 'stock',
+    'trainee': 'trainee',
+}
+
+Result = namedtuple('Result', ['route', 'url', 'status', 'small', 'large', 'budget'])
+
+
+class Budget:
+    """
+    The most queries a named route may run against the LARGE_ROWS dataset, and how to request it.
+
+    kwargs returns the url parameters and query the GET parameters, both from the Dataset. known
+    names a query count that still grows with the rows, which is reported but not failed, and skip
+    leaves a route out entirely. Both take the reason.
+    """
+
+    def __init__(self, queries, kwargs=None, query=None, known=None, skip=None):
+        self.queries = queries
+        self.kwargs = kwargs
+        self.query = query
+        self.known = known
+        self.skip = skip
+
+
+def walk(resolver, namespace=None):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name != 'admin':
+                yield from walk(pattern, pattern.app_name or namespace)
+        elif pattern.name and namespace:
+            yield f"{namespace}:{pattern.name}"
+
+
+def named_routes():
+    """Every named route of the project's apps as 'namespace:name', once each in urls.py order."""
+    return list(dict.fromkeys(walk(get_resolver())))
+
+
+class Dataset:
+    """
+    A seeded salon: one verified user per role with a cart for the customer, plus rows of every table the
+    portals list.
+
+    The first row of each kind is kept as an attribute for url parameters, add() appends more
+    rows so the same routes can be measured again against a bigger database.
+    """
+
+    def __init__(self):
+        from customer.models import Customer
+        from finance.models import Finance
+        from manager.models import Manager
+        from salonist.models import Salonist
+        from stock.models import Stock
+        from store.models import Order
+        from trainee.models import Trainee
+
+        self.counter = itertools.count()
+        flags = {'is_active': True, 'is_verified': True, 'is_approved': True}
+        self.customer = Customer.objects.create(email="customer@example.com", username="customer",
+                                                is_customer=True, **flags)
+        self.finance = Finance.objects.create(email="finance@example.com", username="finance",
+                                              is_finance=True, **flags)
+        self.manager = Manager.objects.create(email="manager@example.com", username="manager",
+                                              is_manager=True, **flags)
+        self.salonist = Salonist.objects.create(email="salonist@example.com", username="salonist",
+                                                is_salonist=True, **flags)
+        self.stock = Stock.objects.create(email="stock@example.com", username="stock", is_stock=True, **flags)
+        self.trainee = Trainee.objects.create(email="trainee@example.com", username="trainee",
+                                              is_trainee=True, **flags)
+        self.cart = Order.objects.create(customer=self.customer, is_active=True, transaction_id="CART")
+        self.rows = 0
+
+    def add(self, rows):
+        """Add rows of every kind, owned by the role users where the portals list their own."""
+        from customer.models import Customer
+        from salonist.models import Salonist, Service
+        from service.models import (Appointment, Apprenticeship, ApprenticeshipApplication, Booking,
+                                    BookingPayment, SalonistService)
+        from store.models import Order, OrderItem, OrderPayment, Product, Review, Wishlist
+        from trainee.models import Training, TrainingApplication, TrainingPayment
+
+        start = timezone.now() + datetime.timedelta(days=30)
+        for _ in range(rows):
+            number = next(self.counter)
+            customer = Customer.objects.create(email=f"customer{number}@example.com", username=f"customer{number}",
+                                               first_name="Customer", last_name=str(number))
+            salonist = Salonist.objects.create(email=f"salonist{number}@example.com", username=f"salonist{number}",
+                                               first_name="Salonist", last_name=str(number))
+            service = Service.objects.create(name=f"Service {number}", description="Seeded", price=1000,
+                                             is_active=True)
+            product = Product.objects.create(name=f"Product {number}", price=500, quantity=10, is_active=True,
+                                             image="product/seeded.jpg", description="Seeded")
+            SalonistService.objects.create(salonist=salonist, service=service, is_active=True)
+            Review.objects.create(product=product, customer=customer, review="Seeded", rating=4)
+            Wishlist.objects.create(customer=self.customer, product=product)
+
+            order = Order.objects.create(customer=self.customer, transaction_id=f"ORDER{number}")
+            OrderItem.objects.create(order=order, product=product, quantity=2)
+            OrderItem.objects.create(order=self.cart, product=product, quantity=1)
+            order_payment = OrderPayment.objects.create(order=order, customer=self.customer,
+                                                        transaction_id=f"OP{number}", mpesa=f"MP{number}",
+                                                        amount=1000, confirmed=bool(number % 2))
+            booking = Booking.objects.create(customer=self.customer, service=service,
+                                             transaction_id=f"BOOKING{number}")
+            booking_payment = BookingPayment.objects.create(booking=booking, customer=self.customer,
+                                                            mpesa=f"MB{number}", amount=1000,
+                                                            confirmed=bool(number % 2))
+            appointment_start = start + datetime.timedelta(days=number)
+            appointment = Appointment.objects.create(booking=booking, customer=self.customer, salonist=self.salonist,
+                                                     date=appointment_start,
+                                                     stop_date=appointment_start + datetime.timedelta(hours=1))
+            program = Apprenticeship.objects.create(salonist=self.salonist, date=appointment_start)
+            ApprenticeshipApplication.objects.create(program=program, customer=customer, attended=False)
+
+            training = Training.objects.create(service=service, salonist=self.salonist, price=3000,
+                                               date=appointment_start,
+                                               end_date=appointment_start + datetime.timedelta(days=7))
+            application = TrainingApplication.objects.create(code=f"TA{number}", training=training,
+                                                             trainee=self.trainee, is_approved=bool(number % 2))
+            training_payment = TrainingPayment.objects.create(code=f"TP{number}", training=application,
+                                                              trainee=self.trainee, finance=self.finance,
+                                                              mpesa=f"MT{number}", amount=3000,
+                                                              is_confirmed=bool(number % 2))
+            if not self.rows:
+                self.service, self.product, self.order, self.order_payment = service, product, order, order_payment
+                self.booking, self.booking_payment, self.appointment = booking, booking_payment, appointment
+                self.training, self.application, self.training_payment = training, application, training_payment
+            self.rows += 1
+
+
+def measure(dataset, route, budget):
+    """
+    Request route as its namespace's user with a cold cache, rolling back whatever the request changed, so
+    the count doesn't depend on what the routes before it cached.
+    """
+    namespace = route.split(':')[0]
+    client = Client(raise_request_exception=False)
+    if ROLES.get(namespace):
+        client.force_login(getattr(dataset, ROLES[namespace]))
+    url = reverse(route, kwargs=budget.kwargs(dataset) if budget.kwargs else None)
+    cache.clear()
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, budget.query(dataset) if budget.query else None)
+        transaction.set_rollback(True)
+    return url, response.status_code, len(queries)
+
+
+def run(budgets, small=SMALL_ROWS, large=LARGE_ROWS):
+    """
+    Request every budgeted route against small rows of everything, then again against large rows,
+    returning a Result per route. Call it inside a test, the rows are committed to the database.
+    """
+    dataset = Dataset()
+    dataset.add(small)
+    routes = [route for route in named_routes() if route in budgets and not budgets[route].skip]
+    first = {route: measure(dataset, route, budgets[route]) for route in routes}
+    dataset.add(large - small)
+    results = []
+    for route in routes:
+        url, status, queries = measure(dataset, route, budgets[route])
+        results.append(Result(route, url, max(status, first[route][1]), first[route][2], queries, budgets[route]))
+    return results
+
+
+def failures(result):
+    """What is wrong with a result, an empty list when it is within its budget."""
+    problems = []
+    if result.status >= 500:
+        problems.append(f"responded {result.status}")
+    if result.large > result.budget.queries:
+        problems.append(f"{result.large} queries over the budget of {result.budget.queries}")
+    if result.large > result.small and not result.budget.known:
+        problems.append(f"{result.small} -> {result.large} queries for {SMALL_ROWS} -> {LARGE_ROWS} rows")
+    return problems
+
+
+def report(results, budgets, worst=10):
+    """A pytest style summary: failures, known N+1 and skipped routes, then the routes running the most queries."""
+    routes = named_routes()
+    unbudgeted = [route for route in routes if route not in budgets]
+    skipped = [route for route in routes if route in budgets and budgets[route].skip]
+    failed = [(result, failures(result)) for result in results if failures(result)]
+    known = [result for result in results if result.budget.known and result.large > result.small]
+
+    lines = [f"{'=' * 20} query budget: {len(results)} routes measured, {len(failed)} failed, "
+             f"{len(known)} known N+1, {len(skipped)} skipped, {len(unbudgeted)} without a budget {'=' * 20}"]
+    for result, problems in failed:
+        lines.append(f"FAILED {result.route} ({result.url}) - {'; '.join(problems)}")
+    for route in unbudgeted:
+        lines.append(f"FAILED {route} - no query budget declared")
+    for result in known:
+        lines.append(f"XFAIL {result.route} - {result.small} -> {result.large} queries, {result.budget.known}")
+    for route in skipped:
+        lines.append(f"SKIPPED {route} - {budgets[route].skip}")
+    lines.append(f"{'-' * 20} worst offenders {'-' * 20}")
+    for result in sorted(results, key=lambda result: (result.large - result.small, result.large),
+                         reverse=True)[:worst]:
+        lines.append(f"{result.large:5} queries {result.large - result.small:+4} growth  "
+                     f"budget {result.budget.queries:4}  {result.route}")
+    return '\n'.join(lines)
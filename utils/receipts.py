@@ -0,0 +1,116 @@
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, JsonResponse
+from django.template.loader import render_to_string
+
+from .printing import document, warm_up
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def pool():
+    """The per-process WeasyPrint pool, started on first use so only workers that render pay for it."""
+    global _pool
+    if _pool is None:
+        # spawn rather than fork, the web worker may hold threads and database connections
+        # workers parse the print stylesheet as they start and keep it, with the fonts, for every receipt
+        _pool = concurrent.futures.ProcessPoolExecutor(max_workers=settings.RECEIPT_WORKERS,
+                                                       mp_context=multiprocessing.get_context('spawn'),
+                                                       initializer=warm_up)
+    return _pool
+
+
+def write_pdf(html_string, path):
+    """
+    Render html_string to path with WeasyPrint, in a pool process.
+
+    The pdf is written next to its final name and moved into place, so readers never see a partial
+    file, then older versions of the same receipt are removed.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=path.parent, suffix='.part')
+    try:
+        with os.fdopen(handle, 'wb') as target:
+            document(html_string).write_pdf(target)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    stem = path.name.rsplit('-', 1)[0]
+    for stale in path.parent.glob(f"{stem}-*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return str(path)
+
+
+class Receipt:
+    """
+    A pdf receipt rendered from template_name, cached on disk under RECEIPTS_ROOT by model, pk and
+    the object's updated timestamp, so a receipt is only rendered again after the object changes.
+    filename is formatted with the object for the Content-Disposition header.
+    """
+
+    def __init__(self, template_name, filename):
+        self.template_name = template_name
+        self.filename = filename
+
+    def path(self, obj, updated=None):
+        updated = updated or obj.updated
+        stamp = updated.strftime('%Y%m%d%H%M%S%f') if updated else 'none'
+        return Path(settings.RECEIPTS_ROOT) / obj._meta.label_lower / str(obj.pk) / \
+            f"{Path(self.template_name).stem}-{stamp}.pdf"
+
+    def render(self, obj, context=None, updated=None):
+        """A future for the cached pdf, rendering it in the pool unless it exists or is already on its way."""
+        path = self.path(obj, updated)
+        with _lock:
+            future = _pending.get(path)
+        if future is not None:
+            return future
+        if path.exists():
+            future = concurrent.futures.Future()
+            future.set_result(str(path))
+            return future
+        html_string = render_to_string(self.template_name, context or {'object': obj})
+        if not settings.RECEIPT_WORKERS:
+            future = concurrent.futures.Future()
+            future.set_result(write_pdf(html_string, path))
+            return future
+        with _lock:
+            if path in _pending:
+                return _pending[path]
+            future = _pending[path] = pool().submit(write_pdf, html_string, str(path))
+        future.add_done_callback(lambda done: self.rendered(path, done))
+        return future
+
+    def rendered(self, path, future):
+        with _lock:
+            _pending.pop(path, None)
+        if future.exception() is not None:
+            logger.error("Rendering receipt %s failed", path, exc_info=future.exception())
+
+    def prerender(self, obj, context=None, updated=None):
+        """Start rendering once the current transaction commits, without waiting for the pdf."""
+        transaction.on_commit(lambda: self.render(obj, context, updated))
+
+    def response(self, obj, context=None, updated=None):
+        try:
+            path = self.render(obj, context, updated).result(timeout=settings.RECEIPT_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            return JsonResponse({'info': "Your receipt is still being prepared, try again in a moment."}, status=202)
+        response = FileResponse(open(path, 'rb'), content_type='application/pdf')
+        response['Content-Disposition'] = f"inline; filename={self.filename.format(object=obj)}"
+        return response
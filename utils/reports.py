@@ -0,0 +1,123 @@
+import csv
+import datetime
+import math
+import tempfile
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .printing import document
+
+REPORT_CHUNK = 500
+PDF_BATCH = 250
+PDF_ROWS = 2000
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def chunks(queryset, size=REPORT_CHUNK):
+    """
+    Yield the queryset in lists of size rows, ordered by primary key.
+
+    Every chunk is its own keyset query, so select_related and prefetch_related apply to it and only
+    one chunk is ever held in memory, however large the table is.
+    """
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        rows = list((queryset if last is None else queryset.filter(pk__gt=last))[:size])
+        if rows:
+            yield rows
+        if len(rows) < size:
+            return
+        last = rows[-1].pk
+
+
+class Echo:
+    """A file-like object csv.writer can write a single row to and get it back as a string."""
+
+    def write(self, value):
+        return value
+
+
+def spreadsheet_value(value):
+    # excel has no time zones
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+class Report:
+    """
+    A tabular report over a queryset, exported as streamed CSV, XLSX or paged PDF.
+
+    columns is a list of (header, accessor) pairs, the accessor returns a cell from one object.
+    The PDF renders template_name with object_list in batches of PDF_BATCH rows and stops at
+    PDF_ROWS rows, the page query parameter selects which PDF_ROWS rows to print.
+    """
+
+    def __init__(self, title, template_name, filename, columns):
+        self.title = title
+        self.template_name = template_name
+        self.filename = filename
+        self.columns = columns
+
+    def rows(self, queryset):
+        yield [header for header, _ in self.columns]
+        for chunk in chunks(queryset):
+            for obj in chunk:
+                yield [accessor(obj) for _, accessor in self.columns]
+
+    def csv(self, queryset):
+        writer = csv.writer(Echo())
+        response = StreamingHttpResponse((writer.writerow(row) for row in self.rows(queryset)),
+                                         content_type='text/csv')
+        response['Content-Disposition'] = f"attachment; filename={self.filename}.csv"
+        return response
+
+    def xlsx(self, queryset):
+        from openpyxl import Workbook
+
+        # write only workbooks stream their rows to a temporary file instead of keeping them in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(self.title[:31])
+        for row in self.rows(queryset):
+            sheet.append([spreadsheet_value(value) for value in row])
+        target = tempfile.TemporaryFile()
+        workbook.save(target)
+        target.seek(0)
+        return FileResponse(target, as_attachment=True, filename=f"{self.filename}.xlsx",
+                            content_type=XLSX_CONTENT_TYPE)
+
+    def pdf(self, queryset, page=1):
+        total = queryset.count()
+        pages = max(math.ceil(total / PDF_ROWS), 1)
+        page = min(max(page, 1), pages)
+        start = (page - 1) * PDF_ROWS
+        documents = []
+        for offset in range(start, min(start + PDF_ROWS, total) or 1, PDF_BATCH):
+            batch = queryset.order_by('pk')[offset:min(offset + PDF_BATCH, start + PDF_ROWS)]
+            html_string = render_to_string(self.template_name, {
+                'object_list': batch,
+                'offset': offset,
+                'first_batch': offset == start,
+                'page': page,
+                'pages': pages,
+            })
+            # every batch is laid out on its own, the pages are merged into one document at the end
+            documents.append(document(html_string))
+        merged = documents[0].copy([laid_out for document in documents for laid_out in document.pages])
+        response = HttpResponse(merged.write_pdf(), content_type='application/pdf;')
+        suffix = f"-{page}" if pages > 1 else ""
+        response['Content-Disposition'] = f"inline; filename={self.filename}{suffix}.pdf "
+        return response
+
+    def response(self, request, queryset):
+        """The report in the format query parameter: csv, xlsx or the default pdf."""
+        export = request.GET.get('format')
+        if export == 'csv':
+            return self.csv(queryset)
+        if export == 'xlsx':
+            return self.xlsx(queryset)
+        page = request.GET.get('page', '')
+        return self.pdf(queryset, int(page) if page.isdigit() else 1)
@@ -0,0 +1,240 @@
+import gzip
+import mimetypes
+import os
+import re
+import tempfile
+from pathlib import Path
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.functional import cached_property
+from django.utils.http import parse_etags
+
+from utils.storage import BLOBS_DIR
+
+# files worth compressing, images and fonts other than the old ones are compressed already
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt', '.xml', '.ico', '.ttf', '.otf',
+                '.eot'}
+# (content coding, extension of the file holding it), in the order they are preferred
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+MIN_SIZE = 256
+ONE_YEAR = 365 * 24 * 60 * 60
+CHUNK_SIZE = 64 * 1024
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+# extension: compress(data) of the ENCODINGS
+COMPRESSORS = {
+    '.br': lambda data: brotli.compress(data, quality=11),
+    '.gz': lambda data: gzip.compress(data, 9, mtime=0),
+}
+
+
+def compress(path):
+    """
+    Write path.gz and path.br next to path, where they are smaller, for StaticFilesMiddleware to serve
+    instead. Variants newer than path are kept. Returns how many were written.
+    """
+    path = Path(path)
+    source = path.stat()
+    if path.suffix.lower() not in COMPRESSIBLE or source.st_size < MIN_SIZE:
+        return 0
+    data = None
+    written = 0
+    for extension, compressor in COMPRESSORS.items():
+        target = path.with_name(path.name + extension)
+        if target.exists() and target.stat().st_mtime >= source.st_mtime:
+            continue
+        if data is None:
+            data = path.read_bytes()
+        compressed = compressor(data)
+        # a variant hardly smaller isn't worth the CPU it costs the browser
+        if len(compressed) > len(data) * 0.95:
+            target.unlink(missing_ok=True)
+            continue
+        handle, temporary = tempfile.mkstemp(dir=path.parent, suffix='.part')
+        with os.fdopen(handle, 'wb') as file:
+            file.write(compressed)
+        os.replace(temporary, target)
+        written += 1
+    return written
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    """
+    Collects every file also under a name with the hash of its content, listed in staticfiles.json, which
+    {% static %} links to so browsers can cache it for good, and writes gzip and brotli variants of the
+    text files of STATIC_ROOT for StaticFilesMiddleware.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for directory, _, files in os.walk(self.location):
+            for file in files:
+                compress(Path(directory, file))
+
+    def stored_name(self, name):
+        # a file collectstatic didn't see is linked unhashed rather than failing the page
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+def accepted_encodings(header):
+    """The content codings an Accept-Encoding header doesn't refuse with q=0."""
+    codings = set()
+    for part in header.split(','):
+        coding, _, parameters = part.partition(';')
+        if not re.match(r'^\s*q\s*=\s*0(\.0*)?\s*$', parameters):
+            codings.add(coding.strip().lower())
+    return codings
+
+
+def byte_range(header, size):
+    """
+    (start, end inclusive) of a single range Range header, None to send the whole file for headers that
+    aren't one, or False for a range outside it.
+    """
+    match = RANGE.match(header.strip())
+    if match is None or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if size == 0 or start > end or start >= size:
+        return False
+    return start, end
+
+
+def set_headers(response, headers):
+    for header, value in headers.items():
+        response[header] = value
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+class StaticFilesMiddleware:
+    """
+    Serves STATIC_ROOT and MEDIA_ROOT from the app itself, without a web server in front of it.
+
+    Hashed names, the ones collectstatic listed in its manifest and uploads stored under blobs/, are
+    cached for a year, the others for STATIC_MAX_AGE seconds. Every file has an ETag to revalidate it
+    with, static ones are sent precompressed to the browsers accepting brotli or gzip, and single byte
+    ranges are honoured for the uncompressed files.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def roots():
+        # (url prefix, directory, static or uploads)
+        return [(url, root, static) for url, root, static in (
+            (settings.STATIC_URL, settings.STATIC_ROOT, True), (settings.MEDIA_URL, settings.MEDIA_ROOT, False))
+            if url and root and url.startswith('/')]
+
+    @cached_property
+    def hashed(self):
+        return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            for url, root, static in self.roots():
+                if request.path_info.startswith(url):
+                    response = self.serve(request, root, request.path_info[len(url):], static)
+                    if response is not None:
+                        return response
+        return self.get_response(request)
+
+    def immutable(self, name, static):
+        return name in self.hashed if static else name.startswith(f'{BLOBS_DIR}/')
+
+    def serve(self, request, root, name, static):
+        """The response for root/name, or None if there's no such file, for the urls to answer."""
+        try:
+            path = Path(safe_join(root, name))
+        except SuspiciousFileOperation:
+            return None
+        try:
+            stat = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not path.is_file():
+            return None
+
+        content_type, encoding = mimetypes.guess_type(path.name)
+        ranged = 'HTTP_RANGE' in request.META
+        if static and not ranged and not encoding:
+            codings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            for coding, extension in ENCODINGS:
+                if coding in codings:
+                    try:
+                        variant = path.with_name(path.name + extension)
+                        stat, path, encoding = variant.stat(), variant, coding
+                        break
+                    except FileNotFoundError:
+                        continue
+
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{"-" + encoding if encoding else ""}"'
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f'public, max-age={ONE_YEAR}, immutable' if self.immutable(name, static)
+            else f'public, max-age={settings.STATIC_MAX_AGE}',
+            'X-Content-Type-Options': 'nosniff',
+        }
+        if static:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            response = HttpResponse(status=304)
+            set_headers(response, headers)
+            return response
+
+        start, end = 0, stat.st_size - 1
+        status = 200
+        if not encoding:
+            headers['Accept-Ranges'] = 'bytes'
+            if ranged and request.META.get('HTTP_IF_RANGE', etag) == etag:
+                requested = byte_range(request.META['HTTP_RANGE'], stat.st_size)
+                if requested is False:
+                    response = HttpResponse(status=416)
+                    set_headers(response, headers)
+                    response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+                    return response
+                if requested:
+                    (start, end), status = requested, 206
+                    headers['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+        content_type = content_type or 'application/octet-stream'
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type, status=status)
+        elif status == 206:
+            response = StreamingHttpResponse(read_range(path, start, end - start + 1), content_type=content_type,
+                                             status=status)
+        else:
+            response = FileResponse(path.open('rb'), filename=Path(name).name)
+        set_headers(response, headers)
+        response.headers['Content-Type'] = content_type
+        response.headers['Content-Length'] = end - start + 1
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,111 @@
+import hashlib
+from collections import Counter
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.db.models import Count, F
+
+BLOBS_DIR = 'blobs'
+CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_name(digest, extension):
+    """Where the content with the sha256 digest is stored: blobs/3f/a9/3fa9....jpg"""
+    return f"{BLOBS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Stores every upload once, named by the sha256 of its content, whatever the field's upload_to says.
+    Uploading a file that is already stored only returns its name, so re-uploads and the same photo used
+    by several rows share one file, and its URL never changes for caches.
+
+    Each stored file has a home.MediaBlob row counting the rows referencing it, kept by the home receivers,
+    so the collect_media command can delete what nothing references any more.
+    """
+
+    def _save(self, name, content):
+        content.seek(0)
+        name = blob_name(content_hash(content.chunks(CHUNK_SIZE)), PurePosixPath(name).suffix)
+        content.seek(0)
+        if not self.exists(name):
+            name = super()._save(name, content)
+        MediaBlob = apps.get_model('home', 'MediaBlob')
+        MediaBlob.objects.get_or_create(name=name, defaults={'size': self.size(name)})
+        return name
+
+
+def file_fields():
+    """(model, field) of every file field stored by a ContentHashStorage, inherited ones once."""
+    return [(model, field) for model in apps.get_models() for field in model._meta.local_concrete_fields
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentHashStorage)]
+
+
+def retain(*names):
+    """Count one more reference to each stored file named."""
+    MediaBlob = apps.get_model('home', 'MediaBlob')
+    for name, count in Counter(filter(None, names)).items():
+        MediaBlob.objects.filter(name=name).update(references=F('references') + count)
+
+
+def release(*names):
+    """Count one reference less to each stored file named, collect_media deletes those left at none."""
+    MediaBlob = apps.get_model('home', 'MediaBlob')
+    for name, count in Counter(filter(None, names)).items():
+        MediaBlob.objects.filter(name=name).update(references=F('references') - count)
+
+
+def stored_names(instance):
+    """
+    {field attname: file name} of the instance's hash stored file fields, read without building a FieldFile
+    for each, None for a deferred field.
+    """
+    names = {}
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentHashStorage):
+            value = instance.__dict__.get(field.attname)
+            names[field.attname] = getattr(value, 'name', value) or '' if field.attname in instance.__dict__ else None
+    return names
+
+
+def recount():
+    """Set every MediaBlob's references from the rows of every file field, returning how many changed."""
+    MediaBlob = apps.get_model('home', 'MediaBlob')
+    counts = Counter()
+    for model, field in file_fields():
+        rows = model._base_manager.exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+        for name, count in rows.order_by().values_list(field.attname).annotate(count=Count('pk')):
+            counts[name] += count
+    stale = []
+    for blob in MediaBlob.objects.only('pk', 'name', 'references').iterator():
+        if blob.references != counts[blob.name]:
+            blob.references = counts[blob.name]
+            stale.append(blob)
+    MediaBlob.objects.bulk_update(stale, ['references'], batch_size=500)
+    return len(stale)
+
+
+def delete_blob(storage, blob):
+    """
+    Delete an unreferenced stored file, the variants utils.images made of it and its MediaBlob row. Returns
+    False, deleting nothing, if a row started referencing it since it was read.
+    """
+    from utils.images import VARIANTS, FORMATS, variant_name
+
+    deleted, _ = type(blob).objects.filter(pk=blob.pk, references__lte=0).delete()
+    if not deleted:
+        return False
+    storage.delete(blob.name)
+    for variant in VARIANTS:
+        for extension, *_ in FORMATS:
+            storage.delete(variant_name(blob.name, variant, extension))
+    return True
@@ -0,0 +1,442 @@
+import datetime
+import random
+import string
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from service.scheduling import CLOSING_TIME, OPENING_TIME, SLOT_STEP
+
+BATCH_SIZE = 5000
+# rows of every kind at --scale 1, the rest is derived from them per product, customer, order and booking
+VOLUME = {
+    'managers': 2,
+    'finance': 3,
+    'stock': 2,
+    'customers': 5000,
+    'salonists': 100,
+    'trainees': 500,
+    'services': 60,
+    'products': 1000,
+    'orders': 20000,
+    'bookings': 10000,
+    'trainings': 50,
+}
+# role model: (flag set on its users, the profile its post_save receiver creates for each of them)
+ROLES = {
+    'manager.Manager': ('is_manager', 'manager.ManagerProfile'),
+    'finance.Finance': ('is_finance', 'finance.FinanceProfile'),
+    'stock.Stock': ('is_stock', 'stock.StockProfile'),
+    'customer.Customer': ('is_customer', 'customer.CustomerProfile'),
+    'salonist.Salonist': ('is_salonist', 'salonist.SalonistProfile'),
+    'trainee.Trainee': ('is_trainee', 'trainee.TraineeProfile'),
+}
+
+FIRST_NAMES = ("Achieng", "Akinyi", "Amani", "Baraka", "Chebet", "Faith", "Grace", "Halima", "Imani", "Jabali",
+               "Jeptoo", "Kamau", "Kerubo", "Kibet", "Makena", "Mercy", "Mumbua", "Njeri", "Nyokabi", "Otieno",
+               "Shani", "Wambui", "Wanjiku", "Zawadi")
+LAST_NAMES = ("Chege", "Kariuki", "Kiprono", "Korir", "Macharia", "Mutua", "Mwangi", "Njoroge", "Nyambura",
+              "Ochieng", "Odhiambo", "Omondi", "Onyango", "Wafula", "Wanjiru", "Wekesa")
+STYLES = ("Box Braids", "Knotless Braids", "Cornrows", "Twists", "Locs Retwist", "Silk Press", "Wash and Set",
+          "Blow Dry", "Weave", "Wig Install", "Relaxer", "Treatment", "Trim", "Bob Cut", "Pixie Cut", "Colour")
+PRODUCTS = ("Shampoo", "Conditioner", "Hair Oil", "Leave-in Cream", "Edge Control", "Hair Mask", "Serum",
+            "Curl Cream", "Gel", "Spray", "Wig", "Braiding Hair", "Bonnet", "Comb", "Brush")
+INGREDIENTS = ("Argan", "Coconut", "Shea", "Castor", "Avocado", "Aloe", "Honey", "Olive", "Jojoba", "Tea Tree")
+DISCOUNTS = (1.0,) * 8 + (0.9, 0.85, 0.8, 0.75, 0.5)
+CODE = string.ascii_uppercase + string.digits
+
+
+@contextmanager
+def explicit_timestamps():
+    """
+    Let bulk_create keep the created and updated times it is given, so the generated history spreads
+    over the calendar instead of every row being stamped now.
+    """
+    fields = {field: (field.auto_now, field.auto_now_add) for model in apps.get_models()
+              for field in model._meta.local_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)}
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in fields.items():
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def insert_inherited(model, objs, batch_size=BATCH_SIZE):
+    """
+    bulk_create refuses multi-table inherited models, so insert the rows of every table in the chain
+    directly, the base model's first. The objects must be given their primary keys.
+    """
+    for table in [*reversed(model._meta.get_parent_list()), model]:
+        fields = table._meta.local_concrete_fields
+        insert = f"INSERT INTO {connection.ops.quote_name(table._meta.db_table)} " \
+                 f"({', '.join(connection.ops.quote_name(field.column) for field in fields)}) " \
+                 f"VALUES ({', '.join(['%s'] * len(fields))})"
+        rows = [[field.get_db_prep_save(
+            getattr(obj, field.target_field.attname) if field.remote_field and field.remote_field.parent_link
+            else field.pre_save(obj, add=True), connection) for field in fields] for obj in objs]
+        with connection.cursor() as cursor:
+            for first in range(0, len(rows), batch_size):
+                cursor.executemany(insert, rows[first:first + batch_size])
+
+
+class Writer:
+    """Buffers new rows per model and bulk_creates them batch_size at a time, parents before children."""
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.written = Counter()
+
+    def add(self, obj):
+        buffer = self.buffers.setdefault(type(obj), [])
+        buffer.append(obj)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for model, buffer in self.buffers.items():
+            if not buffer:
+                continue
+            if model._meta.parents:
+                insert_inherited(model, buffer, self.batch_size)
+            else:
+                model.objects.bulk_create(buffer, batch_size=self.batch_size)
+            self.written[model._meta.label] += len(buffer)
+            buffer.clear()
+
+
+class Generator:
+    """
+    Writes a synthetic salon: users of every role, the catalogue, and a history of orders, bookings,
+    appointments, payments, trainings and apprenticeships over the days before until.
+
+    Every row is given a primary key after the existing ones, so related rows are written without reading
+    anything back, and the same seed, volume and until on the same database give the same rows. No signals
+    are sent for bulk created rows, so the profiles, order totals, product ratings, salonist loads and
+    customer activity the receivers would keep are written directly, and the revenue rollups and search
+    index rebuilt at the end.
+    """
+
+    def __init__(self, volume, seed=2022, until=None, days=365, password=None, batch_size=BATCH_SIZE):
+        self.volume = volume
+        self.random = random.Random(seed)
+        self.until = datetime.datetime.combine(until or timezone.localdate(), datetime.time())
+        self.days = days
+        # the history is generated in local wall clock time and stored with the offset at until
+        self.offset = timezone.make_aware(self.until).utcoffset() if settings.USE_TZ else None
+        # one hash for everybody, hashing a password per user would take longer than everything else
+        self.password = make_password(password)
+        self.batch_size = batch_size
+        self.writer = Writer(batch_size)
+        self.next_ids = {}
+        self.activity = defaultdict(Counter)
+        self.last_activity = {}
+
+    @property
+    def written(self):
+        return self.writer.written
+
+    def aware(self, moment):
+        return moment if self.offset is None else (moment - self.offset).replace(tzinfo=datetime.timezone.utc)
+
+    def ids(self, model, count):
+        """Reserve count primary keys of model after the ones in the database and the ones reserved before."""
+        # inherited models share the primary keys of their base model's table
+        model = model._meta.get_parent_list()[-1] if model._meta.parents else model
+        if model not in self.next_ids:
+            self.next_ids[model] = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        start = self.next_ids[model]
+        self.next_ids[model] += count
+        return range(start, start + count)
+
+    def next_id(self, model):
+        return self.ids(model, 1)[0]
+
+    def moments(self, count, start=None):
+        """count local times between start, by default days before until, and until, in order."""
+        start = start or self.until - datetime.timedelta(days=self.days)
+        span = int((self.until - start).total_seconds())
+        return [start + datetime.timedelta(seconds=second)
+                for second in sorted(self.random.randrange(span) for _ in range(count))]
+
+    def code(self, length=10):
+        return ''.join(self.random.choices(CODE, k=length))
+
+    def touch(self, customer, moment):
+        self.last_activity[customer] = max(moment, self.last_activity.get(customer, moment))
+
+    def generate(self):
+        """Write everything, returning how many rows the rebuilt rollups and index hold."""
+        with explicit_timestamps():
+            self.managers = self.users('manager.Manager', self.volume['managers'])
+            self.finance = self.users('finance.Finance', self.volume['finance'])
+            self.stock = self.users('stock.Stock', self.volume['stock'])
+            self.customers = self.users('customer.Customer', self.volume['customers'], inactive=0.05)
+            self.salonists = self.users('salonist.Salonist', self.volume['salonists'], inactive=0.05)
+            self.trainees = self.users('trainee.Trainee', self.volume['trainees'])
+            self.catalogue()
+            self.orders()
+            self.bookings()
+            self.trainings()
+            self.apprenticeships()
+            self.customer_activity()
+            self.writer.flush()
+        return self.rebuild()
+
+    def users(self, model, count, inactive=0.0):
+        """Users of a role along with the profile the role's post_save receiver would have created for them."""
+        model = apps.get_model(model)
+        flag, profile = ROLES[model._meta.label]
+        profile = apps.get_model(profile)
+        role = model._meta.model_name
+        ids = self.ids(model, count)
+        for pk, when in zip(ids, self.moments(count)):
+            email = f"{role}{pk}@example.com"
+            created = self.aware(when)
+            self.writer.add(model(
+                id=pk, email=email, username=f"{role}{pk}", slug=slugify(email), password=self.password,
+                first_name=self.random.choice(FIRST_NAMES), last_name=self.random.choice(LAST_NAMES),
+                is_active=self.random.random() >= inactive, is_verified=True, is_approved=True,
+                date_joined=created, created=created, updated=created, **{flag: True}))
+            self.writer.add(profile(id=self.next_id(profile), user_id=pk, gender=self.random.choice('mf'),
+                                    is_active=True, created=created, updated=created))
+        return list(ids)
+
+    def catalogue(self):
+        from salonist.models import Service
+        from service.models import SalonistService
+        from store.models import Gallery, Product, Review, Wishlist
+
+        start = self.until - datetime.timedelta(days=self.days)
+        now = self.aware(self.until)
+        # service: (price, minutes an appointment takes)
+        self.services = {}
+        for pk, when in zip(self.ids(Service, self.volume['services']), self.moments(self.volume['services'], start)):
+            style = self.random.choice(STYLES)
+            self.services[pk] = (self.random.randrange(500, 8000, 50), self.random.choice((30, 60, 90, 120, 180)))
+            self.writer.add(Service(id=pk, name=f"{style} {pk}", description=f"{style} by our salonists",
+                                    price=self.services[pk][0], is_active=True, created=self.aware(when),
+                                    updated=self.aware(when)))
+        self.service_ids = list(self.services)
+
+        # service: the salonists offering it
+        self.offered = defaultdict(list)
+        for salonist in self.salonists:
+            for service in self.random.sample(self.service_ids, min(len(self.service_ids), self.random.randint(1, 4))):
+                self.offered[service].append(salonist)
+                self.writer.add(SalonistService(
+                    id=self.next_id(SalonistService), salonist_id=salonist, service_id=service, is_active=True,
+                    manager_id=self.random.choice(self.managers) if self.managers else None, created=now, updated=now))
+
+        # product: discounted price
+        self.products = {}
+        for pk, when in zip(self.ids(Product, self.volume['products']), self.moments(self.volume['products'], start)):
+            name = f"{self.random.choice(INGREDIENTS)} {self.random.choice(PRODUCTS)} {pk}"
+            price = float(self.random.randrange(150, 6000, 10))
+            discount = self.random.choice(DISCOUNTS)
+            self.products[pk] = price * discount
+            created = self.aware(when)
+            reviews = [self.random.randint(1, 5) for _ in range(self.random.randint(0, 4) if self.customers else 0)]
+            # with the rating aggregates the review receivers would keep
+            self.writer.add(Product(
+                id=pk, slug=f"{self.code(5).lower()}-{slugify(name)}", name=name, price=price, discount=discount,
+                is_discount=discount < 1.0, quantity=self.random.randint(0, 200), image="product/default.jpg",
+                description=f"{name}, for every hair type.", is_active=self.random.random() < 0.95,
+                rating_sum=sum(reviews), rating_count=len(reviews),
+                rating_avg=sum(reviews) / len(reviews) if reviews else 0.0, created=created, updated=created))
+            for gallery in self.ids(Gallery, self.random.randint(0, 3)):
+                self.writer.add(Gallery(id=gallery, product_id=pk, created=created, updated=created))
+            for review, rating in zip(self.ids(Review, len(reviews)), reviews):
+                self.writer.add(Review(id=review, product_id=pk, customer_id=self.random.choice(self.customers),
+                                       review="Works well on my hair.", rating=rating, created=created,
+                                       updated=created))
+        self.product_ids = list(self.products)
+
+        for customer in self.customers:
+            wished = self.random.choice((0, 0, 1, 2, 3))
+            for product in self.random.sample(self.product_ids, min(len(self.product_ids), wished)):
+                self.writer.add(Wishlist(id=self.next_id(Wishlist), customer_id=customer, product_id=product,
+                                         created=now, updated=now))
+
+    def orders(self):
+        """Mostly paid orders of one to five products, some abandoned and some still open as carts."""
+        from store.models import Order, OrderItem, OrderPayment
+
+        count = self.volume['orders'] if self.customers else 0
+        for pk, when in zip(self.ids(Order, count), self.moments(count)):
+            customer = self.random.choice(self.customers)
+            chance = self.random.random()
+            paid, open_cart = chance < 0.85, 0.85 <= chance < 0.9
+            created = self.aware(when)
+            items = []
+            for product in self.random.sample(self.product_ids, min(len(self.product_ids), self.random.randint(1, 5))):
+                items.append(OrderItem(id=self.next_id(OrderItem), order_id=pk, product_id=product,
+                                       quantity=self.random.randint(1, 3), created=created, updated=created))
+            # the totals order_item_totals would keep
+            cart_total = sum(self.products[item.product_id] * item.quantity for item in items)
+            self.writer.add(Order(id=pk, transaction_id=self.code(6), customer_id=customer, completed=paid,
+                                  is_active=paid or open_cart, cart_items=sum(item.quantity for item in items),
+                                  cart_total=cart_total, created=created, updated=created))
+            for item in items:
+                self.writer.add(item)
+            self.activity[customer]['orders'] += 1
+            self.touch(customer, when)
+            if paid:
+                confirmed = self.random.random() < 0.9
+                paid_at = self.aware(when + datetime.timedelta(minutes=self.random.randint(1, 30)))
+                self.writer.add(OrderPayment(
+                    id=self.next_id(OrderPayment), transaction_id=self.code(8), order_id=pk, customer_id=customer,
+                    mpesa=self.code(), amount=cart_total, confirmed=confirmed,
+                    manager_id=self.random.choice(self.finance) if confirmed and self.finance else None,
+                    created=paid_at, updated=paid_at))
+                self.activity[customer]['payments'] += 1
+                self.activity[customer]['spend'] += cart_total
+
+    def bookings(self):
+        """
+        Bookings, most of them paid and given an appointment. Each salonist's appointments are laid one after
+        the other within opening hours, so none of them overlap.
+        """
+        from service.models import Appointment, Booking, BookingPayment, SalonistLoad
+
+        # salonist: when they are next free, (salonist, day): [appointments, minutes, last assigned]
+        free, loads = {}, {}
+        count = self.volume['bookings'] if self.customers and self.services else 0
+        for pk, when in zip(self.ids(Booking, count), self.moments(count)):
+            customer = self.random.choice(self.customers)
+            service = self.random.choice(self.service_ids)
+            price, minutes = self.services[service]
+            paid = self.random.random() < 0.8
+            created = self.aware(when)
+            self.writer.add(Booking(id=pk, transaction_id=self.code(6), service_id=service, customer_id=customer,
+                                    is_active=paid, is_paid=paid, created=created, updated=created))
+            self.activity[customer]['bookings'] += 1
+            self.touch(customer, when)
+            if not paid:
+                continue
+            confirmed = self.random.random() < 0.9
+            paid_at = when + datetime.timedelta(minutes=self.random.randint(1, 30))
+            self.writer.add(BookingPayment(
+                id=self.next_id(BookingPayment), booking_id=pk, customer_id=customer, mpesa=self.code(),
+                amount=price, confirmed=confirmed, completed=True,
+                manager_id=self.random.choice(self.finance) if confirmed and self.finance else None,
+                created=self.aware(paid_at), updated=self.aware(paid_at)))
+            self.activity[customer]['payments'] += 1
+            self.activity[customer]['spend'] += price
+            if not self.salonists or self.random.random() >= 0.85:
+                continue
+
+            salonist = self.random.choice(self.offered.get(service) or self.salonists)
+            wanted = paid_at + datetime.timedelta(days=self.random.randint(0, 6))
+            start = self.opening_after(max(free.get(salonist, wanted), wanted))
+            duration = datetime.timedelta(minutes=minutes)
+            if (start + duration).date() != start.date() or (start + duration).time() > CLOSING_TIME:
+                start = datetime.datetime.combine(start.date() + datetime.timedelta(days=1), OPENING_TIME)
+            free[salonist] = stop = start + duration
+            self.writer.add(Appointment(
+                id=self.next_id(Appointment), booking_id=pk, customer_id=customer, salonist_id=salonist,
+                date=self.aware(start), stop_date=self.aware(stop), completed=stop < self.until,
+                created=self.aware(paid_at), updated=self.aware(paid_at)))
+            self.activity[customer]['appointments'] += 1
+            self.touch(customer, paid_at)
+            load = loads.setdefault((salonist, start.date()), [0, 0, paid_at])
+            load[0] += 1
+            load[1] += minutes
+            load[2] = max(load[2], paid_at)
+
+        # the counters appointment_load would keep
+        for (salonist, day), (appointments, minutes, last_assigned) in loads.items():
+            self.writer.add(SalonistLoad(id=self.next_id(SalonistLoad), salonist_id=salonist, date=day,
+                                         appointments=appointments, minutes=minutes,
+                                         last_assigned=self.aware(last_assigned)))
+
+    @staticmethod
+    def opening_after(moment):
+        """The first slot within opening hours starting at or after moment."""
+        opening = datetime.datetime.combine(moment.date(), OPENING_TIME)
+        if moment <= opening:
+            return opening
+        start = opening + -(-(moment - opening) // SLOT_STEP) * SLOT_STEP
+        if start.date() != moment.date() or start.time() >= CLOSING_TIME:
+            return datetime.datetime.combine(moment.date() + datetime.timedelta(days=1), OPENING_TIME)
+        return start
+
+    def trainings(self):
+        from trainee.models import Training, TrainingApplication, TrainingPayment
+
+        count = self.volume['trainings'] if self.services and self.salonists else 0
+        trainings = []
+        for pk, when in zip(self.ids(Training, count), self.moments(count)):
+            start = when + datetime.timedelta(days=self.random.randint(7, 60))
+            end = start + datetime.timedelta(days=self.random.choice((7, 14, 30, 90)))
+            price = float(self.random.randrange(5000, 50000, 500))
+            trainings.append((pk, price, when, end < self.until))
+            self.writer.add(Training(
+                id=pk, service_id=self.random.choice(self.service_ids), salonist_id=self.random.choice(self.salonists),
+                price=price, date=self.aware(start), end_date=self.aware(end), is_active=True,
+                ended=end < self.until, created=self.aware(when), updated=self.aware(when)))
+
+        for trainee in self.trainees:
+            for training, price, opened, ended in self.random.sample(trainings,
+                                                                     min(len(trainings), self.random.randint(0, 3))):
+                approved = self.random.random() < 0.7
+                paid = approved and self.random.random() < 0.8
+                applied = self.aware(opened + datetime.timedelta(hours=self.random.randint(1, 24 * 7)))
+                application = self.next_id(TrainingApplication)
+                self.writer.add(TrainingApplication(
+                    id=application, code=self.code(8), training_id=training, trainee_id=trainee, is_paid=paid,
+                    is_done=paid and ended, is_approved=approved, created=applied, updated=applied))
+                if paid:
+                    self.writer.add(TrainingPayment(
+                        id=self.next_id(TrainingPayment), code=self.code(8), training_id=application,
+                        trainee_id=trainee, finance_id=self.random.choice(self.finance) if self.finance else None,
+                        amount=price, mpesa=self.code(), is_confirmed=self.random.random() < 0.9,
+                        created=applied, updated=applied))
+
+    def apprenticeships(self):
+        from service.models import Apprenticeship, ApprenticeshipApplication
+
+        for salonist in self.salonists:
+            if self.random.random() < 0.5:
+                continue
+            date = self.until + datetime.timedelta(days=self.random.randint(-self.days, 60))
+            created = self.aware(min(date, self.until) - datetime.timedelta(days=30))
+            pk = self.next_id(Apprenticeship)
+            self.writer.add(Apprenticeship(id=pk, salonist_id=salonist, date=self.aware(date),
+                                           closed=date < self.until, is_active=True, created=created,
+                                           updated=created))
+            for customer in self.random.sample(self.customers, min(len(self.customers), self.random.randint(0, 4))):
+                self.writer.add(ApprenticeshipApplication(
+                    id=self.next_id(ApprenticeshipApplication), program_id=pk, customer_id=customer,
+                    attended=date < self.until and self.random.random() < 0.8, created=created, updated=created))
+
+    def customer_activity(self):
+        """The dashboard summaries CustomerActivity.refresh would keep, tallied while generating."""
+        from customer.models import CustomerActivity
+
+        for customer in self.customers:
+            activity, last = self.activity[customer], self.last_activity.get(customer)
+            self.writer.add(CustomerActivity(
+                customer_id=customer, orders=activity['orders'], bookings=activity['bookings'],
+                appointments=activity['appointments'], payments=activity['payments'],
+                lifetime_spend=activity['spend'], last_activity=self.aware(last) if last else None))
+
+    def rebuild(self):
+        """Rebuild what is derived from many rows at once: the revenue rollups, search index and cached KPIs."""
+        from finance.models import DailyRevenue
+        from home import search
+        from manager.kpis import invalidate_kpis
+
+        rebuilt = {'daily revenue rows': DailyRevenue.rebuild(), 'search index entries': search.rebuild()}
+        invalidate_kpis()
+        return rebuilt